@@ -3,10 +3,14 @@ REST API for Service PRO Frontend
 Provides JSON endpoints for the React frontend
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_login import login_required, current_user
 from datetime import datetime
 import json
+from ledger import total_unpaid_earnings
+from money import from_cents
+from database import replica_reads
+from reporting import reporting_reads, snapshot_age
 
 # Import models to avoid circular import
 def get_models():
@@ -22,6 +26,7 @@ ADMIN = 'admin'
 HANDYMAN = 'handyman'
 
 @api_bp.route('/service-groups')
+@replica_reads
 def get_service_groups():
     """Get all active service groups"""
     try:
@@ -44,6 +49,7 @@ def get_service_groups():
 
 @api_bp.route('/services')
 @login_required
+@replica_reads
 def get_services():
     """Get services, optionally filtered by group"""
     try:
@@ -73,6 +79,10 @@ def get_services():
             pass
 
         services = query.all()
+        from app import HandymanRank
+        ranked_scores = dict(db.session.query(HandymanRank.handyman_id, HandymanRank.score)
+                             .filter(HandymanRank.service_group_id == HandymanRank.OVERALL)
+                             .filter(HandymanRank.handyman_id.in_({s.handyman_id for s in services})))
         return jsonify({
             'success': True,
             'data': [{
@@ -97,7 +107,8 @@ def get_services():
                     'id': s.handyman.id,
                     'first_name': s.handyman.first_name,
                     'last_name': s.handyman.last_name,
-                    'average_score': float(s.handyman.average_score) if s.handyman.average_score else 0
+                    'average_score': float(s.handyman.average_score) if s.handyman.average_score else 0,
+                    'ranked_score': ranked_scores.get(s.handyman_id, 0)
                 } if s.handyman else None
             } for s in services]
         })
@@ -105,6 +116,7 @@ def get_services():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @api_bp.route('/services/<int:service_id>')
+@replica_reads
 def get_service(service_id):
     """Get a specific service"""
     try:
@@ -150,6 +162,7 @@ def get_service(service_id):
 @login_required
 def handle_bookings():
     """Get user bookings or create new booking"""
+    db, User, Service, ServiceGroup, Booking, Feedback, Commission = get_models()
     if request.method == 'GET':
         # Get user's bookings
         try:
@@ -208,39 +221,16 @@ def handle_bookings():
             if booking_date <= datetime.now():
                 return jsonify({'success': False, 'error': 'Please select a future date and time'}), 400
 
-            booking = Booking(
-                user_id=current_user.id,
-                service_id=service_id,
-                booking_date=booking_date,
-                special_requests=special_requests,
-                total_price=service.price,
-                status='pending'
-            )
-
-            db.session.add(booking)
-            db.session.commit()
-
-            # Calculate and create commission record
-            commission_amount = service.price * 0.10  # 10% commission
-            handyman_earnings = service.price * 0.90  # 90% to handyman
-
-            commission = Commission(
-                booking_id=booking.id,
-                handyman_id=service.handyman_id,
-                service_price=service.price,
-                commission_amount=commission_amount,
-                handyman_earnings=handyman_earnings
-            )
-            db.session.add(commission)
-            db.session.commit()
+            from app import place_booking
+            booking_id, _, _ = place_booking(current_user.id, service, booking_date, special_requests)
 
             return jsonify({
                 'success': True,
                 'message': 'Booking created successfully',
                 'data': {
-                    'id': booking.id,
-                    'total_price': float(booking.total_price),
-                    'status': booking.status
+                    'id': booking_id,
+                    'total_price': float(service.price),
+                    'status': 'pending'
                 }
             })
 
@@ -250,6 +240,7 @@ def handle_bookings():
 
 @api_bp.route('/user/dashboard')
 @login_required
+@replica_reads
 def user_dashboard():
     """Get user dashboard data"""
     if current_user.role != USER:
@@ -285,6 +276,7 @@ def user_dashboard():
 
 @api_bp.route('/handyman/dashboard')
 @login_required
+@replica_reads
 def handyman_dashboard():
     """Get handyman dashboard data"""
     if current_user.role != HANDYMAN:
@@ -325,12 +317,14 @@ def handyman_dashboard():
 
 @api_bp.route('/admin/dashboard')
 @login_required
+@reporting_reads
 def admin_dashboard():
     """Get admin dashboard data"""
     if current_user.role != ADMIN:
         return jsonify({'success': False, 'error': 'Access denied'}), 403
 
     try:
+        db, User, Service, ServiceGroup, Booking, Feedback, Commission = get_models()
         total_users = User.query.count()
         total_services = Service.query.filter_by(is_approved=True).count()
         total_bookings = Booking.query.count()
@@ -352,9 +346,11 @@ def admin_dashboard():
             completed_jobs += len([b for b in bookings if b.status == 'completed'])
 
         # Calculate commission statistics
-        total_commissions = Commission.query.filter_by(is_paid=False).all()
-        total_commission_amount = sum(c.commission_amount for c in total_commissions)
-        total_handyman_earnings = sum(c.handyman_earnings for c in total_commissions)
+        total_commission_amount = from_cents(
+            db.session.query(db.func.coalesce(db.func.sum(Commission.commission_amount_cents), 0))
+            .filter(Commission.is_paid == False)
+            .scalar())
+        total_handyman_earnings = from_cents(total_unpaid_earnings())
 
         return jsonify({
             'success': True,
@@ -373,7 +369,8 @@ def admin_dashboard():
                     'approved_handymen_count': len(approved_handymen),
                     'total_commission_amount': float(total_commission_amount),
                     'total_handyman_earnings': float(total_handyman_earnings)
-                }
+                },
+                'snapshot_age_seconds': snapshot_age(current_app)
             }
         })
     except Exception as e:
@@ -427,7 +424,10 @@ def api_admin_reject_service(service_id):
         return jsonify({'success': False, 'error': 'Access denied'}), 403
 
     try:
+        db, User, Service, ServiceGroup, Booking, Feedback, Commission = get_models()
         service = Service.query.get_or_404(service_id)
+        if Booking.query.filter_by(service_id=service_id).first():
+            return jsonify({'success': False, 'error': 'Service has bookings; deactivate it instead'}), 409
         service_name = service.name
         db.session.delete(service)
         db.session.commit()
@@ -442,6 +442,7 @@ def api_admin_reject_service(service_id):
 
 @api_bp.route('/admin/pending-services')
 @login_required
+@replica_reads
 def api_admin_pending_services():
     """Get all pending services for admin approval"""
     if current_user.role != ADMIN:
@@ -474,6 +475,95 @@ def api_admin_pending_services():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@api_bp.route('/handymen/top')
+@replica_reads
+def get_top_handymen():
+    """Handymen ranked by Bayesian-adjusted rating, overall or within a service group"""
+    try:
+        from app import db, User, HandymanRank
+        group_id = request.args.get('group_id', HandymanRank.OVERALL, type=int)
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+
+        rows = (db.session.query(HandymanRank, User)
+                .join(User, HandymanRank.handyman_id == User.id)
+                .filter(HandymanRank.service_group_id == group_id)
+                .filter(User.role == HANDYMAN, User.is_approved == True)
+                .order_by(HandymanRank.score.desc(), HandymanRank.handyman_id)
+                .limit(limit)
+                .offset(offset)
+                .all())
+
+        return jsonify({
+            'success': True,
+            'data': [{
+                'rank': offset + position + 1,
+                'handyman': {
+                    'id': user.id,
+                    'first_name': user.first_name,
+                    'last_name': user.last_name,
+                    'average_score': float(user.average_score) if user.average_score else 0,
+                    'total_feedbacks': user.total_feedbacks
+                },
+                'service_group_id': rank.service_group_id or None,
+                'score': round(rank.score, 4),
+                'rating_count': rank.rating_count
+            } for position, (rank, user) in enumerate(rows)]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/admin/password-hash-stats')
+@login_required
+def api_admin_password_hash_stats():
+    """Password hashing timings for this worker process"""
+    if current_user.role != ADMIN:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+
+    from password_hashing import hash_stats
+    return jsonify({'success': True, 'data': hash_stats()})
+
+@api_bp.route('/admin/write-queue-stats')
+@login_required
+def api_admin_write_queue_stats():
+    """SQLite write queue depth and commit batch sizes for this worker process"""
+    if current_user.role != ADMIN:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+
+    from write_queue import write_queue_stats
+    return jsonify({'success': True, 'data': write_queue_stats()})
+
+@api_bp.route('/admin/reporting-stats')
+@login_required
+def api_admin_reporting_stats():
+    """Reporting snapshot age and refresh timings"""
+    if current_user.role != ADMIN:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+
+    from reporting import reporting_stats
+    return jsonify({'success': True, 'data': reporting_stats(current_app)})
+
+@api_bp.route('/admin/sql-stats')
+@login_required
+def api_admin_sql_stats():
+    """Per-request query counts and recent N+1 detections for this worker process"""
+    if current_user.role != ADMIN:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+
+    from sql_profiler import sql_stats
+    return jsonify({'success': True, 'data': sql_stats()})
+
+@api_bp.route('/admin/slow-queries')
+@login_required
+def api_admin_slow_queries():
+    """Recent slow statements with redacted parameters and query plans (this worker process)"""
+    if current_user.role != ADMIN:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+
+    from slow_queries import slow_queries
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({'success': True, 'data': slow_queries(limit)})
+
 
 # Register API blueprint
 def init_api(app):
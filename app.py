@@ -1,36 +1,39 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context
+from flask_sqlalchemy import Pagination
 
-# Configure database driver based on database type
-db_uri = os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///instance/service_app.db')
-if db_uri.startswith('mysql'):
-    try:
-        import PyMySQL  # Python 3 MySQL driver
-        os.environ['SQLALCHEMY_MYSQL_NO_MYSQLDB'] = '1'
-        print("✓ Configured SQLAlchemy to use PyMySQL for MySQL")
-    except ImportError:
-        print("WARNING: PyMySQL not found, install with: pip install PyMySQL")
-        print("  Falling back to default MySQL driver")
-elif db_uri.startswith('postgresql'):
-    try:
-        import psycopg2  # Python 3 PostgreSQL driver
-        print("✓ Configured SQLAlchemy to use psycopg2 for PostgreSQL")
-    except ImportError:
-        print("WARNING: psycopg2 not found, install with: pip install psycopg2-binary")
-        print("  Falling back to default PostgreSQL driver")
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_wtf import FlaskForm
 from flask_babel import Babel, gettext, ngettext, lazy_gettext
 from flask_mail import Mail, Message
 from wtforms import StringField, PasswordField, TextAreaField, SelectField, SubmitField, FloatField, IntegerField, HiddenField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, NumberRange
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from sql_profiler import init_sql_profiler
+from metrics import init_metrics
+from health import init_health
+from slow_queries import init_slow_queries, read_log as read_slow_query_log
+from user_cache import init_user_cache, lookup as lookup_cached_user, store as store_cached_user, invalidate_user, USER_CACHE_FIELDS
+from money import cents_property, split_commission, from_cents
+from migrations import upgrade as upgrade_database, migration_status
+from write_queue import init_write_queue, run_write, write_queue_stats
+from backups import init_backups, run_backup, backup_if_due
+from data_migration import migrate_data
+from seed import seed_database
+from reporting import init_reporting, refresh_snapshot, reporting_reads, reporting_stats, snapshot_age
+from database import normalize_database_uri, engine_options, database_settings, RoutingSQLAlchemy, init_replica, replica_reads
+from ledger import record_accrual, reverse_accrual, record_payout, get_balances, total_unpaid_earnings, rebuild_ledger
+from reconcile import reconcile_commissions, print_report as print_reconcile_report
+from payouts import payout_preview, run_payout, stream_statement_csv, stream_statement_json
+from exports import EXPORTS, EXPORT_FORMATS, parse_export_date, stream_export, validate_export_status
+from password_hashing import init_password_hashing, hash_password, verify_password, needs_rehash, note_rehash, hash_stats, PasswordHashBusy
 from datetime import datetime, timedelta
 import secrets
 import json
 import re
 import traceback
+import click
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -48,42 +51,67 @@ def generate_secret_key():
     return secrets.token_hex(32)
 
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', generate_secret_key())
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///instance/service_app_fixed.db'
-
-# Configure engine options based on database type
-db_uri = app.config['SQLALCHEMY_DATABASE_URI']
-if db_uri.startswith('sqlite'):
-    # SQLite-specific options
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'connect_args': {'check_same_thread': False}
-    }
-elif db_uri.startswith('mysql'):
-    # MySQL with PyMySQL (Python 3 compatible)
-    try:
-        import PyMySQL  # Python 3 MySQL driver
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
-        print("✓ Using PyMySQL for MySQL database connectivity")
-    except ImportError:
-        print("WARNING: PyMySQL not found, install with: pip install PyMySQL")
-        print("  Falling back to default MySQL driver")
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
-elif db_uri.startswith('postgresql'):
-    # PostgreSQL with psycopg2 (Python 3 compatible)
-    try:
-        import psycopg2  # Python 3 PostgreSQL driver
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
-        print("✓ Using psycopg2 for PostgreSQL database connectivity")
-    except ImportError:
-        print("WARNING: psycopg2 not found, install with: pip install psycopg2-binary")
-        print("  Falling back to default PostgreSQL driver")
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
-else:
-    # Default options for other databases
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
+app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_uri(
+    os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///instance/service_app_fixed.db'))
+
+# SQLite profile applied to every new connection (see database.py)
+app.config['SQLITE_JOURNAL_MODE'] = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+app.config['SQLITE_CACHE_SIZE'] = int(os.getenv('SQLITE_CACHE_SIZE', '-20000'))
+app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', '268435456'))
+app.config['SQLITE_TEMP_STORE'] = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+app.config['SQLITE_FOREIGN_KEYS'] = os.getenv('SQLITE_FOREIGN_KEYS', 'ON')
+
+# Connection pool profile for PostgreSQL/MySQL (per gunicorn worker; see database.py)
+app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', str(int(os.getenv('GUNICORN_THREADS', '1')) + 1)))
+app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', '2'))
+app.config['DB_POOL_TIMEOUT'] = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+app.config['DB_QUERY_CACHE_SIZE'] = int(os.getenv('DB_QUERY_CACHE_SIZE', '500'))
+app.config['DB_CONNECT_TIMEOUT'] = int(os.getenv('DB_CONNECT_TIMEOUT', '10'))
+app.config['DB_STATEMENT_TIMEOUT_MS'] = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))
+app.config['DB_IDLE_IN_TRANSACTION_TIMEOUT_MS'] = int(os.getenv('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', '60000'))
+app.config['DB_APPLICATION_NAME'] = os.getenv('DB_APPLICATION_NAME', 'service-pro')
+
+# Engine options for the configured backend
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+
+# Optional read replica for @replica_reads views; clients that just wrote
+# stay on the primary for REPLICA_STICKY_SECONDS (should exceed replica lag)
+app.config['SQLALCHEMY_REPLICA_URI'] = os.getenv('SQLALCHEMY_REPLICA_URI', '')
+app.config['REPLICA_STICKY_SECONDS'] = float(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+init_replica(app)
+
+# Reporting snapshot for dashboards and exports (@reporting_reads): a SQLite
+# backup copy refreshed once it is older than REPORTING_SNAPSHOT_MAX_AGE
+# seconds, or a read-only REPEATABLE READ transaction on PostgreSQL
+app.config['REPORTING_SNAPSHOT'] = os.getenv('REPORTING_SNAPSHOT', 'False').lower() == 'true'
+app.config['REPORTING_SNAPSHOT_PATH'] = os.getenv('REPORTING_SNAPSHOT_PATH', 'reporting_snapshot.db')
+app.config['REPORTING_SNAPSHOT_MAX_AGE'] = float(os.getenv('REPORTING_SNAPSHOT_MAX_AGE', '300'))
+app.config['REPORTING_BACKUP_PAGES'] = int(os.getenv('REPORTING_BACKUP_PAGES', '1024'))
+app.config['REPORTING_BACKUP_SLEEP_MS'] = float(os.getenv('REPORTING_BACKUP_SLEEP_MS', '5'))
+init_reporting(app)
+
+# Online backups (flask backup); with BACKUP_INTERVAL_HOURS set the workers
+# also take one whenever the newest backup is older than that
+app.config['BACKUP_DIR'] = os.getenv('BACKUP_DIR', 'backups')
+app.config['BACKUP_PAGES_PER_STEP'] = int(os.getenv('BACKUP_PAGES_PER_STEP', '256'))
+app.config['BACKUP_STEP_SLEEP_MS'] = float(os.getenv('BACKUP_STEP_SLEEP_MS', '10'))
+app.config['BACKUP_KEEP'] = int(os.getenv('BACKUP_KEEP', '7'))
+app.config['BACKUP_INTERVAL_HOURS'] = float(os.getenv('BACKUP_INTERVAL_HOURS', '0'))
+init_backups(app)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'static/uploads')
 app.config['BABEL_DEFAULT_LOCALE'] = os.getenv('BABEL_DEFAULT_LOCALE', 'et')
 app.config['BABEL_SUPPORTED_LOCALES'] = os.getenv('BABEL_SUPPORTED_LOCALES', 'et,en').split(',')
+app.config['FEEDBACK_PER_PAGE'] = int(os.getenv('FEEDBACK_PER_PAGE', '20'))
+
+# Leaderboard: scores are pulled toward PRIOR_MEAN as if each handyman had
+# PRIOR_WEIGHT extra ratings (run flask rebuild-leaderboard after changing)
+app.config['LEADERBOARD_PRIOR_MEAN'] = float(os.getenv('LEADERBOARD_PRIOR_MEAN', '3.5'))
+app.config['LEADERBOARD_PRIOR_WEIGHT'] = float(os.getenv('LEADERBOARD_PRIOR_WEIGHT', '10'))
 
 # Email configuration
 app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
@@ -94,6 +122,42 @@ app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME', 'your-email@gmail.com')
 app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD', 'your-app-password')
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'your-email@gmail.com')
 
+# Password hashing configuration (hashes are upgraded on login when these change)
+app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+app.config['PASSWORD_HASH_SALT_LENGTH'] = int(os.getenv('PASSWORD_HASH_SALT_LENGTH', '16'))
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+app.config['PASSWORD_HASH_MAX_QUEUE'] = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', '32'))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+app.config['PASSWORD_HASH_BUDGET_MS'] = float(os.getenv('PASSWORD_HASH_BUDGET_MS', '250'))
+init_password_hashing(app)
+
+# SQLite single-writer queue with group commit (ignored on other databases)
+app.config['SQLITE_WRITE_QUEUE'] = os.getenv('SQLITE_WRITE_QUEUE', 'False').lower() == 'true'
+app.config['WRITE_QUEUE_MAX_BATCH'] = int(os.getenv('WRITE_QUEUE_MAX_BATCH', '32'))
+app.config['WRITE_QUEUE_MAX_DELAY_MS'] = float(os.getenv('WRITE_QUEUE_MAX_DELAY_MS', '2'))
+app.config['WRITE_QUEUE_TIMEOUT'] = float(os.getenv('WRITE_QUEUE_TIMEOUT', '10'))
+init_write_queue(app)
+
+# Identity cache used by load_user (seconds; 0 disables)
+app.config['USER_CACHE_TTL'] = float(os.getenv('USER_CACHE_TTL', '60'))
+app.config['USER_CACHE_MAX_ENTRIES'] = int(os.getenv('USER_CACHE_MAX_ENTRIES', '10000'))
+init_user_cache(app)
+
+# Per-request query counts; a request that runs one statement more than
+# SQL_N_PLUS_ONE_THRESHOLD times is logged (and fails under app.testing)
+app.config['SQL_PROFILING'] = os.getenv('SQL_PROFILING', 'True').lower() == 'true'
+app.config['SQL_N_PLUS_ONE_THRESHOLD'] = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '10'))
+app.config['SQL_N_PLUS_ONE_RAISE'] = os.getenv('SQL_N_PLUS_ONE_RAISE', 'False').lower() == 'true'
+init_sql_profiler(app)
+
+# Slow-query log: statements over SLOW_QUERY_MS with their plan, kept in
+# memory (/api/admin/slow-queries) and appended to SLOW_QUERY_LOG_FILE
+app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS', '200'))
+app.config['SLOW_QUERY_EXPLAIN'] = os.getenv('SLOW_QUERY_EXPLAIN', 'True').lower() == 'true'
+app.config['SLOW_QUERY_LOG_SIZE'] = int(os.getenv('SLOW_QUERY_LOG_SIZE', '100'))
+app.config['SLOW_QUERY_LOG_FILE'] = os.getenv('SLOW_QUERY_LOG_FILE', 'logs/slow_queries.log')
+init_slow_queries(app)
+
 # Create upload directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -185,15 +249,27 @@ def get_locale():
     return 'et'
 
 # Initialize extensions
-db = SQLAlchemy(app)
+db = RoutingSQLAlchemy(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 mail = Mail(app)
 babel = Babel(app, locale_selector=get_locale)
 
+# Prometheus metrics at /metrics (optionally behind METRICS_TOKEN)
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN', '')
+init_metrics(app, mail)
+
+# /healthz and /readyz for load balancer and monitor.py probes; readiness
+# reuses one SELECT 1 for HEALTH_CACHE_SECONDS and fails when the pool is
+# more than HEALTH_MAX_POOL_SATURATION checked out
+app.config['HEALTH_CACHE_SECONDS'] = float(os.getenv('HEALTH_CACHE_SECONDS', '2'))
+app.config['HEALTH_MAX_POOL_SATURATION'] = float(os.getenv('HEALTH_MAX_POOL_SATURATION', '0.9'))
+init_health(app)
+
 # API Routes for React Frontend
 @app.route('/api/service-groups')
+@replica_reads
 def api_get_service_groups():
     """Get all active service groups"""
     try:
@@ -214,12 +290,16 @@ def api_get_service_groups():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/services')
+@replica_reads
 def api_get_services():
     """Get services, optionally filtered by group"""
     try:
         # For public API, show only approved services
         query = Service.query.filter_by(is_active=True, is_approved=True)
         services = query.all()
+        ranked_scores = dict(db.session.query(HandymanRank.handyman_id, HandymanRank.score)
+                             .filter(HandymanRank.service_group_id == HandymanRank.OVERALL)
+                             .filter(HandymanRank.handyman_id.in_({s.handyman_id for s in services})))
 
         return jsonify({
             'success': True,
@@ -245,7 +325,8 @@ def api_get_services():
                     'id': s.handyman.id,
                     'first_name': s.handyman.first_name,
                     'last_name': s.handyman.last_name,
-                    'average_score': float(s.handyman.average_score) if s.handyman.average_score else 0
+                    'average_score': float(s.handyman.average_score) if s.handyman.average_score else 0,
+                    'ranked_score': ranked_scores.get(s.handyman_id, 0)
                 } if s.handyman else None
             } for s in services]
         })
@@ -268,6 +349,8 @@ def api_login():
         # Find user by email instead of username for API
         user = User.query.filter_by(email=data.get('email')).first()
         if user and user.check_password(data.get('password')):
+            if db.session.is_modified(user):
+                db.session.commit()
             login_user(user)
             return jsonify({
                 'success': True,
@@ -287,6 +370,8 @@ def api_login():
             })
         else:
             return jsonify({'success': False, 'message': 'Invalid email or password'}), 401
+    except PasswordHashBusy:
+        return jsonify({'success': False, 'message': 'Server busy, please try again'}), 503
     except Exception as e:
         return jsonify({'success': False, 'message': 'Login failed', 'error': str(e)}), 500
 
@@ -323,13 +408,10 @@ def api_register():
         user.set_password(data.get('password'))
         user.is_approved = True  # Auto-approve for now
 
-        db.session.add(user)
-        db.session.commit()
-
-        return jsonify({
-            'success': True,
-            'message': 'Registration successful',
-            'user': {
+        def create_user():
+            db.session.add(user)
+            db.session.flush()
+            return {
                 'id': user.id,
                 'username': user.username,
                 'email': user.email,
@@ -337,7 +419,14 @@ def api_register():
                 'last_name': user.last_name,
                 'role': user.role
             }
+
+        return jsonify({
+            'success': True,
+            'message': 'Registration successful',
+            'user': run_write(create_user)
         })
+    except PasswordHashBusy:
+        return jsonify({'success': False, 'message': 'Server busy, please try again'}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': 'Registration failed', 'error': str(e)}), 500
@@ -417,12 +506,19 @@ class User(UserMixin, db.Model):
     average_score = db.Column(db.Float, default=0.0)
     total_feedbacks = db.Column(db.Integer, default=0)
     admin_approved = db.Column(db.Boolean, default=False)
+    cache_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # bumped when a cached column changes
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        if not verify_password(self.password_hash, password):
+            return False
+        # Upgrade hashes made with older parameters; the caller commits
+        if needs_rehash(self.password_hash):
+            self.set_password(password)
+            note_rehash()
+        return True
 
     def generate_reset_token(self):
         """Generate a password reset token"""
@@ -442,16 +538,243 @@ class User(UserMixin, db.Model):
         self.reset_token_expiry = None
 
     def update_score(self):
-        """Update average score based on feedback"""
+        """Recompute score aggregates from all of this handyman's feedback"""
         if self.role == HANDYMAN:
-            feedbacks = Feedback.query.filter_by(handyman_id=self.id).all()
-            if feedbacks:
-                total_score = sum(f.rating for f in feedbacks)
-                self.average_score = total_score / len(feedbacks)
-                self.total_feedbacks = len(feedbacks)
-            else:
-                self.average_score = 0.0
-                self.total_feedbacks = 0
+            db.session.flush()
+            rating_row = HandymanRating.rebuild_for(self.id)
+            self.total_feedbacks = rating_row.rating_count
+            self.average_score = rating_row.average
+
+    def add_rating(self, rating, service_group_id=None):
+        """Fold one new feedback rating into the score aggregates.
+
+        Runs as atomic UPDATEs in the caller's transaction, so the cost is
+        constant regardless of how many reviews the handyman already has.
+        """
+        rating = int(rating)
+        if rating not in RATING_STARS:
+            raise ValueError(f'Invalid rating: {rating}')
+
+        db.session.flush()
+        ratings = HandymanRating.__table__
+        star_column = f'stars_{rating}'
+        updated = db.session.execute(
+            ratings.update()
+            .where(ratings.c.handyman_id == self.id)
+            .values({
+                star_column: ratings.c[star_column] + 1,
+                'rating_count': ratings.c.rating_count + 1,
+                'rating_sum': ratings.c.rating_sum + rating,
+                'updated_at': datetime.utcnow(),
+            })
+        ).rowcount
+        if not updated:
+            # No aggregate row yet: seed it from existing feedback (includes this one)
+            HandymanRating.rebuild_for(self.id)
+
+        users = User.__table__
+        rating_of_user = ratings.c.handyman_id == users.c.id
+        db.session.execute(
+            users.update()
+            .where(users.c.id == self.id)
+            .values(
+                total_feedbacks=db.select(ratings.c.rating_count).where(rating_of_user).scalar_subquery(),
+                average_score=db.select(ratings.c.rating_sum * 1.0 / ratings.c.rating_count).where(rating_of_user).scalar_subquery(),
+                cache_version=users.c.cache_version + 1,
+            )
+        )
+        db.session.expire(self, ['average_score', 'total_feedbacks', 'cache_version'])
+
+        HandymanRank.add_rating(self.id, rating, service_group_id)
+
+@event.listens_for(User, 'before_update')
+def bump_cache_version(mapper, connection, user):
+    """Bump cache_version when a cached column changes, so every worker's identity cache drops its copy"""
+    state = db.inspect(user)
+    if any(state.attrs[name].history.has_changes() for name in USER_CACHE_FIELDS if name != 'cache_version'):
+        user.cache_version = User.cache_version + 1
+
+RATING_STARS = (1, 2, 3, 4, 5)
+
+class HandymanRating(db.Model):
+    """Per-handyman rating histogram, maintained incrementally on feedback insert"""
+    handyman_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def average(self):
+        return self.rating_sum / self.rating_count if self.rating_count else 0.0
+
+    def star_count(self, stars):
+        return getattr(self, f'stars_{stars}') or 0
+
+    def set_histogram(self, histogram):
+        """Replace the counts with a {stars: count} mapping"""
+        for stars in RATING_STARS:
+            setattr(self, f'stars_{stars}', histogram.get(stars, 0))
+        self.rating_count = sum(histogram.values())
+        self.rating_sum = sum(stars * count for stars, count in histogram.items())
+        self.updated_at = datetime.utcnow()
+
+    @classmethod
+    def rebuild_for(cls, handyman_id):
+        """Recount one handyman's feedback with a GROUP BY and store the row"""
+        histogram = dict(
+            db.session.query(Feedback.rating, db.func.count(Feedback.id))
+            .filter(Feedback.handyman_id == handyman_id)
+            .group_by(Feedback.rating)
+            .all()
+        )
+        rating_row = db.session.get(cls, handyman_id)
+        if rating_row is None:
+            rating_row = cls(handyman_id=handyman_id)
+            db.session.add(rating_row)
+        rating_row.set_histogram(histogram)
+        db.session.flush()
+        return rating_row
+
+class HandymanRank(db.Model):
+    """Bayesian-adjusted handyman score, overall and per service group
+
+    Rows are kept current as feedback arrives; listings walk
+    ix_handyman_rank_group_score instead of sorting every handyman.
+    """
+    OVERALL = 0  # service_group_id used for the all-groups leaderboard
+
+    id = db.Column(db.Integer, primary_key=True)
+    handyman_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    service_group_id = db.Column(db.Integer, nullable=False, default=OVERALL)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    score = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    handyman = db.relationship('User', foreign_keys=[handyman_id])
+
+    __table_args__ = (
+        db.UniqueConstraint('handyman_id', 'service_group_id', name='uq_handyman_rank_group'),
+        db.Index('ix_handyman_rank_group_score', 'service_group_id', 'score'),
+    )
+
+    @staticmethod
+    def bayesian_score(rating_sum, rating_count):
+        """Average pulled toward the prior mean until there are enough ratings"""
+        weight = app.config['LEADERBOARD_PRIOR_WEIGHT']
+        prior = app.config['LEADERBOARD_PRIOR_MEAN']
+        return (weight * prior + rating_sum) / (weight + rating_count)
+
+    @classmethod
+    def add_rating(cls, handyman_id, rating, service_group_id=None):
+        """Update the overall and group rows for one new rating"""
+        ranks = cls.__table__
+        for group_id in {cls.OVERALL, service_group_id or cls.OVERALL}:
+            # Score first so MySQL, which applies SET left to right, sees old values too
+            updated = db.session.execute(
+                ranks.update()
+                .where(ranks.c.handyman_id == handyman_id)
+                .where(ranks.c.service_group_id == group_id)
+                .ordered_values(
+                    (ranks.c.score, cls.bayesian_score(ranks.c.rating_sum + rating, ranks.c.rating_count + 1)),
+                    (ranks.c.rating_count, ranks.c.rating_count + 1),
+                    (ranks.c.rating_sum, ranks.c.rating_sum + rating),
+                    (ranks.c.updated_at, datetime.utcnow()),
+                )
+            ).rowcount
+            if not updated:
+                cls.rebuild_for(handyman_id)
+                break
+
+    @classmethod
+    def rebuild_for(cls, handyman_id):
+        """Recount one handyman's rows from their feedback"""
+        db.session.flush()
+        rows = (db.session.query(Service.service_group_id, db.func.count(Feedback.id), db.func.sum(Feedback.rating))
+                .select_from(Feedback)
+                .join(Booking, Feedback.booking_id == Booking.id)
+                .join(Service, Booking.service_id == Service.id)
+                .filter(Feedback.handyman_id == handyman_id)
+                .group_by(Service.service_group_id)
+                .all())
+        cls.query.filter_by(handyman_id=handyman_id).delete(synchronize_session=False)
+        db.session.add_all(cls.build_rows(handyman_id, rows))
+        db.session.flush()
+
+    @classmethod
+    def build_rows(cls, handyman_id, group_totals):
+        """Rank rows for one handyman from (group_id, count, sum) totals"""
+        rank_rows = []
+        overall_count = overall_sum = 0
+        for group_id, count, total in group_totals:
+            overall_count += count
+            overall_sum += total or 0
+            rank_rows.append(cls(handyman_id=handyman_id, service_group_id=group_id,
+                                 rating_count=count, rating_sum=total or 0,
+                                 score=cls.bayesian_score(total or 0, count)))
+        if overall_count:
+            rank_rows.append(cls(handyman_id=handyman_id, service_group_id=cls.OVERALL,
+                                 rating_count=overall_count, rating_sum=overall_sum,
+                                 score=cls.bayesian_score(overall_sum, overall_count)))
+        return rank_rows
+
+def rebuild_leaderboard():
+    """Recompute every handyman's rank rows with one GROUP BY
+
+    Needed after changing the prior settings. Returns the number of rows
+    written; the caller commits.
+    """
+    totals = {}
+    rows = (db.session.query(Feedback.handyman_id, Service.service_group_id,
+                             db.func.count(Feedback.id), db.func.sum(Feedback.rating))
+            .select_from(Feedback)
+            .join(Booking, Feedback.booking_id == Booking.id)
+            .join(Service, Booking.service_id == Service.id)
+            .group_by(Feedback.handyman_id, Service.service_group_id)
+            .all())
+    for handyman_id, group_id, count, total in rows:
+        totals.setdefault(handyman_id, []).append((group_id, count, total))
+
+    HandymanRank.query.delete(synchronize_session=False)
+    rank_rows = []
+    for handyman_id, group_totals in totals.items():
+        rank_rows.extend(HandymanRank.build_rows(handyman_id, group_totals))
+    db.session.add_all(rank_rows)
+    return len(rank_rows)
+
+def rebuild_rating_aggregates():
+    """Rebuild every handyman's rating histogram and score from one GROUP BY
+
+    Returns the number of handymen with feedback. The caller commits.
+    """
+    histograms = {}
+    rows = (db.session.query(Feedback.handyman_id, Feedback.rating, db.func.count(Feedback.id))
+            .group_by(Feedback.handyman_id, Feedback.rating)
+            .all())
+    for handyman_id, rating, count in rows:
+        histograms.setdefault(handyman_id, {})[rating] = count
+
+    db.session.query(HandymanRating).delete(synchronize_session=False)
+    rating_rows = []
+    for handyman_id, histogram in histograms.items():
+        rating_row = HandymanRating(handyman_id=handyman_id)
+        rating_row.set_histogram(histogram)
+        rating_rows.append(rating_row)
+    db.session.add_all(rating_rows)
+
+    User.query.update({User.average_score: 0.0, User.total_feedbacks: 0,
+                       User.cache_version: User.cache_version + 1}, synchronize_session=False)
+    db.session.bulk_update_mappings(User, [{
+        'id': rating_row.handyman_id,
+        'average_score': rating_row.average,
+        'total_feedbacks': rating_row.rating_count,
+    } for rating_row in rating_rows])
+    return len(rating_rows)
 
 class ServiceGroup(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -467,7 +790,7 @@ class Service(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    price = db.Column(db.Float, nullable=False)
+    price_cents = db.Column(db.Integer, nullable=False)
     duration_hours = db.Column(db.Integer, nullable=False)
     category = db.Column(db.String(50))
     service_group_id = db.Column(db.Integer, db.ForeignKey('service_group.id'), nullable=False)
@@ -482,6 +805,13 @@ class Service(db.Model):
     service_group = db.relationship('ServiceGroup', backref='services')
     handyman = db.relationship('User', foreign_keys=[handyman_id])
 
+    # Public service listings filter on all three
+    __table_args__ = (
+        db.Index('ix_service_active_approved_group', 'is_active', 'is_approved', 'service_group_id'),
+    )
+
+    price = cents_property('price_cents')
+
 class Booking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -490,7 +820,7 @@ class Booking(db.Model):
     booking_date = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(20), default='pending')
     special_requests = db.Column(db.Text)
-    total_price = db.Column(db.Float, nullable=False)
+    total_price_cents = db.Column(db.Integer, nullable=False)
     admin_approved = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -498,6 +828,14 @@ class Booking(db.Model):
     service = db.relationship('Service')
     handyman = db.relationship('User', foreign_keys=[handyman_id])
 
+    __table_args__ = (
+        db.Index('ix_booking_user_id', 'user_id'),
+        db.Index('ix_booking_handyman_id', 'handyman_id'),
+        db.Index('ix_booking_status', 'status'),
+    )
+
+    total_price = cents_property('total_price_cents')
+
 class Feedback(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=False)
@@ -511,6 +849,10 @@ class Feedback(db.Model):
     user = db.relationship('User', foreign_keys=[user_id])
     handyman = db.relationship('User', foreign_keys=[handyman_id])
 
+    __table_args__ = (
+        db.Index('ix_feedback_handyman_created', 'handyman_id', 'created_at'),
+    )
+
 class WorkHours(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     handyman_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -526,18 +868,177 @@ class Commission(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=False)
     handyman_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    service_price = db.Column(db.Float, nullable=False)
-    commission_amount = db.Column(db.Float, nullable=False)  # 10% of service_price
-    handyman_earnings = db.Column(db.Float, nullable=False)  # 90% of service_price
+    service_price_cents = db.Column(db.Integer, nullable=False)
+    commission_amount_cents = db.Column(db.Integer, nullable=False)  # platform share, see money.split_commission
+    handyman_earnings_cents = db.Column(db.Integer, nullable=False)  # the rest of service_price
     is_paid = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    payout_batch_id = db.Column(db.Integer, db.ForeignKey('payout_batch.id'))
+    paid_at = db.Column(db.DateTime)
 
     booking = db.relationship('Booking')
     handyman = db.relationship('User', foreign_keys=[handyman_id])
 
+    __table_args__ = (
+        db.Index('ix_commission_paid_handyman', 'is_paid', 'handyman_id'),
+        db.Index('ix_commission_payout_batch', 'payout_batch_id', 'handyman_id'),
+        db.Index('ix_commission_handyman_id', 'handyman_id'),
+        db.Index('ix_commission_booking_id', 'booking_id'),
+    )
+
+    service_price = cents_property('service_price_cents')
+    commission_amount = cents_property('commission_amount_cents')
+    handyman_earnings = cents_property('handyman_earnings_cents')
+
+    @classmethod
+    def for_booking(cls, booking, handyman_id):
+        """Build the commission record for a booking's price"""
+        commission_cents, earnings_cents = split_commission(booking.total_price_cents)
+        return cls(booking_id=booking.id,
+                   handyman_id=handyman_id,
+                   service_price_cents=booking.total_price_cents,
+                   commission_amount_cents=commission_cents,
+                   handyman_earnings_cents=earnings_cents)
+
+class PayoutBatch(db.Model):
+    """One payout run: every unpaid commission created before the cutoff"""
+    id = db.Column(db.Integer, primary_key=True)
+    cutoff = db.Column(db.DateTime, nullable=False)
+    created_by_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    handyman_count = db.Column(db.Integer, default=0)
+    commission_count = db.Column(db.Integer, default=0)
+    total_earnings_cents = db.Column(db.Integer, default=0)
+    total_commission_cents = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    created_by = db.relationship('User', foreign_keys=[created_by_id])
+
+    total_earnings = cents_property('total_earnings_cents')
+    total_commission = cents_property('total_commission_cents')
+
+    @property
+    def paid_through(self):
+        """Last day included in the run (cutoff is exclusive)"""
+        return (self.cutoff - timedelta(days=1)).date()
+
+class LedgerEntry(db.Model):
+    """Append-only handyman earnings entry: accruals are positive, reversals and payouts negative"""
+    id = db.Column(db.Integer, primary_key=True)
+    handyman_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    entry_type = db.Column(db.String(20), nullable=False)  # accrual, reversal or payout
+    amount_cents = db.Column(db.Integer, nullable=False)
+    commission_id = db.Column(db.Integer)  # no foreign key: entries outlive deleted commissions
+    payout_batch_id = db.Column(db.Integer, db.ForeignKey('payout_batch.id'))
+    balance_after_cents = db.Column(db.Integer, nullable=False)
+    lifetime_after_cents = db.Column(db.Integer, nullable=False)  # running total of accruals
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_ledger_entry_handyman_created', 'handyman_id', 'created_at'),
+    )
+
+    amount = cents_property('amount_cents')
+    balance_after = cents_property('balance_after_cents')
+    lifetime_after = cents_property('lifetime_after_cents')
+
+class HandymanBalance(db.Model):
+    """Current ledger totals per handyman, updated with every entry"""
+    handyman_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    balance_cents = db.Column(db.Integer, nullable=False, default=0)  # earned but not yet paid
+    lifetime_earnings_cents = db.Column(db.Integer, nullable=False, default=0)
+    total_paid_cents = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    balance = cents_property('balance_cents')
+    lifetime_earnings = cents_property('lifetime_earnings_cents')
+    total_paid = cents_property('total_paid_cents')
+
+def place_booking(user_id, service, booking_date, special_requests):
+    """Create a booking with its commission and ledger accrual in one write
+
+    Returns (booking_id, commission_amount, handyman_earnings).
+    """
+    service_id, price_cents, handyman_id = service.id, service.price_cents, service.handyman_id
+
+    def create_booking():
+        booking = Booking(
+            user_id=user_id,
+            service_id=service_id,
+            booking_date=booking_date,
+            special_requests=special_requests,
+            total_price_cents=price_cents,
+            status='pending'
+        )
+        db.session.add(booking)
+        db.session.flush()
+
+        # Calculate and create commission record
+        commission = Commission.for_booking(booking, handyman_id)
+        db.session.add(commission)
+        record_accrual(commission)
+        return booking.id, commission.commission_amount, commission.handyman_earnings
+
+    return run_write(create_booking)
+
+def user_deletion_blocker(user_id):
+    """Why a user cannot be deleted without losing payment records, or None"""
+    paid = (db.session.query(Commission.id)
+            .join(Booking, Commission.booking_id == Booking.id)
+            .filter(Booking.user_id == user_id,
+                    db.or_(Commission.is_paid.is_(True), Commission.payout_batch_id.isnot(None)))
+            .first())
+    if paid:
+        return 'This user has bookings that were already paid out; those records must be kept.'
+    if (Commission.query.filter_by(handyman_id=user_id).first()
+            or LedgerEntry.query.filter_by(handyman_id=user_id).first()):
+        return 'This handyman has earnings records; revoke their approval instead of deleting the account.'
+    if db.session.query(Booking.id).join(Service).filter(Service.handyman_id == user_id).first():
+        return "This handyman's services have bookings; revoke their approval instead of deleting the account."
+    return None
+
+def delete_user_records(user_id):
+    """Delete the rows that reference a user, in foreign key order; the caller deletes the user and commits
+
+    Unpaid commissions on the user's bookings are reversed in the handyman's
+    ledger before they go. Check user_deletion_blocker first.
+    """
+    booking_ids = [row[0] for row in db.session.query(Booking.id).filter(Booking.user_id == user_id)]
+    Feedback.query.filter(db.or_(Feedback.user_id == user_id, Feedback.handyman_id == user_id,
+                                 Feedback.booking_id.in_(booking_ids))).delete(synchronize_session=False)
+    for commission in Commission.query.filter(Commission.booking_id.in_(booking_ids)).all():
+        reverse_accrual(commission)
+        db.session.delete(commission)
+    db.session.flush()
+    Booking.query.filter(Booking.id.in_(booking_ids)).delete(synchronize_session=False)
+    Booking.query.filter_by(handyman_id=user_id).update({Booking.handyman_id: None}, synchronize_session=False)
+
+    # Handyman side (only reached without bookings or earnings, see user_deletion_blocker)
+    HandymanRating.query.filter_by(handyman_id=user_id).delete(synchronize_session=False)
+    HandymanRank.query.filter_by(handyman_id=user_id).delete(synchronize_session=False)
+    HandymanBalance.query.filter_by(handyman_id=user_id).delete(synchronize_session=False)
+    WorkHours.query.filter_by(handyman_id=user_id).delete(synchronize_session=False)
+    Service.query.filter_by(handyman_id=user_id).delete(synchronize_session=False)
+    PayoutBatch.query.filter_by(created_by_id=user_id).update({PayoutBatch.created_by_id: None},
+                                                              synchronize_session=False)
+
+def current_user_version(user_id):
+    """The row's cache_version, or None if the user is gone"""
+    return db.session.query(User.cache_version).filter(User.id == user_id).scalar()
+
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    user_id = int(user_id)
+    fields, version = lookup_cached_user(user_id, current_user_version)
+    if fields is not None:
+        # Attach the cached row to this session without a SELECT
+        user = User(**fields)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        store_cached_user(user, version)
+    return user
 
 # Forms
 class RegistrationForm(FlaskForm):
@@ -654,6 +1155,7 @@ class WorkHoursForm(FlaskForm):
 
 # Routes
 @app.route('/')
+@replica_reads
 def index():
     try:
         # Check if modern landing page exists and serve it
@@ -714,11 +1216,12 @@ def register():
             user.set_password(form.password.data)
             user.is_approved = True  # Auto-approve for now
 
-            db.session.add(user)
-            db.session.commit()
+            run_write(lambda: db.session.add(user))
 
             flash('Registreerimine õnnestus! Palun logige sisse.', 'success')
             return redirect(url_for('login'))
+        except PasswordHashBusy:
+            flash('Server busy, please try again.', 'error')
         except Exception as e:
             db.session.rollback()
             flash('Registration failed. Please try again.', 'error')
@@ -733,6 +1236,8 @@ def login():
         try:
             user = User.query.filter_by(username=form.username.data).first()
             if user and user.check_password(form.password.data):
+                if db.session.is_modified(user):
+                    db.session.commit()
                 login_user(user)
                 flash('Sisselogimine õnnestus!', 'success')
 
@@ -744,6 +1249,8 @@ def login():
                     return redirect(url_for('user_dashboard'))
             else:
                 flash('Invalid username or password.', 'error')
+        except PasswordHashBusy:
+            flash('Server busy, please try again.', 'error')
         except Exception as e:
             app.logger.error(f"Login error for user {form.username.data}: {str(e)}")
             flash('Login failed. Please try again.', 'error')
@@ -759,6 +1266,7 @@ def logout():
 
 @app.route('/user/dashboard')
 @login_required
+@replica_reads
 def user_dashboard():
     if current_user.role != USER:
         flash('Access denied.', 'error')
@@ -773,6 +1281,7 @@ def user_dashboard():
 
 @app.route('/services')
 @login_required
+@replica_reads
 def services():
     """Display all service groups for customers to choose from"""
     if current_user.role != USER:
@@ -788,6 +1297,7 @@ def services():
 
 @app.route('/services/group/<int:group_id>')
 @login_required
+@replica_reads
 def services_by_group(group_id):
     """Display services within a specific group"""
     if current_user.role != USER:
@@ -847,31 +1357,8 @@ def book_service(service_id):
                     flash('Please select a future date and time.', 'error')
                     return render_template('book_service.html', form=form, service=service)
 
-                booking = Booking(
-                    user_id=current_user.id,
-                    service_id=service_id,
-                    booking_date=booking_date,
-                    special_requests=form.special_requests.data,
-                    total_price=service.price,
-                    status='pending'
-                )
-
-                db.session.add(booking)
-                db.session.commit()
-
-                # Calculate and create commission record
-                commission_amount = service.price * 0.10  # 10% commission
-                handyman_earnings = service.price * 0.90  # 90% to handyman
-
-                commission = Commission(
-                    booking_id=booking.id,
-                    handyman_id=service.handyman_id,
-                    service_price=service.price,
-                    commission_amount=commission_amount,
-                    handyman_earnings=handyman_earnings
-                )
-                db.session.add(commission)
-                db.session.commit()
+                booking_id, commission_amount, handyman_earnings = place_booking(
+                    current_user.id, service, booking_date, form.special_requests.data)
 
                 # Send email notifications
                 try:
@@ -948,6 +1435,7 @@ def book_service(service_id):
 
 @app.route('/admin/dashboard')
 @login_required
+@reporting_reads
 def admin_dashboard():
     if current_user.role != ADMIN:
         flash('Access denied.', 'error')
@@ -975,9 +1463,11 @@ def admin_dashboard():
             completed_jobs += len([b for b in bookings if b.status == 'completed'])
 
         # Calculate commission statistics
-        total_commissions = Commission.query.filter_by(is_paid=False).all()
-        total_commission_amount = sum(c.commission_amount for c in total_commissions)
-        total_handyman_earnings = sum(c.handyman_earnings for c in total_commissions)
+        total_commission_amount = from_cents(
+            db.session.query(db.func.coalesce(db.func.sum(Commission.commission_amount_cents), 0))
+            .filter(Commission.is_paid == False)
+            .scalar())
+        total_handyman_earnings = from_cents(total_unpaid_earnings())
 
         return render_template('admin_dashboard.html',
                              total_users=total_users,
@@ -992,7 +1482,8 @@ def admin_dashboard():
                              completed_jobs=completed_jobs,
                              approved_handymen_count=len(approved_handymen),
                              total_commission_amount=total_commission_amount,
-                             total_handyman_earnings=total_handyman_earnings)
+                             total_handyman_earnings=total_handyman_earnings,
+                             snapshot_age=snapshot_age(app))
     except Exception as e:
         print(f"Error loading admin dashboard: {e}")
         return render_template('admin_dashboard.html',
@@ -1012,6 +1503,7 @@ def admin_dashboard():
 
 @app.route('/admin/services')
 @login_required
+@replica_reads
 def admin_services():
     if current_user.role != ADMIN:
         flash('Access denied.', 'error')
@@ -1061,6 +1553,7 @@ def add_service():
 
 @app.route('/admin/bookings')
 @login_required
+@replica_reads
 def admin_bookings():
     if current_user.role != ADMIN:
         flash('Access denied.', 'error')
@@ -1117,6 +1610,10 @@ def delete_service(service_id):
 
     service = Service.query.get_or_404(service_id)
 
+    if Booking.query.filter_by(service_id=service_id).first():
+        flash('This service has bookings; deactivate it instead of deleting it.', 'error')
+        return redirect(url_for('admin_services'))
+
     try:
         db.session.delete(service)
         db.session.commit()
@@ -1168,6 +1665,7 @@ def approve_handyman(user_id):
     if user.role == HANDYMAN:
         user.is_approved = True
         db.session.commit()
+        invalidate_user(user.id)
         flash(f'Handyman {user.username} has been approved.', 'success')
 
     return redirect(url_for('admin_users'))
@@ -1195,6 +1693,7 @@ def assign_handyman(booking_id):
 
 @app.route('/admin/users')
 @login_required
+@replica_reads
 def admin_users():
     if current_user.role != ADMIN:
         flash('Access denied.', 'error')
@@ -1205,6 +1704,7 @@ def admin_users():
         # Get handyman statistics for display
         handyman_stats = []
         handymen = User.query.filter_by(role=HANDYMAN, is_approved=True).all()
+        balances = get_balances([handyman.id for handyman in handymen])
         for handyman in handymen:
             # Get bookings for this handyman
             bookings = Booking.query.filter_by(handyman_id=handyman.id).all()
@@ -1213,9 +1713,9 @@ def admin_users():
             in_progress_count = len([b for b in bookings if b.status == 'in_progress'])
             completed_count = len([b for b in bookings if b.status == 'completed'])
 
-            # Get handyman earnings from Commission table for completed jobs
-            completed_commissions = Commission.query.filter_by(handyman_id=handyman.id).all()
-            total_earnings = sum(commission.handyman_earnings for commission in completed_commissions)
+            # Lifetime earnings come from the ledger balance row
+            balance = balances.get(handyman.id)
+            total_earnings = balance.lifetime_earnings if balance else 0.0
 
             handyman_stats.append({
                 'handyman': handyman,
@@ -1258,6 +1758,7 @@ def edit_user(user_id):
             user.phone = form.phone.data
 
             db.session.commit()
+            invalidate_user(user.id)
             flash(f'User {user.username} has been updated successfully!', 'success')
             return redirect(url_for('admin_users'))
         except Exception as e:
@@ -1276,6 +1777,7 @@ def edit_user(user_id):
 
 @app.route('/handyman/dashboard')
 @login_required
+@replica_reads
 def handyman_dashboard():
     if current_user.role != HANDYMAN:
         flash('Access denied.', 'error')
@@ -1305,8 +1807,9 @@ def update_booking_status(booking_id):
 
     new_status = request.form.get('status')
     if new_status in ['in_progress', 'completed']:
-        booking.status = new_status
-        db.session.commit()
+        def set_status():
+            db.session.get(Booking, booking_id).status = new_status
+        run_write(set_status)
         flash('Broneeringu staatus uuendatud!', 'success')
     else:
         flash('Invalid status.', 'error')
@@ -1336,20 +1839,23 @@ def leave_feedback(booking_id):
     form = FeedbackForm()
     if form.validate_on_submit():
         try:
-            feedback = Feedback(
-                booking_id=booking_id,
-                user_id=current_user.id,
-                handyman_id=booking.handyman_id,
-                rating=form.rating.data,
-                comment=form.comment.data
-            )
-            db.session.add(feedback)
-            db.session.commit()
-
-            # Update handyman's score
-            handyman = booking.handyman
-            handyman.update_score()
-            db.session.commit()
+            user_id, handyman_id = current_user.id, booking.handyman_id
+            service_group_id = booking.service.service_group_id
+            rating, comment = form.rating.data, form.comment.data
+
+            def save_feedback():
+                db.session.add(Feedback(
+                    booking_id=booking_id,
+                    user_id=user_id,
+                    handyman_id=handyman_id,
+                    rating=rating,
+                    comment=comment
+                ))
+                # Update handyman's score in the same transaction
+                db.session.get(User, handyman_id).add_rating(rating, service_group_id)
+
+            run_write(save_feedback)
+            invalidate_user(handyman_id)
 
             flash('Thank you for your feedback!', 'success')
             return redirect(url_for('user_dashboard'))
@@ -1362,6 +1868,7 @@ def leave_feedback(booking_id):
 
 @app.route('/handyman/feedback')
 @login_required
+@replica_reads
 def handyman_feedback():
     """Show handyman their feedback"""
     if current_user.role != HANDYMAN:
@@ -1369,33 +1876,34 @@ def handyman_feedback():
         return redirect(url_for('index'))
 
     try:
-        # Get all feedback for this handyman with related data
-        feedbacks = Feedback.query.filter_by(handyman_id=current_user.id).all()
-
-        # Calculate statistics
-        total_feedbacks = len(feedbacks)
-        avg_rating = 0.0
-        five_star_count = 0
-        four_plus_count = 0
-
-        if feedbacks:
-            ratings = [f.rating for f in feedbacks]
-            avg_rating = sum(ratings) / len(ratings)
-            five_star_count = len([r for r in ratings if r == 5])
-            four_plus_count = len([r for r in ratings if r >= 4])
-
-        # Debug: Print feedback count
-        print(f"Found {total_feedbacks} feedback records for handyman {current_user.id}")
+        # Summary comes from the precomputed histogram
+        rating_row = db.session.get(HandymanRating, current_user.id) or HandymanRating(handyman_id=current_user.id)
+        total_feedbacks = rating_row.rating_count or 0
+        five_star_count = rating_row.star_count(5)
+        four_plus_count = rating_row.star_count(4) + five_star_count
+
+        # One page of feedback, newest first, walking ix_feedback_handyman_created
+        page = request.args.get('page', 1, type=int)
+        per_page = app.config['FEEDBACK_PER_PAGE']
+        feedbacks = (Feedback.query
+                     .filter_by(handyman_id=current_user.id)
+                     .options(db.joinedload(Feedback.user),
+                              db.joinedload(Feedback.booking).joinedload(Booking.service))
+                     .order_by(Feedback.created_at.desc())
+                     .limit(per_page)
+                     .offset((max(page, 1) - 1) * per_page)
+                     .all())
+        pagination = Pagination(None, max(page, 1), per_page, total_feedbacks, feedbacks)
 
         return render_template('handyman_feedback.html',
                              feedbacks=feedbacks,
+                             pagination=pagination,
                              total_feedbacks=total_feedbacks,
-                             avg_rating=avg_rating,
+                             avg_rating=rating_row.average,
                              five_star_count=five_star_count,
                              four_plus_count=four_plus_count)
     except Exception as e:
-        print(f"Error loading handyman feedback: {e}")
-        traceback.print_exc()
+        app.logger.error(f"Error loading handyman feedback: {e}")
         flash('Error loading feedback. Please try again.', 'error')
         return redirect(url_for('handyman_dashboard'))
 
@@ -1450,6 +1958,7 @@ def password_reset(token):
             user.set_password(form.password.data)
             user.clear_reset_token()
             db.session.commit()
+            invalidate_user(user.id)
 
             flash(_('Your password has been updated!'), 'success')
             return redirect(url_for('login'))
@@ -1472,17 +1981,29 @@ def delete_user(user_id):
 
     user = User.query.get_or_404(user_id)
 
-    try:
-        # Delete user's feedback
-        Feedback.query.filter_by(user_id=user_id).delete()
-        Feedback.query.filter_by(handyman_id=user_id).delete()
+    blocker = user_deletion_blocker(user_id)
+    if blocker:
+        flash(blocker, 'error')
+        return redirect(url_for('admin_users'))
 
-        # Delete user's bookings
-        Booking.query.filter_by(user_id=user_id).delete()
+    try:
+        # Handymen this customer reviewed need their scores recounted
+        rated_handyman_ids = [row[0] for row in db.session.query(Feedback.handyman_id)
+                              .filter(Feedback.user_id == user_id, Feedback.handyman_id != user_id)
+                              .distinct()]
+
+        # Delete user's feedback, bookings (with their commissions) and services
+        delete_user_records(user_id)
+        for handyman in User.query.filter(User.id.in_(rated_handyman_ids)).all():
+            handyman.update_score()
+            HandymanRank.rebuild_for(handyman.id)
 
         # Delete the user
         db.session.delete(user)
         db.session.commit()
+        invalidate_user(user_id)
+        for handyman_id in rated_handyman_ids:
+            invalidate_user(handyman_id)
 
         flash(f'User {user.username} has been deleted successfully.', 'success')
     except Exception as e:
@@ -1495,6 +2016,7 @@ def delete_user(user_id):
 # Service Group Management Routes
 @app.route('/admin/service-groups')
 @login_required
+@replica_reads
 def admin_service_groups():
     if current_user.role != ADMIN:
         flash('Access denied.', 'error')
@@ -1579,6 +2101,10 @@ def delete_service_group(group_id):
 
     service_group = ServiceGroup.query.get_or_404(group_id)
 
+    if Service.query.filter_by(service_group_id=group_id).first():
+        flash('This service group still has services; move or delete them first.', 'error')
+        return redirect(url_for('admin_service_groups'))
+
     try:
         db.session.delete(service_group)
         db.session.commit()
@@ -1593,6 +2119,7 @@ def delete_service_group(group_id):
 # Handyman Service Management Routes
 @app.route('/handyman/services')
 @login_required
+@replica_reads
 def handyman_services():
     if current_user.role != HANDYMAN:
         flash('Access denied.', 'error')
@@ -1715,6 +2242,10 @@ def delete_handyman_service(service_id):
         flash('Access denied.', 'error')
         return redirect(url_for('handyman_services'))
 
+    if Booking.query.filter_by(service_id=service_id).first():
+        flash('This service has bookings; deactivate it instead of deleting it.', 'error')
+        return redirect(url_for('handyman_services'))
+
     try:
         db.session.delete(service)
         db.session.commit()
@@ -1729,6 +2260,7 @@ def delete_handyman_service(service_id):
 # Work Hours Management Routes
 @app.route('/handyman/work-hours')
 @login_required
+@replica_reads
 def handyman_work_hours():
     if current_user.role != HANDYMAN:
         flash('Access denied.', 'error')
@@ -1771,6 +2303,7 @@ def add_work_hours():
 # Admin Service Approval Routes
 @app.route('/admin/pending-services')
 @login_required
+@replica_reads
 def admin_pending_services():
     if current_user.role != ADMIN:
         flash('Access denied.', 'error')
@@ -1804,6 +2337,9 @@ def reject_service(service_id):
         return redirect(url_for('index'))
 
     service = Service.query.get_or_404(service_id)
+    if Booking.query.filter_by(service_id=service_id).first():
+        flash('This service has bookings; deactivate it instead of deleting it.', 'error')
+        return redirect(url_for('admin_pending_services'))
     db.session.delete(service)
     db.session.commit()
     flash(f'Service "{service.name}" has been rejected and deleted.', 'info')
@@ -1812,6 +2348,7 @@ def reject_service(service_id):
 # Commission Management Routes
 @app.route('/admin/commissions')
 @login_required
+@replica_reads
 def admin_commissions():
     if current_user.role != ADMIN:
         flash('Access denied.', 'error')
@@ -1819,8 +2356,11 @@ def admin_commissions():
 
     try:
         commissions = Commission.query.all()
-        total_commission = sum(c.commission_amount for c in commissions if not c.is_paid)
-        total_earnings = sum(c.handyman_earnings for c in commissions if not c.is_paid)
+        total_commission = from_cents(
+            db.session.query(db.func.coalesce(db.func.sum(Commission.commission_amount_cents), 0))
+            .filter(Commission.is_paid == False)
+            .scalar())
+        total_earnings = from_cents(total_unpaid_earnings())
 
         return render_template('admin_commissions.html',
                              commissions=commissions,
@@ -1830,7 +2370,7 @@ def admin_commissions():
         print(f"Error loading commissions: {e}")
         return render_template('admin_commissions.html', commissions=[], total_commission=0, total_earnings=0)
 
-@app.route('/admin/mark-commission-paid/<int:commission_id>')
+@app.route('/admin/mark-commission-paid/<int:commission_id>', methods=['GET', 'POST'])
 @login_required
 def mark_commission_paid(commission_id):
     if current_user.role != ADMIN:
@@ -1838,21 +2378,148 @@ def mark_commission_paid(commission_id):
         return redirect(url_for('index'))
 
     commission = Commission.query.get_or_404(commission_id)
-    commission.is_paid = True
-    db.session.commit()
+    if not commission.is_paid:
+        commission.is_paid = True
+        commission.paid_at = datetime.utcnow()
+        record_payout(commission.handyman_id, commission.handyman_earnings_cents, commission_id=commission.id)
+        db.session.commit()
     flash('Commission marked as paid.', 'success')
     return redirect(url_for('admin_commissions'))
 
+def parse_payout_cutoff(value):
+    """Turn a YYYY-MM-DD date into the exclusive cutoff after that day"""
+    return datetime.strptime(value, '%Y-%m-%d') + timedelta(days=1)
+
+@app.route('/admin/payouts')
+@login_required
+@replica_reads
+def admin_payouts():
+    if current_user.role != ADMIN:
+        flash('Access denied.', 'error')
+        return redirect(url_for('index'))
+
+    try:
+        cutoff_date = request.args.get('cutoff') or datetime.utcnow().strftime('%Y-%m-%d')
+        preview = payout_preview(parse_payout_cutoff(cutoff_date))
+        handymen = {u.id: u for u in User.query.filter(User.id.in_([row[0] for row in preview])).all()}
+        batches = PayoutBatch.query.order_by(PayoutBatch.id.desc()).limit(20).all()
+        return render_template('admin_payouts.html',
+                             cutoff_date=cutoff_date,
+                             preview=preview,
+                             handymen=handymen,
+                             batches=batches)
+    except ValueError:
+        flash('Invalid cutoff date.', 'error')
+        return redirect(url_for('admin_payouts'))
+
+@app.route('/admin/payouts/run', methods=['POST'])
+@login_required
+def run_payouts():
+    if current_user.role != ADMIN:
+        flash('Access denied.', 'error')
+        return redirect(url_for('index'))
+
+    try:
+        batch = run_payout(parse_payout_cutoff(request.form.get('cutoff', '')), current_user.id)
+        if batch:
+            flash(f'Payout batch #{batch.id}: paid {batch.commission_count} commissions '
+                  f'to {batch.handyman_count} handymen (${batch.total_earnings:.2f}).', 'success')
+        else:
+            flash('No unpaid commissions before that date.', 'info')
+    except ValueError:
+        flash('Invalid cutoff date.', 'error')
+    except Exception as e:
+        app.logger.error(f"Payout run error: {str(e)}")
+        flash('Payout run failed. Please try again.', 'error')
+    return redirect(url_for('admin_payouts'))
+
+@app.route('/admin/payouts/<int:batch_id>/statement.<fmt>')
+@login_required
+@replica_reads
+def payout_statement(batch_id, fmt):
+    if current_user.role != ADMIN:
+        flash('Access denied.', 'error')
+        return redirect(url_for('index'))
+
+    PayoutBatch.query.get_or_404(batch_id)
+    if fmt == 'csv':
+        generator, mimetype = stream_statement_csv(batch_id), 'text/csv'
+    elif fmt == 'json':
+        generator, mimetype = stream_statement_json(batch_id), 'application/json'
+    else:
+        return redirect(url_for('admin_payouts'))
+
+    response = Response(stream_with_context(generator), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=payout-{batch_id}.{fmt}'
+    return response
+
+@app.route('/admin/export/<kind>.<fmt>')
+@login_required
+@reporting_reads
+def admin_export(kind, fmt):
+    if current_user.role != ADMIN:
+        flash('Access denied.', 'error')
+        return redirect(url_for('index'))
+
+    if kind not in EXPORTS or fmt not in EXPORT_FORMATS:
+        return redirect(url_for('admin_dashboard'))
+    try:
+        since = parse_export_date(request.args.get('since'))
+        until = parse_export_date(request.args.get('until'), end=True)
+    except ValueError:
+        flash('Invalid export date.', 'error')
+        return redirect(url_for('admin_dashboard'))
+    status = request.args.get('status') or None
+    try:
+        validate_export_status(kind, status)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin_dashboard'))
+
+    generator = stream_export(kind, fmt, since, until, status)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generator), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={kind}.{fmt}'
+    return response
+
 # Initialize API blueprint
 init_api(app)
 
 # Initialize database
 @app.cli.command('init-db')
 def init_db():
-    """Initialize the database."""
-    db.create_all()
+    """Initialize the database and bring an existing schema up to date."""
+    upgrade_database(db.engine)
     print('Database initialized!')
 
+def report_database_settings():
+    """Print the effective connection settings and warn about any the database refused"""
+    report = database_settings(db.engine)
+    print(f"Database backend: {report['backend']}")
+    for name, value in report['settings'].items():
+        print(f"  {name} = {value}")
+    for mismatch in report['mismatches']:
+        print(f"WARNING: {mismatch}")
+    return report
+
+# Show the effective database settings
+@app.cli.command('db-settings')
+def db_settings():
+    """Report the connection settings the database actually applied."""
+    if report_database_settings()['mismatches']:
+        raise SystemExit(1)
+
+# Apply schema migrations; run this before starting gunicorn
+@app.cli.command('migrate')
+@click.option('--status', is_flag=True, help='List migrations and whether they are applied.')
+def migrate(status):
+    """Apply pending schema migrations in order."""
+    if status:
+        for version, description, applied in migration_status(db.engine):
+            print(f"{'[x]' if applied else '[ ]'} {version:3d}  {description}")
+        return
+    upgrade_database(db.engine)
+
 # Create admin user
 @app.cli.command('create-admin')
 def create_admin():
@@ -1924,45 +2591,191 @@ def create_service_groups():
     except Exception as e:
         print(f'Error creating service groups: {e}')
 
+# Rebuild rating aggregates
+@app.cli.command('rebuild-ratings')
+def rebuild_ratings():
+    """Recompute all handyman rating histograms and scores from feedback."""
+    try:
+        count = rebuild_rating_aggregates()
+        db.session.commit()
+        print(f'Rebuilt rating aggregates for {count} handymen')
+    except Exception as e:
+        db.session.rollback()
+        print(f'Error rebuilding ratings: {e}')
+
+# Rebuild leaderboard scores
+@app.cli.command('rebuild-leaderboard')
+def rebuild_leaderboard_command():
+    """Recompute Bayesian handyman scores from feedback."""
+    try:
+        count = rebuild_leaderboard()
+        db.session.commit()
+        print(f'Rebuilt {count} leaderboard rows')
+    except Exception as e:
+        db.session.rollback()
+        print(f'Error rebuilding leaderboard: {e}')
+
+# Rebuild the earnings ledger
+@app.cli.command('rebuild-ledger')
+def rebuild_ledger_command():
+    """Rebuild ledger entries and balances from existing commissions."""
+    try:
+        count = rebuild_ledger()
+        db.session.commit()
+        print(f'Wrote {count} ledger entries')
+    except Exception as e:
+        db.session.rollback()
+        print(f'Error rebuilding ledger: {e}')
+
+# Pay out commissions
+@app.cli.command('payout-run')
+@click.option('--cutoff', required=True, help='Pay commissions created up to and including this date (YYYY-MM-DD).')
+@click.option('--statement', type=click.Path(dir_okay=False, writable=True), help='Write the CSV statement to this file.')
+def payout_run(cutoff, statement):
+    """Mark all unpaid commissions up to a date as paid in one batch."""
+    try:
+        batch = run_payout(parse_payout_cutoff(cutoff))
+        if not batch:
+            print('No unpaid commissions before that date.')
+            return
+        print(f'Payout batch #{batch.id}: {batch.commission_count} commissions, '
+              f'{batch.handyman_count} handymen, ${batch.total_earnings:.2f}')
+        if statement:
+            with open(statement, 'w', newline='') as f:
+                for chunk in stream_statement_csv(batch.id):
+                    f.write(chunk)
+            print(f'Statement written to {statement}')
+    except Exception as e:
+        print(f'Error running payout: {e}')
+
+# Create missing commission records and report any that do not reconcile
+@app.cli.command('reconcile-commissions')
+@click.option('--dry-run', is_flag=True, help='Only report discrepancies, do not insert anything.')
+@click.option('--chunk-size', default=5000, help='Commissions inserted per transaction.')
+def reconcile_commissions_command(dry_run, chunk_size):
+    """Backfill commissions for bookings that have none."""
+    try:
+        print_reconcile_report(reconcile_commissions(dry_run=dry_run, chunk_size=chunk_size))
+        if dry_run:
+            print('Dry run: no changes made')
+    except Exception as e:
+        print(f'Error reconciling commissions: {e}')
+
+# Stream a table export to a file or stdout
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='csv', help='Output format.')
+@click.option('--since', help='Only rows created on or after this date (YYYY-MM-DD).')
+@click.option('--until', help='Only rows created on or before this date (YYYY-MM-DD).')
+@click.option('--status', help='Booking status, paid/unpaid for commissions, or role for users.')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Output file (default: stdout).')
+def export_command(kind, fmt, since, until, status, output):
+    """Export bookings, commissions or users as CSV or NDJSON."""
+    try:
+        for chunk in stream_export(kind, fmt, parse_export_date(since), parse_export_date(until, end=True), status):
+            output.write(chunk)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+# Take a fresh reporting snapshot now (e.g. from cron) instead of on demand
+@app.cli.command('refresh-snapshot')
+def refresh_snapshot_command():
+    """Copy the database to the reporting snapshot with the online backup API."""
+    try:
+        pages = refresh_snapshot(app)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    if pages is None:
+        print('Another process is already refreshing the snapshot')
+        return
+    stats = reporting_stats(app)
+    print(f"Snapshot {stats['path']}: {pages} pages in {stats['last_duration_ms']}ms")
+
+# Show the slowest recent statements from the log file
+@app.cli.command('slow-queries')
+@click.option('--limit', default=20, help='Number of entries to show.')
+@click.option('--json', 'as_json', is_flag=True, help='Print raw JSON lines.')
+def slow_queries_command(limit, as_json):
+    """Dump the newest slow-query log entries with their query plans."""
+    entries = read_slow_query_log(app.config['SLOW_QUERY_LOG_FILE'], limit)
+    if not entries:
+        print(f"No slow queries logged in {app.config['SLOW_QUERY_LOG_FILE']}")
+    for entry in entries:
+        if as_json:
+            print(json.dumps(entry))
+            continue
+        print(f"{entry['at']}  {entry['ms']}ms  {entry['method'] or ''} {entry['endpoint'] or '(no request)'}")
+        print(f"  {entry['statement']}")
+        print(f"  params: {entry['parameters']}")
+        for line in entry['plan'] or []:
+            print(f"  plan: {line}")
+
+# Copy all data to another database, e.g. SQLite to PostgreSQL before a cutover
+@app.cli.command('migrate-data')
+@click.option('--to', 'target_uri', required=True, help='SQLAlchemy URI of the (empty) target database.')
+@click.option('--chunk-size', default=5000, help='Rows per insert and checkpoint.')
+def migrate_data_command(target_uri, chunk_size):
+    """Copy every table to another database in primary-key chunks; re-run to resume."""
+    try:
+        migrate_data(db.engine, target_uri, app.config, chunk_size)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+# Fill the database with a large synthetic dataset for benchmarks and scale testing
+@app.cli.command('seed')
+@click.option('--users', default=10000, help='Customer accounts to create.')
+@click.option('--bookings', default=100000, help='Bookings to create (each with a commission).')
+@click.option('--handymen', type=int, help='Handyman accounts to create (default: one per 20 customers).')
+@click.option('--days', default=730, help='Days of booking history before the end date.')
+@click.option('--seed', 'seed_value', default=42, help='Random seed; the same seed gives the same data.')
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day of history (default: today).')
+@click.option('--chunk-size', default=10000, help='Rows per insert.')
+def seed_command(users, bookings, handymen, days, seed_value, end_date, chunk_size):
+    """Generate customers, handymen, services, bookings, commissions and feedback."""
+    try:
+        seed_database(db.engine, users, bookings, handymen, days, seed_value,
+                      end_date.date() if end_date else None, chunk_size)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+# Back up the live database (SQLite backup API or pg_dump)
+@app.cli.command('backup')
+@click.option('--if-due', is_flag=True, help='Only back up if the newest backup is older than BACKUP_INTERVAL_HOURS.')
+@click.option('--output-dir', type=click.Path(file_okay=False), help='Write the backup here instead of BACKUP_DIR.')
+def backup_command(if_due, output_dir):
+    """Copy the database without stopping the app and verify the copy."""
+    try:
+        if if_due:
+            if backup_if_due(db.engine) is None:
+                print('No backup due')
+            return
+        result = run_backup(db.engine, output_dir)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    for table, rows in sorted(result['tables'].items()):
+        print(f"  {table}: {rows if rows is not None else 'data dumped'}")
+
+# Measure password hashing cost with the current parameters
+@app.cli.command('hash-benchmark')
+@click.option('--rounds', default=20, help='Number of hashes to time.')
+def hash_benchmark(rounds):
+    """Time password hashing to tune cost against the latency budget."""
+    for _ in range(rounds):
+        pwhash = hash_password(secrets.token_urlsafe(12))
+        verify_password(pwhash, 'benchmark')
+    stats = hash_stats()
+    print(f"Method: {stats['method']} (salt length {stats['salt_length']}, {stats['workers']} workers)")
+    for kind in ('hash', 'verify'):
+        s = stats[kind]
+        print(f"{kind}: avg {s['avg_ms']}ms, p50 {s['p50_ms']}ms, p95 {s['p95_ms']}ms, max {s['max_ms']}ms")
+    print(f"Latency budget: {stats['budget_ms']:.0f}ms")
+
 if __name__ == '__main__':
     with app.app_context():
         try:
-            # Test database connection and create tables
-            db.create_all()
+            upgrade_database(db.engine)
+            report_database_settings()
         except Exception as e:
-            print(f"Database error: {e}")
-            # If database schema is outdated, try to add missing columns
-            try:
-                # Check if we need to add missing columns to existing tables
-                inspector = db.inspect(db.engine)
-
-                # Check User table columns
-                user_columns = [col['name'] for col in inspector.get_columns('user')]
-                if 'reset_token' not in user_columns:
-                    db.engine.execute("ALTER TABLE user ADD COLUMN reset_token VARCHAR(100)")
-                    print("Added reset_token column to user table")
-                if 'reset_token_expiry' not in user_columns:
-                    db.engine.execute("ALTER TABLE user ADD COLUMN reset_token_expiry DATETIME")
-                    print("Added reset_token_expiry column to user table")
-                if 'admin_approved' not in user_columns:
-                    db.engine.execute("ALTER TABLE user ADD COLUMN admin_approved BOOLEAN DEFAULT 0")
-                    print("Added admin_approved column to user table")
-
-                # Check Booking table columns
-                booking_columns = [col['name'] for col in inspector.get_columns('booking')]
-                if 'admin_approved' not in booking_columns:
-                    db.engine.execute("ALTER TABLE booking ADD COLUMN admin_approved BOOLEAN DEFAULT 0")
-                    print("Added admin_approved column to booking table")
-
-                # Check Service table columns
-                service_columns = [col['name'] for col in inspector.get_columns('service')]
-                if 'service_group_id' not in service_columns:
-                    db.engine.execute("ALTER TABLE service ADD COLUMN service_group_id INTEGER NOT NULL DEFAULT 1")
-                    print("Added service_group_id column to service table")
-
-                print("Database schema updated successfully!")
-            except Exception as e2:
-                print(f"Error updating database schema: {e2}")
-                print("Please manually reset the database using: python force_db_reset.py")
+            print(f"Error updating database schema: {e}")
 
     app.run(debug=True, host='127.0.0.1', port=5000)
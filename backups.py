@@ -0,0 +1,261 @@
+"""
+Online backups for Service PRO
+SQLite is copied with the backup API in small paced steps; PostgreSQL is dumped with pg_dump
+"""
+
+import glob
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.engine import URL
+from file_lock import try_lock
+
+SAFETY_COPY_DIR = 'manual'  # one-off copies, outside the rotation
+
+_config = {
+    'dir': None,
+    'pages': 256,
+    'sleep': 0.01,
+    'max_restarts': 3,
+    'keep': 7,
+    'interval_hours': 0.0,
+}
+
+_scheduler = None
+_scheduler_pid = None
+_lock = threading.Lock()
+
+
+class BackupRestarted(Exception):
+    """Raised to abandon a stepped SQLite copy that writers keep restarting"""
+
+
+def init_backups(app):
+    """Read the BACKUP_* settings; the backup folder is relative to the instance folder"""
+    path = app.config.get('BACKUP_DIR') or 'backups'
+    _config['dir'] = path if os.path.isabs(path) else os.path.join(app.instance_path, path)
+    _config['pages'] = app.config.get('BACKUP_PAGES_PER_STEP', _config['pages'])
+    _config['sleep'] = app.config.get('BACKUP_STEP_SLEEP_MS', _config['sleep'] * 1000) / 1000.0
+    _config['keep'] = app.config.get('BACKUP_KEEP', _config['keep'])
+    _config['interval_hours'] = app.config.get('BACKUP_INTERVAL_HOURS', _config['interval_hours'])
+
+    if 'backups' not in app.extensions:
+        app.extensions['backups'] = _config
+
+        @app.before_request
+        def _start_backup_scheduler():
+            if _config['interval_hours'] > 0:
+                _ensure_scheduler(app)
+
+
+def copy_sqlite(source_path, target_path, pages=None, sleep=None):
+    """Copy a live SQLite database with the online backup API
+
+    Copies `pages` pages per step and sleeps between steps, so each step
+    holds the source's read lock only briefly and writers get in between.
+    A write from another connection makes SQLite restart the copy; if that
+    happens more than max_restarts times and the source is in WAL mode
+    (where a reader never blocks writers) the rest is copied in one step.
+    Returns the number of pages copied.
+    """
+    pages = pages or _config['pages']
+    sleep = _config['sleep'] if sleep is None else sleep
+    source = sqlite3.connect(source_path)
+    try:
+        wal = source.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal'
+        progress = {'remaining': None, 'restarts': 0}
+
+        def pace(status, remaining, total):
+            if progress['remaining'] is not None and remaining > progress['remaining']:
+                progress['restarts'] += 1
+                if wal and progress['restarts'] > _config['max_restarts']:
+                    raise BackupRestarted()
+            progress['remaining'] = remaining
+            time.sleep(sleep)
+
+        target = sqlite3.connect(target_path)
+        try:
+            try:
+                source.backup(target, pages=pages, progress=pace)
+            except BackupRestarted:
+                source.backup(target, pages=-1)
+            target.execute('PRAGMA journal_mode=DELETE')  # a standalone file, no -wal to go missing
+            return target.execute('PRAGMA page_count').fetchone()[0]
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def verify_sqlite(path):
+    """Integrity-check a backup file; returns {table: row count}"""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+        if result != 'ok':
+            raise RuntimeError(f'Backup failed integrity check: {result}')
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+    finally:
+        conn.close()
+
+
+def _libpq_uri(url):
+    """postgresql+psycopg2://... -> postgresql://... for pg_dump, without the password"""
+    return URL.create('postgresql', username=url.username, host=url.host, port=url.port,
+                      database=url.database, query=url.query).render_as_string(hide_password=False)
+
+
+def dump_postgres(url, target_path):
+    """Dump with pg_dump in custom format; it reads from one consistent snapshot without blocking writers"""
+    if not shutil.which('pg_dump'):
+        raise RuntimeError('pg_dump is not installed')
+    # The password goes in the environment; the command line is visible to every local user
+    env = {**os.environ, 'PGPASSWORD': url.password} if url.password else None
+    try:
+        subprocess.run(['pg_dump', '--format=custom', '--no-owner', '--file', target_path, _libpq_uri(url)],
+                       check=True, capture_output=True, text=True, env=env)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f'pg_dump failed: {e.stderr.strip()}')
+
+
+def verify_postgres(path):
+    """List the dump's table of contents; returns {table: None} for each table with data"""
+    if not shutil.which('pg_restore'):
+        raise RuntimeError('pg_restore is not installed')
+    try:
+        listing = subprocess.run(['pg_restore', '--list', path], check=True, capture_output=True, text=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f'Backup failed verification: {e.stderr.strip()}')
+    tables = {}
+    for line in listing.splitlines():
+        parts = line.split()
+        if ' TABLE DATA ' in line:
+            # "215; 0 16390 TABLE DATA public booking owner"
+            index = parts.index('DATA')
+            tables[parts[index + 2]] = None
+    return tables
+
+
+def _prune(prefix):
+    backups = sorted(glob.glob(os.path.join(_config['dir'], f'{prefix}-*')))
+    for old in backups[:-_config['keep']] if _config['keep'] > 0 else []:
+        os.remove(old)
+
+
+def run_backup(engine, target_dir=None, log=print):
+    """Back up the database behind engine and verify the copy
+
+    Returns a dict with the backup path, size, duration, throughput and the
+    tables found in the verified copy.
+    """
+    target_dir = target_dir or _config['dir']
+    os.makedirs(target_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    backend = engine.dialect.name
+    started = time.monotonic()
+
+    if backend == 'sqlite':
+        name = os.path.splitext(os.path.basename(engine.url.database))[0]
+        path = os.path.join(target_dir, f'{name}-{stamp}.db')
+    elif backend == 'postgresql':
+        name = engine.url.database
+        path = os.path.join(target_dir, f'{name}-{stamp}.dump')
+    else:
+        raise RuntimeError(f'Online backups are not supported for {backend}')
+
+    tmp_path = path + '.tmp'
+    try:
+        if backend == 'sqlite':
+            pages = copy_sqlite(engine.url.database, tmp_path)
+            tables = verify_sqlite(tmp_path)
+        else:
+            pages = None
+            dump_postgres(engine.url, tmp_path)
+            tables = verify_postgres(tmp_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    seconds = time.monotonic() - started
+    size = os.path.getsize(path)
+    result = {
+        'path': path,
+        'backend': backend,
+        'bytes': size,
+        'pages': pages,
+        'seconds': round(seconds, 3),
+        'mb_per_s': round(size / 1048576 / seconds, 2) if seconds > 0 else 0.0,
+        'tables': tables,
+    }
+    if target_dir == _config['dir']:
+        _prune(name)
+    log(f"Backed up {size / 1048576:.1f}MB to {path} in {seconds:.2f}s ({result['mb_per_s']}MB/s), "
+        f"{len(tables)} tables verified")
+    return result
+
+
+def safety_copy(source_path, reason):
+    """Copy a SQLite file before a destructive step (e.g. a reset) and return the copy's path
+
+    Kept in the manual/ subfolder of the backup folder, so rotation and
+    --if-due never count or delete it.
+    """
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    target_dir = os.path.join(_config['dir'], SAFETY_COPY_DIR)
+    os.makedirs(target_dir, exist_ok=True)
+    path = os.path.join(target_dir, f"{name}-{reason}-{datetime.utcnow():%Y%m%d-%H%M%S}.db")
+    copy_sqlite(source_path, path)
+    return path
+
+
+def latest_backup_age():
+    """Seconds since the newest backup in the backup folder, or None"""
+    backups = glob.glob(os.path.join(_config['dir'], '*-*.db')) + glob.glob(os.path.join(_config['dir'], '*-*.dump'))
+    if not backups:
+        return None
+    return time.time() - max(os.path.getmtime(path) for path in backups)
+
+
+def backup_if_due(engine, log=print):
+    """Run a backup if the newest one is older than BACKUP_INTERVAL_HOURS
+
+    Holds a lock file, so only one process (gunicorn worker, cron job)
+    backs up at a time. Returns the backup result, or None if not due.
+    """
+    os.makedirs(_config['dir'], exist_ok=True)
+    with try_lock(os.path.join(_config['dir'], '.lock')) as locked:
+        if not locked:
+            return None
+        age = latest_backup_age()
+        if age is not None and age < _config['interval_hours'] * 3600:
+            return None
+        return run_backup(engine, log=log)
+
+
+def _scheduler_loop(app):
+    from app import db
+    while True:
+        try:
+            with app.app_context():
+                backup_if_due(db.engine)
+        except Exception as e:
+            print(f"Scheduled backup failed: {e}")
+        time.sleep(min(600, _config['interval_hours'] * 3600))
+
+
+def _ensure_scheduler(app):
+    """Start the backup thread in this process (once per gunicorn worker)"""
+    global _scheduler, _scheduler_pid
+    with _lock:
+        if _scheduler is None or _scheduler_pid != os.getpid() or not _scheduler.is_alive():
+            _scheduler = threading.Thread(target=_scheduler_loop, args=(app,), name='backup-scheduler',
+                                          daemon=True)
+            _scheduler_pid = os.getpid()
+            _scheduler.start()
@@ -0,0 +1,31 @@
+"""
+Shared pytest fixtures for Service PRO tests
+"""
+
+import os
+import tempfile
+import pytest
+
+# Tests run against the bundled SQLite file, not the database configured in .env
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///instance/service_app_fixed.db')
+
+from app import app, db
+import user_cache
+
+@pytest.fixture
+def temp_db():
+    """Point the app at a fresh SQLite file for the duration of a test"""
+    original_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    user_cache.clear()
+    try:
+        with app.app_context():
+            db.create_all()
+            yield db
+            db.session.remove()
+    finally:
+        app.config['SQLALCHEMY_DATABASE_URI'] = original_uri
+        user_cache.clear()
+        os.remove(path)
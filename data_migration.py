@@ -0,0 +1,148 @@
+"""
+Data migration for Service PRO
+Copies every table from the current database to another one (e.g. SQLite to PostgreSQL) in primary-key chunks
+"""
+
+import io
+import time
+from sqlalchemy import create_engine, func, inspect, select, text
+from database import engine_options, normalize_database_uri
+from migrations import MIGRATIONS, applied_versions, upgrade
+
+CHECKPOINT_TABLE = 'data_migration_checkpoint'
+SKIP_TABLES = {'schema_version'}  # the target is stamped by upgrade()
+
+# Import models lazily to avoid circular import
+def get_models():
+    from app import db
+    return db
+
+def _ensure_checkpoint_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f'CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} ('
+                          'table_name VARCHAR(100) PRIMARY KEY, '
+                          'last_key BIGINT, '
+                          'rows_copied BIGINT NOT NULL, '
+                          'finished BOOLEAN NOT NULL)'))
+
+def _load_checkpoints(engine):
+    """{table: (last_key, rows_copied, finished)} saved by an earlier run"""
+    if CHECKPOINT_TABLE not in inspect(engine).get_table_names():
+        return None
+    with engine.connect() as conn:
+        rows = conn.execute(text(f'SELECT table_name, last_key, rows_copied, finished FROM {CHECKPOINT_TABLE}'))
+        return {row[0]: (row[1], row[2], bool(row[3])) for row in rows}
+
+def _save_checkpoint(conn, table, last_key, rows_copied, finished):
+    conn.execute(text(f'DELETE FROM {CHECKPOINT_TABLE} WHERE table_name = :table'), {'table': table})
+    conn.execute(text(f'INSERT INTO {CHECKPOINT_TABLE} (table_name, last_key, rows_copied, finished) '
+                      'VALUES (:table, :last_key, :rows_copied, :finished)'),
+                 {'table': table, 'last_key': last_key, 'rows_copied': rows_copied, 'finished': finished})
+
+def _copy_value(value):
+    """One field in PostgreSQL COPY text format"""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\n', '\\n')
+            .replace('\r', '\\r').replace('\t', '\\t'))
+
+def _insert_chunk(conn, table, rows):
+    """Bulk-insert rows: COPY on PostgreSQL (psycopg2), a multi-row executemany elsewhere"""
+    if conn.dialect.name == 'postgresql' and conn.dialect.driver == 'psycopg2':
+        columns = [column.name for column in table.columns]
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(_copy_value(row[column]) for column in columns) + '\n')
+        buffer.seek(0)
+        quote = conn.dialect.identifier_preparer.quote
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {quote(table.name)} ({', '.join(quote(c) for c in columns)}) FROM STDIN",
+                               buffer)
+        finally:
+            cursor.close()
+    else:
+        conn.execute(table.insert(), rows)
+
+def reset_sequences(engine, tables):
+    """Move each integer primary key's sequence / AUTO_INCREMENT past the copied IDs"""
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in tables:
+            key = list(table.primary_key.columns)[0]
+            if not key.autoincrement or key.foreign_keys:
+                continue
+            if engine.dialect.name == 'postgresql':
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence(:table, :column), COALESCE(MAX({quote(key.name)}), 1), "
+                    f"MAX({quote(key.name)}) IS NOT NULL) FROM {quote(table.name)}"),
+                    {'table': quote(table.name), 'column': key.name})
+            elif engine.dialect.name == 'mysql':
+                next_id = conn.execute(select(func.coalesce(func.max(key), 0) + 1)).scalar()
+                conn.execute(text(f'ALTER TABLE {quote(table.name)} AUTO_INCREMENT = {int(next_id)}'))
+
+def copy_table(source, target, table, chunk_size, checkpoint, log=print):
+    """Copy one table in primary-key order; each chunk commits together with its checkpoint"""
+    last_key, copied, finished = checkpoint or (None, 0, False)
+    if finished:
+        log(f"  {table.name}: already copied ({copied} rows)")
+        return 0
+    key = list(table.primary_key.columns)[0]
+    started = time.monotonic()
+    copied_now = 0
+    with source.connect() as source_conn:
+        while True:
+            query = select(table).order_by(key).limit(chunk_size)
+            if last_key is not None:
+                query = query.where(key > last_key)
+            rows = [dict(row) for row in source_conn.execute(query).mappings()]
+            with target.begin() as conn:
+                if rows:
+                    _insert_chunk(conn, table, rows)
+                    last_key = rows[-1][key.name]
+                    copied += len(rows)
+                    copied_now += len(rows)
+                _save_checkpoint(conn, table.name, last_key, copied, len(rows) < chunk_size)
+            if len(rows) < chunk_size:
+                break
+    seconds = time.monotonic() - started
+    rate = copied_now / seconds if seconds > 0 else 0.0
+    log(f"  {table.name}: {copied_now} rows in {seconds:.2f}s ({rate:.0f} rows/s)")
+    return copied_now
+
+def migrate_data(source, target_uri, config, chunk_size=5000, log=print):
+    """Copy all data from the source engine to the database at target_uri
+
+    The target schema is created with the regular migrations. Rows keep their
+    IDs and are copied parents-first; progress is saved in the target's
+    data_migration_checkpoint table in the same transaction as each chunk,
+    so re-running after an interruption continues where it stopped. Returns
+    the number of rows copied by this run.
+    """
+    pending = [version for version, _, _ in MIGRATIONS if version not in applied_versions(source)]
+    if pending:
+        raise RuntimeError(f'Source database has pending migrations {pending}; run flask migrate first')
+
+    target_uri = normalize_database_uri(target_uri)
+    target = create_engine(target_uri, **engine_options(target_uri, config))
+    try:
+        checkpoints = _load_checkpoints(target)
+        existing = set(inspect(target).get_table_names()) - {'schema_version'}
+        if checkpoints is None and existing:
+            raise RuntimeError('Target database already has tables; migrate into an empty database')
+        upgrade(target, log=log)
+        _ensure_checkpoint_table(target)
+        checkpoints = checkpoints or {}
+
+        db = get_models()
+        tables = [table for table in db.metadata.sorted_tables if table.name not in SKIP_TABLES]
+        started = time.monotonic()
+        total = 0
+        for table in tables:
+            total += copy_table(source, target, table, chunk_size, checkpoints.get(table.name), log)
+        reset_sequences(target, tables)
+        seconds = time.monotonic() - started
+        log(f"Copied {total} rows in {seconds:.2f}s ({total / seconds if seconds > 0 else 0:.0f} rows/s)")
+        return total
+    finally:
+        target.dispose()
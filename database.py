@@ -0,0 +1,260 @@
+"""
+Database connection profiles for Service PRO
+Engine options per backend and the SQLite pragmas applied to every new connection
+"""
+
+import sqlite3
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+from sqlalchemy.engine import Engine
+
+REPLICA_BIND = 'replica'
+WRITE_COOKIE = 'db_write_at'
+
+# PRAGMA name -> config key, in the order they are applied
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'SQLITE_JOURNAL_MODE'),
+    ('synchronous', 'SQLITE_SYNCHRONOUS'),
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT_MS'),
+    ('cache_size', 'SQLITE_CACHE_SIZE'),
+    ('mmap_size', 'SQLITE_MMAP_SIZE'),
+    ('temp_store', 'SQLITE_TEMP_STORE'),
+    ('foreign_keys', 'SQLITE_FOREIGN_KEYS'),
+)
+
+SQLITE_DEFAULTS = {
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',     # durable across app crashes; fsync only at checkpoints in WAL
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_CACHE_SIZE': -20000,        # negative means KiB, so ~20MB per connection
+    'SQLITE_MMAP_SIZE': 268435456,      # 256MB
+    'SQLITE_TEMP_STORE': 'MEMORY',
+    'SQLITE_FOREIGN_KEYS': 'ON',
+}
+
+# What PRAGMA reads back for the symbolic values
+_PRAGMA_READBACK = {
+    'synchronous': {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3},
+    'temp_store': {'DEFAULT': 0, 'FILE': 1, 'MEMORY': 2},
+    'foreign_keys': {'OFF': 0, 'ON': 1},
+}
+
+_sqlite_pragmas = []  # [(name, value)] applied by the connect hook
+
+
+def configure_sqlite(config):
+    """Set the pragmas every new SQLite connection gets"""
+    _sqlite_pragmas[:] = [(name, config.get(key, SQLITE_DEFAULTS[key])) for name, key in SQLITE_PRAGMAS]
+
+
+@event.listens_for(Engine, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in _sqlite_pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def normalize_database_uri(uri):
+    """Pick an installed driver for bare mysql:// and postgres:// URIs"""
+    if uri.startswith('postgres://'):
+        # Heroku/Railway style; SQLAlchemy only knows the long name
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    if uri.startswith('mysql://'):
+        try:
+            import pymysql  # Python 3 MySQL driver
+            uri = 'mysql+pymysql://' + uri[len('mysql://'):]
+            print("✓ Using PyMySQL for MySQL database connectivity")
+        except ImportError:
+            print("WARNING: PyMySQL not found, install with: pip install PyMySQL")
+            print("  Falling back to default MySQL driver")
+    elif uri.startswith('postgresql'):
+        try:
+            import psycopg2  # Python 3 PostgreSQL driver
+            print("✓ Using psycopg2 for PostgreSQL database connectivity")
+        except ImportError:
+            print("WARNING: psycopg2 not found, install with: pip install psycopg2-binary")
+            print("  Falling back to default PostgreSQL driver")
+    return uri
+
+
+def _pool_options(config):
+    """Pool sizing shared by the server backends
+
+    Every gunicorn worker process has its own pool, so one worker needs at
+    most one connection per thread; the database must allow
+    workers * (pool_size + max_overflow) connections in total.
+    """
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'query_cache_size': config['DB_QUERY_CACHE_SIZE'],
+    }
+
+
+def engine_options(uri, config):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URI"""
+    if uri.startswith('sqlite'):
+        configure_sqlite(config)
+        busy_timeout = config.get('SQLITE_BUSY_TIMEOUT_MS', SQLITE_DEFAULTS['SQLITE_BUSY_TIMEOUT_MS'])
+        return {
+            'connect_args': {'check_same_thread': False, 'timeout': busy_timeout / 1000.0},
+        }
+    if uri.startswith('postgresql'):
+        options = _pool_options(config)
+        server_options = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+        if config['DB_IDLE_IN_TRANSACTION_TIMEOUT_MS']:
+            server_options += f" -c idle_in_transaction_session_timeout={config['DB_IDLE_IN_TRANSACTION_TIMEOUT_MS']}"
+        options['connect_args'] = {
+            'options': server_options,
+            'application_name': config['DB_APPLICATION_NAME'],
+            'connect_timeout': config['DB_CONNECT_TIMEOUT'],
+        }
+        if uri.startswith('postgresql://') or uri.startswith('postgresql+psycopg2://'):
+            # Multi-row INSERT ... VALUES for executemany (bulk inserts, backfills)
+            options['executemany_mode'] = 'values_plus_batch'
+        return options
+    if uri.startswith('mysql'):
+        options = _pool_options(config)
+        connect_args = {
+            'connect_timeout': config['DB_CONNECT_TIMEOUT'],
+            'charset': 'utf8mb4',
+        }
+        if config['DB_STATEMENT_TIMEOUT_MS']:
+            # Caps SELECTs only; MySQL has no general statement timeout
+            connect_args['init_command'] = f"SET SESSION max_execution_time={config['DB_STATEMENT_TIMEOUT_MS']}"
+        options['connect_args'] = connect_args
+        return options
+    return {}
+
+
+def database_settings(engine):
+    """Effective connection settings, with mismatches against the configured profile"""
+    report = {'backend': engine.dialect.name, 'settings': {}, 'mismatches': []}
+    pool = engine.pool
+    if hasattr(pool, 'size') and hasattr(pool, '_max_overflow'):
+        report['settings']['pool_size'] = pool.size()
+        report['settings']['max_overflow'] = pool._max_overflow
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            for name in ('statement_timeout', 'idle_in_transaction_session_timeout', 'max_connections'):
+                report['settings'][name] = conn.exec_driver_sql(f'SHOW {name}').scalar()
+        return report
+    if engine.dialect.name == 'mysql':
+        with engine.connect() as conn:
+            for name in ('max_execution_time', 'wait_timeout', 'max_connections'):
+                report['settings'][name] = conn.exec_driver_sql(f'SELECT @@{name}').scalar()
+        return report
+    if engine.dialect.name != 'sqlite':
+        return report
+    with engine.connect() as conn:
+        for name, expected in _sqlite_pragmas:
+            actual = conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+            report['settings'][name] = actual
+            wanted = _PRAGMA_READBACK.get(name, {}).get(str(expected).upper(), expected)
+            if str(actual).lower() != str(wanted).lower():
+                report['mismatches'].append(f'{name}={actual} (configured {expected})')
+    report['settings']['sqlite_version'] = sqlite3.sqlite_version
+    return report
+
+
+_read_engines = {}  # read target name -> function(app) returning an engine, or None to use the primary
+
+
+def register_read_engine(name, resolver):
+    _read_engines[name] = resolver
+
+
+def reads_from(name):
+    """Let a read-only view run its SELECTs on another engine, if one is configured"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.read_bind = name
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+replica_reads = reads_from(REPLICA_BIND)
+
+
+def _recent_write():
+    """True if this client wrote within the replica lag window (read-your-writes)"""
+    try:
+        written_at = float(request.cookies.get(WRITE_COOKIE, 0))
+    except ValueError:
+        return False
+    return time.time() - written_at < current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+
+
+def replica_configured(app):
+    return REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+def _replica_engine(app):
+    if replica_configured(app):
+        return get_state(app).db.get_engine(app, bind=REPLICA_BIND)
+    return None
+
+
+register_read_engine(REPLICA_BIND, _replica_engine)
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends SELECTs from @replica_reads (or other @reads_from) views elsewhere
+
+    Flushes, bulk UPDATE/INSERT/DELETE and anything else go to the primary,
+    and once a request has written, the rest of it stays on the primary too.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        is_select = clause is not None and getattr(clause, 'is_select', False)
+        if self._flushing or (clause is not None and not is_select):
+            self.info['wrote'] = True
+            if has_request_context():
+                g.db_wrote = True
+        elif (is_select and not self.info.get('wrote') and has_request_context()
+              and g.get('read_bind') in _read_engines and not _recent_write()):
+            engine = _read_engines[g.read_bind](self.app)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy with replica-aware sessions"""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def init_replica(app):
+    """Register the replica bind and the cookie that pins recent writers to the primary
+
+    The cookie lives for REPLICA_STICKY_SECONDS, which should cover the
+    worst replication lag; until it expires that client reads the primary.
+    """
+    replica_uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if replica_uri:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = normalize_database_uri(replica_uri)
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+    @app.after_request
+    def _remember_write(response):
+        if g.get('db_wrote') and replica_configured(app):
+            sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 5)
+            response.set_cookie(WRITE_COOKIE, f'{time.time():.3f}', max_age=max(1, int(sticky_seconds)),
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,136 @@
+"""
+Streaming data exports for Service PRO
+Bookings, commissions and users as CSV or NDJSON, read in server-side chunks so memory stays flat
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from sqlalchemy.orm import aliased
+from money import format_cents, from_cents
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+FLUSH_BYTES = 64 * 1024
+
+# Import models lazily to avoid circular import
+def get_models():
+    from app import db, User, Service, Booking, Commission
+    return db, User, Service, Booking, Commission
+
+def _bookings(status):
+    db, User, Service, Booking, Commission = get_models()
+    customer = aliased(User)
+    query = (db.session.query(Booking.id, Booking.created_at, Booking.booking_date, Booking.status,
+                              Booking.user_id, customer.email, Booking.service_id, Service.name,
+                              Booking.handyman_id, Booking.total_price_cents, Booking.admin_approved)
+             .join(customer, Booking.user_id == customer.id)
+             .outerjoin(Service, Booking.service_id == Service.id))
+    if status:
+        query = query.filter(Booking.status == status)
+    return query, Booking
+
+def _commissions(status):
+    db, User, Service, Booking, Commission = get_models()
+    query = (db.session.query(Commission.id, Commission.created_at, Commission.booking_id,
+                              Commission.handyman_id, User.email, Commission.service_price_cents,
+                              Commission.commission_amount_cents, Commission.handyman_earnings_cents,
+                              Commission.is_paid, Commission.paid_at, Commission.payout_batch_id)
+             .join(User, Commission.handyman_id == User.id))
+    if status:
+        query = query.filter(Commission.is_paid == (status == 'paid'))
+    return query, Commission
+
+def _users(status):
+    db, User, Service, Booking, Commission = get_models()
+    query = db.session.query(User.id, User.created_at, User.username, User.email, User.role,
+                             User.first_name, User.last_name, User.phone, User.is_approved,
+                             User.admin_approved, User.average_score, User.total_feedbacks)
+    if status:
+        query = query.filter(User.role == status)
+    return query, User
+
+# kind -> (query builder, output fields, money fields stored as cents)
+EXPORTS = {
+    'bookings': (_bookings,
+                 ['id', 'created_at', 'booking_date', 'status', 'user_id', 'customer_email', 'service_id',
+                  'service_name', 'handyman_id', 'total_price', 'admin_approved'],
+                 {'total_price'}),
+    'commissions': (_commissions,
+                    ['id', 'created_at', 'booking_id', 'handyman_id', 'handyman_email', 'service_price',
+                     'commission_amount', 'handyman_earnings', 'is_paid', 'paid_at', 'payout_batch_id'],
+                    {'service_price', 'commission_amount', 'handyman_earnings'}),
+    'users': (_users,
+              ['id', 'created_at', 'username', 'email', 'role', 'first_name', 'last_name', 'phone',
+               'is_approved', 'admin_approved', 'average_score', 'total_feedbacks'],
+              set()),
+}
+
+# Allowed status filters per export (None: any booking status)
+EXPORT_STATUSES = {
+    'bookings': None,
+    'commissions': ('paid', 'unpaid'),
+    'users': ('user', 'handyman', 'admin'),
+}
+
+def validate_export_status(kind, status):
+    """Raise ValueError for a status filter the export does not know
+
+    Call it before streaming: an error inside the generator would only cut
+    the download short after the 200 headers are sent.
+    """
+    allowed = EXPORT_STATUSES.get(kind)
+    if status and allowed is not None and status not in allowed:
+        raise ValueError(f"{kind.capitalize()} status must be one of: {', '.join(allowed)}")
+
+def parse_export_date(value, end=False):
+    """YYYY-MM-DD to a datetime; an end date includes the whole day"""
+    if not value:
+        return None
+    moment = datetime.strptime(value, '%Y-%m-%d')
+    return moment + timedelta(days=1) if end else moment
+
+def export_rows(kind, since=None, until=None, status=None, chunk_size=1000):
+    """Yield one dict per row, created_at in [since, until), ordered by ID"""
+    if kind not in EXPORTS:
+        raise ValueError(f'Unknown export: {kind}')
+    validate_export_status(kind, status)
+    build, fields, money_fields = EXPORTS[kind]
+    query, model = build(status)
+    if since:
+        query = query.filter(model.created_at >= since)
+    if until:
+        query = query.filter(model.created_at < until)
+    for row in query.order_by(model.id).yield_per(chunk_size):
+        yield dict(zip(fields, row))
+
+def _serialize(row, money_fields, money):
+    for name, value in row.items():
+        if isinstance(value, datetime):
+            row[name] = value.isoformat()
+        elif name in money_fields and value is not None:
+            row[name] = money(value)
+    return row
+
+def stream_export(kind, fmt, since=None, until=None, status=None, chunk_size=1000):
+    """Generate export text chunks of roughly FLUSH_BYTES each"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    build, fields, money_fields = EXPORTS.get(kind, (None, [], set()))
+    rows = export_rows(kind, since, until, status, chunk_size)
+
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+        writer.writeheader()
+        write = lambda row: writer.writerow(_serialize(row, money_fields, format_cents))
+    else:
+        write = lambda row: buffer.write(json.dumps(_serialize(row, money_fields, from_cents)) + '\n')
+
+    for row in rows:
+        write(row)
+        if buffer.tell() > FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
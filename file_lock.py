@@ -0,0 +1,43 @@
+"""
+Lock files for Service PRO
+Non-blocking exclusive locks shared across processes: flock on POSIX, msvcrt.locking on Windows
+"""
+
+from contextlib import contextmanager
+
+
+def _lock(lock_file):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return
+    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock(lock_file):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def try_lock(path):
+    """Hold the lock on path for the with block; yields False if another process holds it"""
+    with open(path, 'w') as lock_file:
+        try:
+            _lock(lock_file)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            _unlock(lock_file)
@@ -26,6 +26,7 @@ interface Service {
     first_name: string
     last_name: string
     average_score: number
+    ranked_score: number
   }
 }
 
@@ -109,7 +110,8 @@ export default function ServicesPage() {
     // Apply sorting
     switch (filters.sortBy) {
       case 'rating':
-        filtered.sort((a, b) => b.handyman.average_score - a.handyman.average_score)
+        // Bayesian-adjusted score, so a single 5-star review doesn't outrank a long track record
+        filtered.sort((a, b) => b.handyman.ranked_score - a.handyman.ranked_score)
         break
       case 'price_low':
         filtered.sort((a, b) => a.price - b.price)
@@ -0,0 +1,35 @@
+"""
+Gunicorn settings for Service PRO (loaded automatically from the working directory)
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# The SQLite write queue groups commits from concurrent requests handled by
+# one process. Sync workers serve one request at a time and each has its own
+# writer, so with the queue on run a single threaded worker instead.
+if os.getenv('SQLITE_WRITE_QUEUE', 'False').lower() == 'true':
+    workers = 1
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', '16'))
+else:
+    workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+    worker_class = 'sync'
+
+def on_starting(server):
+    """Warn when command-line flags leave the write queue with nothing to batch"""
+    if os.getenv('SQLITE_WRITE_QUEUE', 'False').lower() != 'true':
+        return
+    if server.cfg.workers > 1 or server.cfg.threads < 2:
+        server.log.warning('SQLITE_WRITE_QUEUE is on but gunicorn runs %d workers with %d threads each; '
+                           'the queue only groups commits between threads of one process',
+                           server.cfg.workers, server.cfg.threads)
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the aggregated Prometheus metrics"""
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
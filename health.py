@@ -0,0 +1,100 @@
+"""
+Health probes for Service PRO
+/healthz (liveness) and /readyz (readiness) answered before Flask runs, so probes skip sessions, templates and CORS
+"""
+
+import json
+import os
+import threading
+import time
+
+LIVENESS_PATH = '/healthz'
+READINESS_PATH = '/readyz'
+
+_config = {
+    'cache_seconds': 2.0,
+    'max_pool_saturation': 0.9,
+}
+
+_cache = {'at': 0.0, 'result': None}
+_lock = threading.Lock()
+
+
+def init_health(app):
+    """Answer the probe paths in front of the Flask app"""
+    _config['cache_seconds'] = app.config.get('HEALTH_CACHE_SECONDS', _config['cache_seconds'])
+    _config['max_pool_saturation'] = app.config.get('HEALTH_MAX_POOL_SATURATION', _config['max_pool_saturation'])
+    if not isinstance(app.wsgi_app, HealthCheckMiddleware):
+        app.wsgi_app = HealthCheckMiddleware(app.wsgi_app, app)
+
+
+def pool_status(engine):
+    """Checked-out connections against the pool's limit; saturation is None for unbounded pools"""
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout') or not hasattr(pool, '_max_overflow'):
+        return {'class': type(pool).__name__, 'saturation': None}
+    limit = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        'class': type(pool).__name__,
+        'checked_out': checked_out,
+        'limit': limit,
+        'saturation': round(checked_out / limit, 3) if limit else None,
+    }
+
+
+def _check_database(app):
+    """SELECT 1 plus the pool check, reused for HEALTH_CACHE_SECONDS"""
+    from app import db
+    engine = db.get_engine(app)
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql('SELECT 1').scalar()
+        database = {'ok': True, 'ms': round((time.perf_counter() - started) * 1000, 2)}
+    except Exception as e:
+        database = {'ok': False, 'error': str(e).splitlines()[0]}
+    pool = pool_status(engine)
+    saturation = pool['saturation']
+    pool['ok'] = saturation is None or saturation < _config['max_pool_saturation']
+    return {'database': database, 'pool': pool}
+
+
+def readiness(app):
+    """(ready, checks); the database is probed at most once per HEALTH_CACHE_SECONDS per process"""
+    now = time.monotonic()
+    with _lock:
+        cached = _cache['result'] is not None and now - _cache['at'] < _config['cache_seconds']
+        if not cached:
+            _cache['result'] = _check_database(app)
+            _cache['at'] = now
+        checks = dict(_cache['result'], cached=cached)
+    return checks['database']['ok'] and checks['pool']['ok'], checks
+
+
+class HealthCheckMiddleware:
+    """WSGI wrapper that serves the probe paths without entering the Flask app"""
+
+    def __init__(self, wsgi_app, app):
+        self.wsgi_app = wsgi_app
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == LIVENESS_PATH:
+            return self._respond(start_response, True, {'status': 'ok', 'pid': os.getpid()})
+        if path == READINESS_PATH:
+            ready, checks = readiness(self.app)
+            return self._respond(start_response, ready, {'status': 'ok' if ready else 'unavailable',
+                                                         'pid': os.getpid(), 'checks': checks})
+        return self.wsgi_app(environ, start_response)
+
+    @staticmethod
+    def _respond(start_response, ok, payload):
+        body = json.dumps(payload).encode('utf-8')
+        start_response('200 OK' if ok else '503 Service Unavailable', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+            ('Cache-Control', 'no-store'),
+        ])
+        return [body]
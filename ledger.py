@@ -0,0 +1,225 @@
+"""
+Handyman earnings ledger for Service PRO
+Append-only accrual/payout entries with a running balance row per handyman (amounts in integer cents)
+"""
+
+from datetime import datetime
+
+ACCRUAL = 'accrual'
+PAYOUT = 'payout'
+REVERSAL = 'reversal'  # takes back an accrual whose commission was deleted
+
+# Import models lazily to avoid circular import
+def get_models():
+    from app import db, Commission, PayoutBatch, LedgerEntry, HandymanBalance
+    return db, Commission, PayoutBatch, LedgerEntry, HandymanBalance
+
+def _append(handyman_id, entry_type, amount, commission_id=None, payout_batch_id=None):
+    """Apply amount (cents) to the balance row and append the matching entry
+
+    The UPDATE locks the balance row until commit, so the balance read back
+    afterwards is the one this entry produced.
+    """
+    db, Commission, PayoutBatch, LedgerEntry, HandymanBalance = get_models()
+    balances = HandymanBalance.__table__
+    accrued = amount if entry_type in (ACCRUAL, REVERSAL) else 0
+    paid = -amount if entry_type == PAYOUT else 0
+    updated = db.session.execute(
+        balances.update()
+        .where(balances.c.handyman_id == handyman_id)
+        .values(balance_cents=balances.c.balance_cents + amount,
+                lifetime_earnings_cents=balances.c.lifetime_earnings_cents + accrued,
+                total_paid_cents=balances.c.total_paid_cents + paid,
+                updated_at=datetime.utcnow())
+    ).rowcount
+    if not updated:
+        db.session.add(HandymanBalance(handyman_id=handyman_id, balance_cents=amount,
+                                       lifetime_earnings_cents=accrued, total_paid_cents=paid))
+        db.session.flush()
+
+    balance, lifetime = (db.session.query(HandymanBalance.balance_cents, HandymanBalance.lifetime_earnings_cents)
+                         .filter(HandymanBalance.handyman_id == handyman_id)
+                         .one())
+    entry = LedgerEntry(handyman_id=handyman_id, entry_type=entry_type, amount_cents=amount,
+                        commission_id=commission_id, payout_batch_id=payout_batch_id,
+                        balance_after_cents=balance, lifetime_after_cents=lifetime)
+    db.session.add(entry)
+    return entry
+
+def record_accrual(commission):
+    """Credit a new commission's handyman earnings; the caller commits"""
+    db, Commission, PayoutBatch, LedgerEntry, HandymanBalance = get_models()
+    db.session.flush()
+    return _append(commission.handyman_id, ACCRUAL, commission.handyman_earnings_cents,
+                   commission_id=commission.id)
+
+def record_accruals(commissions):
+    """Credit many new commissions at once; the caller commits
+
+    commissions is a list of (commission_id, handyman_id, earnings_cents).
+    Each handyman's balance row gets one atomic UPDATE with the summed
+    earnings (which locks it until commit, as in _append), and the entries
+    are bulk inserted with running balances counted up from the row's
+    value before this batch.
+    """
+    db, Commission, PayoutBatch, LedgerEntry, HandymanBalance = get_models()
+    if not commissions:
+        return 0
+    balances = HandymanBalance.__table__
+    now = datetime.utcnow()
+    deltas = {}
+    for _, handyman_id, amount in commissions:
+        deltas[handyman_id] = deltas.get(handyman_id, 0) + amount
+
+    totals = {}
+    for handyman_id, delta in deltas.items():
+        updated = db.session.execute(
+            balances.update()
+            .where(balances.c.handyman_id == handyman_id)
+            .values(balance_cents=balances.c.balance_cents + delta,
+                    lifetime_earnings_cents=balances.c.lifetime_earnings_cents + delta,
+                    updated_at=now)
+        ).rowcount
+        if not updated:
+            db.session.add(HandymanBalance(handyman_id=handyman_id, balance_cents=delta,
+                                           lifetime_earnings_cents=delta, total_paid_cents=0))
+            db.session.flush()
+        balance, lifetime = (db.session.query(HandymanBalance.balance_cents,
+                                              HandymanBalance.lifetime_earnings_cents)
+                             .filter(HandymanBalance.handyman_id == handyman_id)
+                             .one())
+        totals[handyman_id] = (balance - delta, lifetime - delta)
+
+    entries = []
+    for commission_id, handyman_id, amount in commissions:
+        balance, lifetime = totals[handyman_id]
+        balance, lifetime = balance + amount, lifetime + amount
+        totals[handyman_id] = (balance, lifetime)
+        entries.append({
+            'handyman_id': handyman_id, 'entry_type': ACCRUAL, 'amount_cents': amount,
+            'commission_id': commission_id, 'balance_after_cents': balance,
+            'lifetime_after_cents': lifetime, 'created_at': now,
+        })
+    db.session.bulk_insert_mappings(LedgerEntry, entries)
+    return len(entries)
+
+def reverse_accrual(commission):
+    """Take back an unpaid commission's earnings before the commission is deleted; the caller commits
+
+    The original accrual is left as it is and the reversal is a new entry for
+    the same commission. ledger_entry.commission_id has no foreign key, so
+    both keep the ID after the commission row is gone.
+    """
+    return _append(commission.handyman_id, REVERSAL, -commission.handyman_earnings_cents,
+                   commission_id=commission.id)
+
+def record_payout(handyman_id, amount, payout_batch_id=None, commission_id=None):
+    """Debit earnings (cents) paid out to a handyman; the caller commits"""
+    return _append(handyman_id, PAYOUT, -amount, commission_id=commission_id,
+                   payout_batch_id=payout_batch_id)
+
+def get_balance(handyman_id):
+    """Current balance row for a handyman (None if they never earned)"""
+    db, Commission, PayoutBatch, LedgerEntry, HandymanBalance = get_models()
+    return db.session.get(HandymanBalance, handyman_id)
+
+def get_balances(handyman_ids):
+    """Balance rows keyed by handyman ID"""
+    db, Commission, PayoutBatch, LedgerEntry, HandymanBalance = get_models()
+    if not handyman_ids:
+        return {}
+    rows = HandymanBalance.query.filter(HandymanBalance.handyman_id.in_(list(handyman_ids))).all()
+    return {row.handyman_id: row for row in rows}
+
+def total_unpaid_earnings():
+    """Sum of all balances in cents: one row per handyman, not per commission"""
+    db, Commission, PayoutBatch, LedgerEntry, HandymanBalance = get_models()
+    return db.session.query(db.func.coalesce(db.func.sum(HandymanBalance.balance_cents), 0)).scalar()
+
+def _lifetime_before(handyman_id, moment):
+    db, Commission, PayoutBatch, LedgerEntry, HandymanBalance = get_models()
+    value = (db.session.query(LedgerEntry.lifetime_after_cents)
+             .filter(LedgerEntry.handyman_id == handyman_id, LedgerEntry.created_at < moment)
+             .order_by(LedgerEntry.created_at.desc(), LedgerEntry.id.desc())
+             .limit(1)
+             .scalar())
+    return value or 0
+
+def period_earnings(handyman_id, start, end):
+    """Earnings accrued in [start, end), in cents, from two index lookups"""
+    return _lifetime_before(handyman_id, end) - _lifetime_before(handyman_id, start)
+
+def _ledger_events(now):
+    """One query for every entry the commissions imply, in ledger order
+
+    Rows are (created_at, handyman_id, entry_type, amount, commission_id,
+    payout_batch_id): one accrual per commission and one payout per handyman
+    per payout batch (or per commission paid individually). Accruals sort
+    before payouts made at the same moment.
+    """
+    db, Commission, PayoutBatch, LedgerEntry, HandymanBalance = get_models()
+    no_id = db.literal(None, db.Integer)
+    accruals = db.select(
+        db.func.coalesce(Commission.created_at, now).label('created_at'), Commission.handyman_id,
+        db.literal(ACCRUAL).label('entry_type'), Commission.handyman_earnings_cents.label('amount'),
+        Commission.id.label('commission_id'), no_id.label('payout_batch_id'), db.literal(0).label('payout_order'))
+    paid_individually = db.select(
+        db.func.coalesce(Commission.paid_at, Commission.created_at, now), Commission.handyman_id,
+        db.literal(PAYOUT), -Commission.handyman_earnings_cents, Commission.id, no_id, db.literal(1)
+    ).where(Commission.is_paid == True, Commission.payout_batch_id.is_(None))
+    paid_in_batches = db.select(
+        PayoutBatch.created_at, Commission.handyman_id, db.literal(PAYOUT),
+        -db.func.sum(Commission.handyman_earnings_cents), no_id, Commission.payout_batch_id, db.literal(1)
+    ).join(PayoutBatch, Commission.payout_batch_id == PayoutBatch.id
+    ).group_by(Commission.payout_batch_id, Commission.handyman_id, PayoutBatch.created_at)
+    events = db.union_all(accruals, paid_individually, paid_in_batches).subquery()
+    return (db.select(events.c.created_at, events.c.handyman_id, events.c.entry_type, events.c.amount,
+                      events.c.commission_id, events.c.payout_batch_id)
+            .order_by(events.c.created_at, events.c.payout_order, events.c.commission_id,
+                      events.c.payout_batch_id, events.c.handyman_id))
+
+def rebuild_ledger(chunk_size=1000):
+    """Rebuild the ledger from existing commissions
+
+    Streams the entries from one ordered query and writes them chunk_size
+    at a time; only the running totals (one per handyman) stay in memory.
+    MySQL cannot run the inserts while a server-side cursor is open, so
+    there the driver buffers the query result instead.
+    Returns the number of entries written; the caller commits.
+    """
+    db, Commission, PayoutBatch, LedgerEntry, HandymanBalance = get_models()
+    LedgerEntry.query.delete(synchronize_session=False)
+    HandymanBalance.query.delete(synchronize_session=False)
+
+    query = _ledger_events(datetime.utcnow())
+    if db.engine.dialect.name != 'mysql':
+        query = query.execution_options(yield_per=chunk_size)
+    totals = {}
+    entries = []
+    written = 0
+    for created_at, handyman_id, entry_type, amount, commission_id, batch_id in db.session.execute(query):
+        balance, lifetime, paid = totals.get(handyman_id, (0, 0, 0))
+        balance += amount
+        if entry_type == ACCRUAL:
+            lifetime += amount
+        else:
+            paid -= amount
+        totals[handyman_id] = (balance, lifetime, paid)
+        entries.append({
+            'handyman_id': handyman_id, 'entry_type': entry_type, 'amount_cents': amount,
+            'commission_id': commission_id, 'payout_batch_id': batch_id,
+            'balance_after_cents': balance, 'lifetime_after_cents': lifetime, 'created_at': created_at,
+        })
+        if len(entries) >= chunk_size:
+            db.session.bulk_insert_mappings(LedgerEntry, entries)
+            written += len(entries)
+            entries = []
+    if entries:
+        db.session.bulk_insert_mappings(LedgerEntry, entries)
+        written += len(entries)
+
+    db.session.bulk_insert_mappings(HandymanBalance, [{
+        'handyman_id': handyman_id, 'balance_cents': balance, 'lifetime_earnings_cents': lifetime,
+        'total_paid_cents': paid,
+    } for handyman_id, (balance, lifetime, paid) in totals.items()])
+    return written
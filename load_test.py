@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test for Service PRO
+Replays the user journeys from test_user_flows.py with many virtual users and reports per-step latency percentiles
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import requests
+
+from monitor import LatencyHistogram
+from test_user_flows import ServicePROTester
+
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+STEPS = ('register', 'login', 'browse_catalog', 'book', 'approve', 'complete', 'feedback')
+
+
+class LoadResults:
+    """Thread-safe latency histograms and error counts per flow step"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(LatencyHistogram)
+        self.requests = Counter()
+        self.errors = defaultdict(Counter)
+        self.skipped = Counter()
+
+    def record(self, step, seconds, error=None):
+        with self.lock:
+            self.histograms[step].record(seconds * 1e6)
+            self.requests[step] += 1
+            if error:
+                self.errors[step][error] += 1
+
+    def skip(self, step):
+        with self.lock:
+            self.skipped[step] += 1
+
+    def summary(self, elapsed):
+        steps = {}
+        for step in STEPS:
+            histogram = self.histograms.get(step)
+            count = self.requests[step]
+            errors = sum(self.errors[step].values())
+            steps[step] = {
+                'count': count,
+                'skipped': self.skipped[step],
+                'errors': errors,
+                'error_rate': round(errors / count, 4) if count else 0.0,
+                'error_breakdown': dict(self.errors[step]),
+                'p50_ms': histogram.percentile(50) if histogram else 0.0,
+                'p95_ms': histogram.percentile(95) if histogram else 0.0,
+                'p99_ms': histogram.percentile(99) if histogram else 0.0,
+                'max_ms': round(histogram.max / 1000.0, 2) if histogram else 0.0,
+            }
+        total = sum(self.requests.values())
+        return {
+            'elapsed_seconds': round(elapsed, 2),
+            'requests': total,
+            'requests_per_second': round(total / elapsed, 2) if elapsed else 0.0,
+            'errors': sum(sum(errors.values()) for errors in self.errors.values()),
+            'steps': steps,
+        }
+
+
+def redirects_to(path):
+    """Response check: the redirect must go to path (not, say, to the index page after 'Access denied')"""
+    def check(response):
+        location = urlparse(response.headers.get('Location', '')).path
+        return None if location == path else f'redirect to {location or "(none)"}'
+    return check
+
+
+def api_data(response):
+    """The "data" member of a JSON API response"""
+    return response.json()['data']
+
+
+class StepFailed(Exception):
+    """A step got an unexpected response; the rest of that journey is skipped"""
+
+
+class VirtualUser(ServicePROTester):
+    """One simulated customer walking through the booking journey
+
+    Approving and completing the booking need the staff accounts from
+    LOAD_ADMIN_EMAIL/PASSWORD and LOAD_HANDYMAN_EMAIL/PASSWORD; without
+    them those steps (and feedback, which needs a completed booking) are
+    skipped.
+    """
+
+    def __init__(self, base_url, results, staff):
+        super().__init__(base_url)
+        self.results = results
+        self.staff = staff
+        self.email = None
+        self.password = 'LoadTest-' + uuid.uuid4().hex[:12]
+
+    def timed(self, step, request, expect=(200,), check=None, parse=None):
+        """Run one HTTP call, record its latency and outcome, and return the response
+
+        check(response) returns an error description when a response with an
+        expected status still means the step did not happen. With parse, the
+        return value is parse(response) instead. A body that check or parse
+        cannot read (not JSON, or another shape) fails the step like a bad status.
+        """
+        started = time.monotonic()
+        try:
+            response = request()
+        except requests.exceptions.RequestException as e:
+            self.results.record(step, time.monotonic() - started, type(e).__name__)
+            raise StepFailed(step)
+        elapsed = time.monotonic() - started
+        error = f'HTTP {response.status_code}' if response.status_code not in expect else None
+        result = response
+        try:
+            if error is None and check is not None:
+                error = check(response)
+            if error is None and parse is not None:
+                result = parse(response)
+        except (ValueError, KeyError, TypeError, IndexError):
+            error = 'unexpected response body'
+        self.results.record(step, elapsed, error)
+        if error:
+            raise StepFailed(step)
+        return result
+
+    def register(self):
+        self.email = f'load-{uuid.uuid4().hex[:16]}@example.com'
+        self.timed('register', lambda: self.session.post(f'{self.base_url}/api/auth/register', json={
+            'first_name': 'Load', 'last_name': 'Tester', 'email': self.email, 'password': self.password,
+            'role': 'user'}, timeout=30))
+
+    def login(self):
+        self.timed('login', lambda: self.session.post(f'{self.base_url}/api/auth/login', json={
+            'email': self.email, 'password': self.password}, timeout=30))
+
+    def browse_catalog(self):
+        self.timed('browse_catalog', lambda: self.session.get(f'{self.base_url}/services', timeout=30))
+        self.timed('browse_catalog', lambda: self.session.get(f'{self.base_url}/api/service-groups', timeout=30))
+        handyman_id = self.staff.get('handyman_id')
+
+        def pick_service(response):
+            services = api_data(response)
+            mine = [service for service in services if service['handyman_id'] == handyman_id]
+            service = (mine or services)[0]  # an empty catalog fails the step
+            return {'id': service['id'], 'handyman_id': service['handyman_id']}
+        return self.timed('browse_catalog', lambda: self.session.get(f'{self.base_url}/api/services', timeout=30),
+                          parse=pick_service)
+
+    def book(self, service):
+        booking_date = (datetime.now() + timedelta(days=3)).replace(microsecond=0).isoformat()
+        return self.timed('book', lambda: self.session.post(f'{self.base_url}/api/bookings', json={
+            'service_id': service['id'], 'booking_date': booking_date,
+            'special_requests': 'Load test booking'}, timeout=30), parse=lambda response: api_data(response)['id'])
+
+    def approve(self, booking_id, service):
+        admin = self.staff.get('admin')
+        if admin is None:
+            self.results.skip('approve')
+            return False
+        self.timed('approve', lambda: admin.post(f'{self.base_url}/admin/assign_handyman/{booking_id}',
+                                                 data={'handyman_id': service['handyman_id']},
+                                                 allow_redirects=False, timeout=30),
+                   expect=(302,), check=redirects_to('/admin/bookings'))
+        return True
+
+    def complete(self, booking_id):
+        handyman = self.staff.get('handyman')
+        if handyman is None:
+            self.results.skip('complete')
+            return False
+        for status in ('in_progress', 'completed'):
+            self.timed('complete', lambda: handyman.post(
+                f'{self.base_url}/handyman/update-booking-status/{booking_id}', data={'status': status},
+                allow_redirects=False, timeout=30), expect=(302,), check=redirects_to('/handyman/dashboard'))
+
+        # "Access denied" also lands on the handyman dashboard, so read the status back
+        def is_completed(response):
+            status = next((booking['status'] for booking in api_data(response)
+                           if booking['id'] == booking_id), None)
+            return None if status == 'completed' else f'status {status}'
+        self.timed('complete', lambda: self.session.get(f'{self.base_url}/api/bookings', timeout=30),
+                   check=is_completed)
+        return True
+
+    def feedback(self, booking_id):
+        # Redirects here mean "not completed yet" or "already left feedback"
+        page = self.timed('feedback', lambda: self.session.get(f'{self.base_url}/leave-feedback/{booking_id}',
+                                                               allow_redirects=False, timeout=30))
+        match = CSRF_PATTERN.search(page.text)
+        data = {'rating': '5', 'comment': 'Load test feedback'}
+        if match:
+            data['csrf_token'] = match.group(1)
+        self.timed('feedback', lambda: self.session.post(f'{self.base_url}/leave-feedback/{booking_id}',
+                                                         data=data, allow_redirects=False, timeout=30),
+                   expect=(302,), check=redirects_to('/user/dashboard'))
+
+    def run_journey(self):
+        """register -> login -> browse -> book -> approve -> complete -> feedback"""
+        try:
+            self.register()
+            self.login()
+            service = self.browse_catalog()
+            booking_id = self.book(service)
+            if not self.approve(booking_id, service):
+                self.results.skip('complete')
+                self.results.skip('feedback')
+                return
+            if service['handyman_id'] != self.staff.get('handyman_id'):
+                self.results.skip('complete')
+                self.results.skip('feedback')
+                return
+            if not self.complete(booking_id):
+                self.results.skip('feedback')
+                return
+            self.feedback(booking_id)
+        except StepFailed:
+            pass
+        finally:
+            self.session.close()
+
+
+def staff_sessions(base_url):
+    """Logged-in admin and handyman sessions shared by all virtual users, if configured"""
+    staff = {}
+    for role in ('admin', 'handyman'):
+        email = os.getenv(f'LOAD_{role.upper()}_EMAIL')
+        password = os.getenv(f'LOAD_{role.upper()}_PASSWORD')
+        if not email or not password:
+            continue
+        session = requests.Session()
+        response = session.post(f'{base_url}/api/auth/login', json={'email': email, 'password': password},
+                                timeout=30)
+        if response.status_code != 200:
+            print(f"WARNING: {role} login failed ({response.status_code}); skipping its steps")
+            continue
+        staff[role] = session
+        if role == 'handyman':
+            staff['handyman_id'] = response.json()['user']['id']
+    return staff
+
+
+def run_load_test(base_url, users, ramp_up, duration, iterations=None):
+    """Start users virtual users spread evenly over ramp_up seconds
+
+    Each user repeats the journey until duration seconds have passed since
+    the test started (or for a fixed number of iterations).
+    """
+    results = LoadResults()
+    staff = staff_sessions(base_url)
+    started = time.monotonic()
+    deadline = started + duration
+
+    def virtual_user(index):
+        time.sleep(ramp_up * index / users if users else 0)
+        done = 0
+        while time.monotonic() < deadline and (iterations is None or done < iterations):
+            VirtualUser(base_url, results, staff).run_journey()
+            done += 1
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        for future in [pool.submit(virtual_user, index) for index in range(users)]:
+            future.result()
+    for session in staff.values():
+        if isinstance(session, requests.Session):
+            session.close()
+    return results.summary(time.monotonic() - started)
+
+
+def print_summary(summary):
+    print(f"\n{summary['requests']} requests in {summary['elapsed_seconds']}s "
+          f"({summary['requests_per_second']} req/s), {summary['errors']} errors")
+    print(f"{'step':<16}{'count':>7}{'errors':>8}{'skip':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, stats in summary['steps'].items():
+        print(f"{step:<16}{stats['count']:>7}{stats['errors']:>8}{stats['skipped']:>6}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+        for reason, count in stats['error_breakdown'].items():
+            print(f"    {reason}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent load test for Service PRO')
+    parser.add_argument('--base-url', default=os.getenv('LOAD_BASE_URL', 'http://localhost:5000'))
+    parser.add_argument('--users', type=int, default=10, help='concurrent virtual users (default 10)')
+    parser.add_argument('--ramp-up', type=float, default=10, help='seconds to start all users (default 10)')
+    parser.add_argument('--duration', type=float, default=60, help='seconds to keep running (default 60)')
+    parser.add_argument('--iterations', type=int, help='journeys per user (default: until --duration)')
+    parser.add_argument('--output', default=f"logs/load-test-{datetime.now():%Y%m%d-%H%M%S}.json",
+                        help='JSON results file')
+    args = parser.parse_args()
+
+    started_at = datetime.now().isoformat(timespec='seconds')
+    print(f"Load testing {args.base_url} with {args.users} users (ramp-up {args.ramp_up}s, "
+          f"duration {args.duration}s)")
+    summary = run_load_test(args.base_url, args.users, args.ramp_up, args.duration, args.iterations)
+    summary['config'] = {'base_url': args.base_url, 'users': args.users, 'ramp_up': args.ramp_up,
+                         'duration': args.duration, 'iterations': args.iterations,
+                         'started_at': started_at}
+    print_summary(summary)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    sys.exit(0 if summary['errors'] == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Prometheus metrics for Service PRO
+Request latency, database time, email latency and cache statistics, aggregated across gunicorn workers
+"""
+
+import os
+import socket
+import time
+from flask import Response, abort, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from sql_profiler import request_profile
+
+# With PROMETHEUS_MULTIPROC_DIR set (start.sh does) every worker writes its
+# samples there and /metrics adds them up, whichever worker serves it
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+REQUESTS = Counter('service_pro_http_requests_total', 'HTTP requests',
+                   ['endpoint', 'method', 'status'])
+REQUEST_LATENCY = Histogram('service_pro_http_request_duration_seconds', 'Time to build the response',
+                            ['endpoint', 'status'],
+                            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+DB_TIME = Histogram('service_pro_db_time_seconds', 'Database time per request', ['endpoint'],
+                    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+DB_QUERIES = Histogram('service_pro_db_queries_per_request', 'SQL statements per request', ['endpoint'],
+                       buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200))
+EMAIL_LATENCY = Histogram('service_pro_email_send_seconds', 'Time to send one email', ['result'],
+                          buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+# Per-worker values copied from the modules' own stats (labelled by worker_pid)
+WORKER_INFO = Gauge('service_pro_worker_info', 'One per live worker process',
+                    ['worker_pid', 'hostname'], multiprocess_mode='livesum')
+CACHE_LOOKUPS = Gauge('service_pro_user_cache_lookups', 'User cache lookups since the worker started',
+                      ['result', 'worker_pid'], multiprocess_mode='livesum')
+CACHE_HIT_RATIO = Gauge('service_pro_user_cache_hit_ratio', 'User cache hit ratio',
+                        ['worker_pid'], multiprocess_mode='livesum')
+PASSWORD_HASH_P95 = Gauge('service_pro_password_hash_p95_seconds', 'Recent p95 password hash/verify time',
+                          ['kind', 'worker_pid'], multiprocess_mode='livesum')
+WRITE_QUEUE_DEPTH = Gauge('service_pro_write_queue_depth', 'Jobs waiting for the SQLite writer',
+                          ['worker_pid'], multiprocess_mode='livesum')
+WRITE_QUEUE_AVG_BATCH = Gauge('service_pro_write_queue_avg_batch', 'Average jobs per group commit',
+                              ['worker_pid'], multiprocess_mode='livesum')
+
+_config = {
+    'token': '',
+    'refresh_seconds': 5.0,
+}
+_last_refresh = {'pid': None, 'at': 0.0}
+
+
+def instrument_mail(mail):
+    """Time every mail.send() call"""
+    send = mail.send
+
+    def timed_send(message):
+        started = time.perf_counter()
+        result = 'error'
+        try:
+            send(message)
+            result = 'ok'
+        finally:
+            EMAIL_LATENCY.labels(result).observe(time.perf_counter() - started)
+
+    mail.send = timed_send
+
+
+def _refresh_worker_gauges():
+    """Copy cache and queue statistics into the gauges, at most every refresh_seconds"""
+    pid = os.getpid()
+    now = time.monotonic()
+    if _last_refresh['pid'] == pid and now - _last_refresh['at'] < _config['refresh_seconds']:
+        return
+    _last_refresh.update(pid=pid, at=now)
+    from user_cache import cache_stats
+    from password_hashing import hash_stats
+    from write_queue import write_queue_stats
+
+    worker = str(pid)
+    WORKER_INFO.labels(worker, socket.gethostname()).set(1)
+    cache = cache_stats()
+    CACHE_LOOKUPS.labels('hit', worker).set(cache['hits'])
+    CACHE_LOOKUPS.labels('miss', worker).set(cache['misses'])
+    CACHE_HIT_RATIO.labels(worker).set(cache['hit_ratio'])
+    hashing = hash_stats()
+    for kind in ('hash', 'verify'):
+        PASSWORD_HASH_P95.labels(kind, worker).set(hashing[kind]['p95_ms'] / 1000.0)
+    queue = write_queue_stats()
+    WRITE_QUEUE_DEPTH.labels(worker).set(queue['depth'])
+    WRITE_QUEUE_AVG_BATCH.labels(worker).set(queue['avg_batch'])
+
+
+def _registry():
+    if not MULTIPROCESS:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def init_metrics(app, mail=None):
+    """Record request metrics and serve them at /metrics
+
+    Set METRICS_TOKEN to require "Authorization: Bearer <token>" on /metrics.
+    """
+    _config['token'] = app.config.get('METRICS_TOKEN', '')
+    if mail is not None:
+        instrument_mail(mail)
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = g.pop('request_started', None)
+        if started is None or request.endpoint == 'metrics':
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        status = str(response.status_code)
+        REQUESTS.labels(endpoint, request.method, status).inc()
+        REQUEST_LATENCY.labels(endpoint, status).observe(time.perf_counter() - started)
+        profile = request_profile()
+        DB_QUERIES.labels(endpoint).observe(profile['queries'] if profile else 0)
+        DB_TIME.labels(endpoint).observe(profile['db_ms'] / 1000.0 if profile else 0.0)
+        _refresh_worker_gauges()
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if _config['token'] and request.headers.get('Authorization') != f"Bearer {_config['token']}":
+            abort(401)
+        _refresh_worker_gauges()
+        return Response(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,215 @@
+"""
+Versioned schema migrations for Service PRO
+Each migration runs once, in order, and is recorded in the schema_version table
+"""
+
+from datetime import datetime
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.schema import CreateTable
+from money import convert_money_columns
+
+MIGRATIONS = []  # (version, description, function(engine))
+
+# Import models lazily to avoid circular import
+def get_models():
+    from app import db
+    return db
+
+def migration(version, description):
+    """Register a migration; versions must be unique and increasing"""
+    def register(function):
+        assert not MIGRATIONS or MIGRATIONS[-1][0] < version, 'migrations must be declared in order'
+        MIGRATIONS.append((version, description, function))
+        return function
+    return register
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+def add_column(engine, table, column, suffix=''):
+    """Add a model column to an existing table unless it is already there
+
+    Tables created by create_all already have every current column, so
+    migrations have to tolerate the column existing.
+    """
+    columns = {c['name'] for c in inspect(engine).get_columns(table)}
+    if column in columns:
+        return False
+    db = get_models()
+    column_type = db.metadata.tables[table].c[column].type.compile(dialect=engine.dialect)
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {_quote(engine, table)} ADD COLUMN {column} {column_type} {suffix}'.rstrip()))
+    print(f"Added {column} column to {table} table")
+    return True
+
+def drop_foreign_key(engine, table, column):
+    """Drop the foreign key on table.column, keeping the column and its rows
+
+    SQLite cannot drop a constraint, so there the table is rebuilt from the
+    model (which no longer declares the key) and the rows copied across.
+    """
+    inspector = inspect(engine)
+    if not any(fk['constrained_columns'] == [column] for fk in inspector.get_foreign_keys(table)):
+        return False
+    db = get_models()
+    model_table = db.metadata.tables[table]
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            metadata = MetaData()
+            for fk in model_table.foreign_keys:  # the copy's remaining keys need their targets
+                if fk.column.table.name not in metadata.tables:
+                    fk.column.table.to_metadata(metadata)
+            rebuilt = model_table.to_metadata(metadata, name=f'_{table}_rebuild')
+            columns = ', '.join(_quote(engine, c['name']) for c in inspector.get_columns(table)
+                                if c['name'] in model_table.c)
+            conn.execute(CreateTable(rebuilt))
+            conn.execute(text(f'INSERT INTO {_quote(engine, rebuilt.name)} ({columns}) '
+                              f'SELECT {columns} FROM {_quote(engine, table)}'))
+            conn.execute(text(f'DROP TABLE {_quote(engine, table)}'))
+            conn.execute(text(f'ALTER TABLE {_quote(engine, rebuilt.name)} RENAME TO {_quote(engine, table)}'))
+            for index in model_table.indexes:
+                index.create(bind=conn)
+        else:
+            keyword = 'FOREIGN KEY' if engine.dialect.name == 'mysql' else 'CONSTRAINT'
+            for fk in inspector.get_foreign_keys(table):
+                if fk['constrained_columns'] == [column]:
+                    conn.execute(text(f'ALTER TABLE {_quote(engine, table)} DROP {keyword} {_quote(engine, fk["name"])}'))
+    print(f"Dropped the foreign key on {table}.{column}")
+    return True
+
+def create_indexes(engine, index_names=None):
+    """Create the model indexes that are missing, without blocking writers where the backend allows it
+
+    PostgreSQL builds them CONCURRENTLY (outside a transaction); MySQL/InnoDB
+    and SQLite build secondary indexes without a long exclusive lock anyway.
+    """
+    db = get_models()
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing or (index_names and index.name not in index_names):
+                continue
+            if engine.dialect.name == 'postgresql':
+                index.dialect_options['postgresql']['concurrently'] = True
+                with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                    index.create(bind=conn)
+                index.dialect_options['postgresql']['concurrently'] = False
+            else:
+                index.create(bind=engine)
+            created.append(index.name)
+            print(f"Created index {index.name} on {table.name}")
+    return created
+
+@migration(1, 'Baseline: create missing tables and legacy columns')
+def _baseline(engine):
+    db = get_models()
+    db.metadata.create_all(bind=engine)
+    add_column(engine, 'user', 'reset_token')
+    add_column(engine, 'user', 'reset_token_expiry')
+    add_column(engine, 'user', 'admin_approved', 'DEFAULT FALSE')
+    add_column(engine, 'booking', 'admin_approved', 'DEFAULT FALSE')
+    add_column(engine, 'service', 'service_group_id', 'NOT NULL DEFAULT 1')
+    add_column(engine, 'commission', 'payout_batch_id', 'REFERENCES payout_batch(id)')
+    add_column(engine, 'commission', 'paid_at')
+
+@migration(2, 'Money columns as integer cents')
+def _money_cents(engine):
+    convert_money_columns(engine)
+
+@migration(3, 'Indexes for ratings, leaderboard, payouts and ledger')
+def _aggregate_indexes(engine):
+    create_indexes(engine, {'ix_feedback_handyman_created', 'ix_handyman_rank_group_score',
+                            'ix_commission_paid_handyman', 'ix_commission_payout_batch',
+                            'ix_ledger_entry_handyman_created'})
+
+@migration(4, 'Secondary indexes on booking, service and commission foreign keys and filters')
+def _lookup_indexes(engine):
+    create_indexes(engine, {'ix_booking_user_id', 'ix_booking_handyman_id', 'ix_booking_status',
+                            'ix_service_active_approved_group',
+                            'ix_commission_handyman_id', 'ix_commission_booking_id'})
+
+@migration(5, 'Backfill earnings ledger, rating aggregates and leaderboard')
+def _backfill_aggregates(engine):
+    db = get_models()
+    if engine.url != db.engine.url:
+        raise RuntimeError('The aggregate backfill runs through the app session; '
+                           'point SQLALCHEMY_DATABASE_URI at this database')
+    from app import rebuild_rating_aggregates, rebuild_leaderboard
+    from ledger import rebuild_ledger
+    # The backfill loads users through the current model, which needs migration 6's column
+    add_column(engine, 'user', 'cache_version', 'NOT NULL DEFAULT 0')
+    try:
+        entries = rebuild_ledger()
+        ratings = rebuild_rating_aggregates()
+        ranks = rebuild_leaderboard()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    print(f"Backfilled {entries} ledger entries, {ratings} rating rows and {ranks} leaderboard rows")
+
+@migration(6, 'User cache version for cross-worker identity cache invalidation')
+def _user_cache_version(engine):
+    add_column(engine, 'user', 'cache_version', 'NOT NULL DEFAULT 0')
+
+@migration(7, 'Ledger entries keep their commission ID without a foreign key')
+def _ledger_commission_reference(engine):
+    drop_foreign_key(engine, 'ledger_entry', 'commission_id')
+
+def _ensure_version_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE IF NOT EXISTS schema_version ('
+                          'version INTEGER PRIMARY KEY, '
+                          'description VARCHAR(200) NOT NULL, '
+                          'applied_at TIMESTAMP NOT NULL)'))
+
+def _stamp(engine, version, description):
+    with engine.begin() as conn:
+        conn.execute(text('INSERT INTO schema_version (version, description, applied_at) '
+                          'VALUES (:version, :description, :applied_at)'),
+                     {'version': version, 'description': description, 'applied_at': datetime.utcnow()})
+
+def applied_versions(engine):
+    if 'schema_version' not in inspect(engine).get_table_names():
+        return set()
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text('SELECT version FROM schema_version'))}
+
+def migration_status(engine):
+    """[(version, description, applied)] for every known migration"""
+    applied = applied_versions(engine)
+    return [(version, description, version in applied) for version, description, _ in MIGRATIONS]
+
+def upgrade(engine, log=print):
+    """Apply pending migrations in order and return the versions applied
+
+    A brand-new database is built by create_all and stamped with every
+    version, so the migrations only ever run against older schemas.
+    """
+    db = get_models()
+    fresh = not inspect(engine).get_table_names()
+    _ensure_version_table(engine)
+    if fresh:
+        db.metadata.create_all(bind=engine)
+        for version, description, _ in MIGRATIONS:
+            _stamp(engine, version, description)
+        log(f"Created a new database at schema version {MIGRATIONS[-1][0]}")
+        return []
+
+    applied = applied_versions(engine)
+    ran = []
+    for version, description, function in MIGRATIONS:
+        if version in applied:
+            continue
+        log(f"Applying migration {version}: {description}")
+        function(engine)
+        _stamp(engine, version, description)
+        ran.append(version)
+    if not ran:
+        log(f"Database is up to date (version {MIGRATIONS[-1][0]})")
+    return ran
@@ -0,0 +1,115 @@
+"""
+Money handling for Service PRO
+Amounts are stored as integer cents; this module converts, splits commissions and migrates old float columns
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import Integer, bindparam, cast, column, func, inspect, table as table_clause, text
+from sqlalchemy.ext.hybrid import hybrid_property
+
+# Platform commission in basis points (1000 = 10%)
+COMMISSION_RATE_BPS = 1000
+
+def to_cents(amount):
+    """Convert a decimal amount (float, str or Decimal) to integer cents"""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+def from_cents(cents):
+    """Convert integer cents to a float amount for display and JSON"""
+    return cents / 100.0
+
+def format_cents(cents):
+    """Exact two-decimal string, e.g. 1999 -> '19.99'"""
+    sign = '-' if cents < 0 else ''
+    return f'{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}'
+
+def split_commission(price_cents, rate_bps=COMMISSION_RATE_BPS):
+    """Split a price into (commission_cents, handyman_earnings_cents)
+
+    The commission is rounded half up and the handyman gets the rest, so
+    the two parts always add back to the price exactly.
+    """
+    commission_cents = (price_cents * rate_bps + 5000) // 10000
+    return commission_cents, price_cents - commission_cents
+
+def cents_property(column_name):
+    """Decimal-unit view of an integer cents column, also usable in queries"""
+    def getter(self):
+        value = getattr(self, column_name)
+        return None if value is None else from_cents(value)
+
+    def setter(self, value):
+        setattr(self, column_name, None if value is None else to_cents(value))
+
+    def expression(cls):
+        return getattr(cls, column_name) / 100.0
+
+    return hybrid_property(getter, setter, expr=expression)
+
+# Old float column -> new cents column, per table
+MONEY_COLUMNS = {
+    'service': [('price', 'price_cents')],
+    'booking': [('total_price', 'total_price_cents')],
+    'commission': [('service_price', 'service_price_cents'),
+                   ('commission_amount', 'commission_amount_cents'),
+                   ('handyman_earnings', 'handyman_earnings_cents')],
+    'payout_batch': [('total_earnings', 'total_earnings_cents'),
+                     ('total_commission', 'total_commission_cents')],
+    'ledger_entry': [('amount', 'amount_cents'),
+                     ('balance_after', 'balance_after_cents'),
+                     ('lifetime_after', 'lifetime_after_cents')],
+    'handyman_balance': [('balance', 'balance_cents'),
+                         ('lifetime_earnings', 'lifetime_earnings_cents'),
+                         ('total_paid', 'total_paid_cents')],
+}
+
+def backfill_statement(table, key, pending):
+    """UPDATE filling the cents columns of one primary-key range from the float columns
+
+    Built with SQLAlchemy so each dialect compiles its own integer cast
+    (MySQL only accepts CAST(... AS SIGNED)).
+    """
+    target = table_clause(table, column(key), *(column(name) for pair in pending for name in pair))
+    return (target.update()
+            .where(target.c[key] >= bindparam('start'), target.c[key] < bindparam('end'),
+                   target.c[pending[0][1]].is_(None))
+            .values({new: cast(func.round(target.c[old] * 100), Integer) for old, new in pending}))
+
+def convert_money_columns(engine, chunk_size=5000, log=print):
+    """Move float money columns to integer cents on an existing database
+
+    Adds each *_cents column, backfills it in primary-key chunks (one short
+    transaction per chunk so live writers are not blocked for long), then
+    drops the float column. Safe to re-run after an interruption.
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    for table, pairs in MONEY_COLUMNS.items():
+        if table not in tables:
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table)}
+        pending = [(old, new) for old, new in pairs if old in columns]
+        if not pending:
+            continue
+        if engine.dialect.name == 'sqlite' and engine.dialect.dbapi.sqlite_version_info < (3, 35, 0):
+            raise RuntimeError('SQLite 3.35 or newer is needed to drop the old float money columns')
+
+        key = inspector.get_pk_constraint(table)['constrained_columns'][0]
+        with engine.begin() as conn:
+            for old, new in pending:
+                if new not in columns:
+                    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {new} INTEGER'))
+
+        with engine.connect() as conn:
+            low, high = conn.execute(text(f'SELECT MIN({key}), MAX({key}) FROM {table}')).one()
+        update = backfill_statement(table, key, pending)
+        converted = 0
+        if low is not None:
+            for start in range(low, high + 1, chunk_size):
+                with engine.begin() as conn:
+                    converted += conn.execute(update, {'start': start, 'end': start + chunk_size}).rowcount
+
+        with engine.begin() as conn:
+            for old, new in pending:
+                conn.execute(text(f'ALTER TABLE {table} DROP COLUMN {old}'))
+        log(f"Converted {converted} {table} rows to cents ({', '.join(new for _, new in pending)})")
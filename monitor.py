@@ -2,38 +2,53 @@
 # -*- coding: utf-8 -*-
 """
 Simple monitoring script for Service PRO on Radicenter
-Checks application health and sends alerts if needed
+Checks application health and sends alerts if needed; with --daemon it keeps
+probing key pages and reports latency percentiles against an SLO
 Python 3.6+ compatible
 """
 
 import os
 import sys
+import json
+import math
+import argparse
 import requests
 import time
+from collections import Counter
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv('.env')
 
+BASE_URL = os.getenv('MONITOR_URL', 'http://127.0.0.1:5000').rstrip('/')
+
+# Probed in daemon mode; the AUTH ones only when MONITOR_EMAIL/MONITOR_PASSWORD are set
+ENDPOINTS = os.getenv('MONITOR_ENDPOINTS', '/healthz,/readyz,/,/services,/api/services,/login').split(',')
+AUTH_ENDPOINTS = os.getenv('MONITOR_AUTH_ENDPOINTS', '/api/admin/dashboard,/admin/dashboard').split(',')
+
 def check_application_health():
-    """Check if the application is running and responding"""
+    """Check if the application is running and responding (liveness)"""
     try:
-        # Check if the Flask app is responding
-        response = requests.get('http://127.0.0.1:5000/', timeout=10)
+        response = requests.get(f'{BASE_URL}/healthz', timeout=10)
         return response.status_code == 200
     except requests.exceptions.RequestException:
         return False
 
 def check_database_connection():
-    """Check database connectivity"""
+    """Check database connectivity and pool headroom through the app (readiness)"""
     try:
-        from app import db
-        # Simple query to test connection
-        db.engine.execute("SELECT 1")
-        return True
-    except Exception:
+        response = requests.get(f'{BASE_URL}/readyz', timeout=10)
+    except requests.exceptions.RequestException:
         return False
+    if response.status_code != 200:
+        try:
+            checks = response.json().get('checks', {})
+            log_status(f"Readiness: database={checks.get('database')} pool={checks.get('pool')}", "ERROR")
+        except ValueError:
+            pass
+        return False
+    return True
 
 def log_status(message, level='INFO'):
     """Log status to file and console"""
@@ -43,9 +58,167 @@ def log_status(message, level='INFO'):
     print(log_message)
 
     # Append to log file
+    os.makedirs('logs', exist_ok=True)
     with open('logs/monitor.log', 'a') as f:
         f.write(log_message + '\n')
 
+class LatencyHistogram:
+    """Latency histogram with HdrHistogram-style log-linear buckets
+
+    Values are microseconds. Each power of two is split into 64 linear
+    steps, so percentiles are exact below 128us and within 1.6% above,
+    whatever the range, in a few hundred buckets at most.
+    """
+
+    SUB_BUCKET_BITS = 6
+
+    def __init__(self):
+        self.counts = Counter()
+        self.count = 0
+        self.probes = 0
+        self.max = 0
+
+    def _bucket(self, value):
+        shift = max(0, value.bit_length() - (self.SUB_BUCKET_BITS + 1))
+        return shift, value >> shift
+
+    def record(self, value_us, expected_interval_us=None):
+        """Add one sample; with an expected interval, backfill the probes a stall held up
+
+        A probe that takes 3s while probing every 1s also delayed the next two
+        probes, so like HdrHistogram's recordValueWithExpectedInterval this
+        adds the 2s and 1s samples they would have seen (coordinated omission).
+        count includes those samples; probes counts only the real ones.
+        """
+        value = max(1, int(value_us))
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.probes += 1
+        self.max = max(self.max, value)
+        if expected_interval_us:
+            missed = value - int(expected_interval_us)
+            while missed >= expected_interval_us:
+                self.counts[self._bucket(missed)] += 1
+                self.count += 1
+                missed -= int(expected_interval_us)
+
+    def percentile(self, pct):
+        """Highest value in the bucket holding the pct-th percentile, in ms"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(pct / 100.0 * self.count))
+        seen = 0
+        for shift, sub in sorted(self.counts, key=lambda bucket: bucket[1] << bucket[0]):
+            seen += self.counts[(shift, sub)]
+            if seen >= target:
+                return round(min(((sub + 1) << shift) - 1, self.max) / 1000.0, 2)
+        return round(self.max / 1000.0, 2)
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.probes += other.probes
+        self.max = max(self.max, other.max)
+
+
+def login(session):
+    """Log the probe session in, so dashboards can be measured"""
+    email, password = os.getenv('MONITOR_EMAIL'), os.getenv('MONITOR_PASSWORD')
+    if not email or not password:
+        return False
+    try:
+        response = session.post(f'{BASE_URL}/api/auth/login', json={'email': email, 'password': password},
+                                timeout=10)
+    except requests.exceptions.RequestException:
+        return False
+    if response.status_code != 200:
+        log_status(f"Monitor login failed: {response.status_code}", "WARNING")
+    return response.status_code == 200
+
+
+def summarize(window, errors):
+    """{endpoint: {count, errors, error_rate, p50_ms, p95_ms, p99_ms, max_ms}} for one report window
+
+    count and error_rate use the probes actually sent; the backfilled
+    samples only feed the percentiles.
+    """
+    summary = {}
+    for path, histogram in window.items():
+        probes = histogram.probes
+        summary[path] = {
+            'count': probes,
+            'errors': errors[path],
+            'error_rate': round(errors[path] / probes, 4) if probes else 0.0,
+            'p50_ms': histogram.percentile(50),
+            'p95_ms': histogram.percentile(95),
+            'p99_ms': histogram.percentile(99),
+            'max_ms': round(histogram.max / 1000.0, 2),
+        }
+    return summary
+
+
+def check_slo(summary, slo_p95_ms, slo_error_rate):
+    """Endpoints whose p95 or error rate breaks the SLO"""
+    return [(path, stats) for path, stats in summary.items()
+            if stats['p95_ms'] > slo_p95_ms or stats['error_rate'] > slo_error_rate]
+
+
+def alert(breaches, slo_p95_ms, slo_error_rate):
+    for path, stats in breaches:
+        log_status(f"SLO breach on {path}: p95 {stats['p95_ms']}ms (SLO {slo_p95_ms}ms), "
+                   f"errors {stats['error_rate']:.2%} (SLO {slo_error_rate:.2%})", "ALERT")
+    webhook = os.getenv('MONITOR_ALERT_WEBHOOK')
+    if webhook and breaches:
+        try:
+            requests.post(webhook, json={'text': 'Service PRO SLO breach',
+                                         'breaches': {path: stats for path, stats in breaches}}, timeout=10)
+        except requests.exceptions.RequestException as e:
+            log_status(f"Alert webhook failed: {e}", "ERROR")
+
+
+def run_daemon(interval, report_every, slo_p95_ms, slo_error_rate, json_path=None):
+    """Probe the endpoints every interval seconds and report percentiles every report_every seconds"""
+    session = requests.Session()
+    endpoints = [path for path in ENDPOINTS if path]
+    if login(session):
+        endpoints += [path for path in AUTH_ENDPOINTS if path]
+    log_status(f"Probing {', '.join(endpoints)} every {interval}s, reporting every {report_every}s")
+
+    window = {path: LatencyHistogram() for path in endpoints}
+    errors = Counter()
+    next_probe = time.monotonic()
+    next_report = next_probe + report_every
+    while True:
+        for path in endpoints:
+            started = time.monotonic()
+            try:
+                response = session.get(f'{BASE_URL}{path}', timeout=10, allow_redirects=False)
+                failed = response.status_code >= 400
+            except requests.exceptions.RequestException:
+                failed = True
+            window[path].record((time.monotonic() - started) * 1e6, interval * 1e6)
+            if failed:
+                errors[path] += 1
+
+        if time.monotonic() >= next_report:
+            summary = summarize(window, errors)
+            for path, stats in summary.items():
+                log_status(f"{path}: n={stats['count']} errors={stats['errors']} p50={stats['p50_ms']}ms "
+                           f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms max={stats['max_ms']}ms")
+            if json_path:
+                with open(json_path, 'a') as f:
+                    f.write(json.dumps({'at': datetime.now().isoformat(timespec='seconds'),
+                                        'window_seconds': report_every, 'endpoints': summary}) + '\n')
+            alert(check_slo(summary, slo_p95_ms, slo_error_rate), slo_p95_ms, slo_error_rate)
+            window = {path: LatencyHistogram() for path in endpoints}
+            errors = Counter()
+            next_report += report_every
+
+        # Fixed rate: the schedule does not drift when a round is slow
+        next_probe += interval
+        time.sleep(max(0.0, next_probe - time.monotonic()))
+
+
 def main():
     """Main monitoring function"""
     print("🔍 Starting Service PRO monitoring...")
@@ -76,8 +249,26 @@ def main():
         log_status("Some systems reporting issues ✗", "WARNING")
         return False
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Service PRO health and latency monitor')
+    parser.add_argument('--daemon', action='store_true', help='keep probing and report latency percentiles')
+    parser.add_argument('--interval', type=float, default=float(os.getenv('MONITOR_INTERVAL', '10')),
+                        help='seconds between probe rounds (default 10)')
+    parser.add_argument('--report-every', type=float, default=float(os.getenv('MONITOR_REPORT_SECONDS', '60')),
+                        help='seconds per percentile report (default 60)')
+    parser.add_argument('--slo-p95-ms', type=float, default=float(os.getenv('MONITOR_SLO_P95_MS', '500')),
+                        help='alert when an endpoint p95 exceeds this (default 500)')
+    parser.add_argument('--slo-error-rate', type=float, default=float(os.getenv('MONITOR_SLO_ERROR_RATE', '0.01')),
+                        help='alert when an endpoint error rate exceeds this (default 0.01)')
+    parser.add_argument('--json', dest='json_path', default=os.getenv('MONITOR_JSON'),
+                        help='also append each report as a JSON line to this file')
+    return parser.parse_args()
+
 if __name__ == '__main__':
     try:
+        args = parse_args()
+        if args.daemon:
+            run_daemon(args.interval, args.report_every, args.slo_p95_ms, args.slo_error_rate, args.json_path)
         success = main()
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
@@ -0,0 +1,180 @@
+"""
+Password hashing for Service PRO
+Runs werkzeug hashing in a bounded process pool so login spikes don't block request threads
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHashBusy(Exception):
+    """Raised when too many hashes are already queued, or one did not finish in time"""
+
+
+_config = {
+    'method': 'pbkdf2:sha256:600000',
+    'salt_length': 16,
+    'workers': 2,
+    'max_queue': 32,
+    'timeout': 10.0,
+    'budget_ms': 250.0,
+    'prefix': None,
+}
+
+_pool = None
+_pool_pid = None
+_slots = None
+_lock = threading.Lock()
+_logger = None
+
+# Per-operation timing samples, in milliseconds
+_stats = {
+    'hash': {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'recent': deque(maxlen=512)},
+    'verify': {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'recent': deque(maxlen=512)},
+    'rejected': 0,
+    'rehashed': 0,
+}
+
+
+def init_password_hashing(app):
+    """Configure hashing parameters and pool limits from the app config"""
+    global _logger, _slots
+    _config['method'] = app.config.get('PASSWORD_HASH_METHOD', _config['method'])
+    _config['salt_length'] = app.config.get('PASSWORD_HASH_SALT_LENGTH', _config['salt_length'])
+    _config['workers'] = app.config.get('PASSWORD_HASH_WORKERS', _config['workers'])
+    _config['max_queue'] = app.config.get('PASSWORD_HASH_MAX_QUEUE', _config['max_queue'])
+    _config['timeout'] = app.config.get('PASSWORD_HASH_TIMEOUT', _config['timeout'])
+    _config['budget_ms'] = app.config.get('PASSWORD_HASH_BUDGET_MS', _config['budget_ms'])
+
+    # Hash once to learn the exact "method$" prefix werkzeug stores, e.g. the
+    # default iteration count gets spelled out for a bare "pbkdf2"
+    sample = generate_password_hash('', _config['method'], _config['salt_length'])
+    _config['prefix'] = sample.split('$', 1)[0]
+
+    _logger = app.logger
+    with _lock:
+        _slots = threading.BoundedSemaphore(_config['workers'] + _config['max_queue'])
+        _shutdown_pool()
+
+
+def _get_pool():
+    """Return the process pool, recreating it after a fork (gunicorn workers)"""
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=_config['workers'])
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _shutdown_pool():
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=False)
+    _pool = None
+    _pool_pid = None
+
+
+def _record(kind, elapsed_ms):
+    stats = _stats[kind]
+    stats['count'] += 1
+    stats['total_ms'] += elapsed_ms
+    stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+    stats['recent'].append(elapsed_ms)
+    if _logger and elapsed_ms > _config['budget_ms']:
+        _logger.warning(f"Password {kind} took {elapsed_ms:.1f}ms (budget {_config['budget_ms']:.0f}ms)")
+
+
+def _run(kind, func, *args):
+    """Run func in the pool (or inline with zero workers) and time it
+
+    A queue slot is held until the hash actually finishes, not just until
+    the caller stops waiting, so timed-out hashes still count against
+    PASSWORD_HASH_MAX_QUEUE.
+    """
+    started = time.perf_counter()
+    if _config['workers'] <= 0:
+        result = func(*args)
+    else:
+        slots = _slots
+        if slots is not None and not slots.acquire(blocking=False):
+            _stats['rejected'] += 1
+            raise PasswordHashBusy('Password hashing queue is full')
+        try:
+            future = _get_pool().submit(func, *args)
+        except Exception:
+            if slots is not None:
+                slots.release()
+            raise
+        if slots is not None:
+            future.add_done_callback(lambda _: slots.release())
+        try:
+            result = future.result(timeout=_config['timeout'])
+        except FutureTimeoutError:
+            future.cancel()  # frees the slot now if the hash never started
+            _stats['rejected'] += 1
+            raise PasswordHashBusy('Password hashing timed out')
+    _record(kind, (time.perf_counter() - started) * 1000)
+    return result
+
+
+def hash_password(password):
+    """Hash a password with the configured method and salt length"""
+    return _run('hash', generate_password_hash, password, _config['method'], _config['salt_length'])
+
+
+def verify_password(pwhash, password):
+    """Check a password against a stored hash"""
+    return _run('verify', check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """Return True if the stored hash was made with different parameters"""
+    if _config['prefix'] is None:
+        return False
+    try:
+        method, salt, _ = pwhash.split('$', 2)
+    except ValueError:
+        return True
+    return method != _config['prefix'] or len(salt) != _config['salt_length']
+
+
+def note_rehash():
+    _stats['rehashed'] += 1
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def hash_stats():
+    """Timing summary for this process"""
+    summary = {
+        'method': _config['prefix'] or _config['method'],
+        'salt_length': _config['salt_length'],
+        'workers': _config['workers'],
+        'max_queue': _config['max_queue'],
+        'budget_ms': _config['budget_ms'],
+        'rejected': _stats['rejected'],
+        'rehashed': _stats['rehashed'],
+    }
+    for kind in ('hash', 'verify'):
+        stats = _stats[kind]
+        recent = list(stats['recent'])
+        summary[kind] = {
+            'count': stats['count'],
+            'avg_ms': round(stats['total_ms'] / stats['count'], 2) if stats['count'] else 0.0,
+            'max_ms': round(stats['max_ms'], 2),
+            'p50_ms': round(_percentile(recent, 50), 2),
+            'p95_ms': round(_percentile(recent, 95), 2),
+            'p99_ms': round(_percentile(recent, 99), 2),
+        }
+    return summary
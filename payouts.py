@@ -0,0 +1,147 @@
+"""
+Commission payout runs for Service PRO
+Pays every unpaid commission up to a cutoff in one transaction and streams per-handyman statements
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from ledger import record_payout
+from money import format_cents, from_cents
+
+# Import models lazily to avoid circular import
+def get_models():
+    from app import db, User, Commission, PayoutBatch
+    return db, User, Commission, PayoutBatch
+
+STATEMENT_FIELDS = [
+    'handyman_id', 'first_name', 'last_name', 'email', 'commission_id', 'booking_id',
+    'service_price', 'commission_amount', 'handyman_earnings', 'created_at',
+]
+
+def payout_preview(cutoff):
+    """Per-handyman totals (in cents) of unpaid commissions created before cutoff"""
+    db, User, Commission, PayoutBatch = get_models()
+    return (db.session.query(Commission.handyman_id,
+                             db.func.count(Commission.id),
+                             db.func.sum(Commission.handyman_earnings_cents),
+                             db.func.sum(Commission.commission_amount_cents))
+            .filter(Commission.is_paid == False, Commission.created_at < cutoff)
+            .group_by(Commission.handyman_id)
+            .all())
+
+def run_payout(cutoff, created_by_id=None):
+    """Mark all unpaid commissions before cutoff as paid under one new batch
+
+    Returns the PayoutBatch, or None when there was nothing to pay. The
+    whole run is a single transaction.
+    """
+    db, User, Commission, PayoutBatch = get_models()
+    try:
+        batch = PayoutBatch(cutoff=cutoff, created_by_id=created_by_id)
+        db.session.add(batch)
+        db.session.flush()
+
+        commissions = Commission.__table__
+        paid = db.session.execute(
+            commissions.update()
+            .where(commissions.c.is_paid == False)
+            .where(commissions.c.created_at < cutoff)
+            .values(is_paid=True, payout_batch_id=batch.id, paid_at=datetime.utcnow())
+        ).rowcount
+        if not paid:
+            db.session.rollback()
+            return None
+
+        totals = (db.session.query(db.func.count(db.distinct(Commission.handyman_id)),
+                                   db.func.count(Commission.id),
+                                   db.func.sum(Commission.handyman_earnings_cents),
+                                   db.func.sum(Commission.commission_amount_cents))
+                  .filter(Commission.payout_batch_id == batch.id)
+                  .one())
+        (batch.handyman_count, batch.commission_count,
+         batch.total_earnings_cents, batch.total_commission_cents) = totals
+
+        # One ledger payout entry per handyman in the batch
+        for handyman_id, amount in (db.session.query(Commission.handyman_id, db.func.sum(Commission.handyman_earnings_cents))
+                                    .filter(Commission.payout_batch_id == batch.id)
+                                    .group_by(Commission.handyman_id)):
+            record_payout(handyman_id, amount, payout_batch_id=batch.id)
+        db.session.commit()
+        return batch
+    except Exception:
+        db.session.rollback()
+        raise
+
+def statement_rows(batch_id, chunk_size=1000):
+    """Yield statement rows for a batch, grouped by handyman (amounts in cents)"""
+    db, User, Commission, PayoutBatch = get_models()
+    query = (db.session.query(Commission.handyman_id, User.first_name, User.last_name, User.email,
+                              Commission.id, Commission.booking_id, Commission.service_price_cents,
+                              Commission.commission_amount_cents, Commission.handyman_earnings_cents,
+                              Commission.created_at)
+             .join(User, Commission.handyman_id == User.id)
+             .filter(Commission.payout_batch_id == batch_id)
+             .order_by(Commission.handyman_id, Commission.id)
+             .yield_per(chunk_size))
+    for row in query:
+        yield dict(zip(STATEMENT_FIELDS, row))
+
+def stream_statement_csv(batch_id):
+    """Generate the statement as CSV text chunks"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=STATEMENT_FIELDS)
+    writer.writeheader()
+    for row in statement_rows(batch_id):
+        row['created_at'] = row['created_at'].isoformat() if row['created_at'] else ''
+        for field in ('service_price', 'commission_amount', 'handyman_earnings'):
+            row[field] = format_cents(row[field])
+        writer.writerow(row)
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def stream_statement_json(batch_id):
+    """Generate the statement as JSON, one object per handyman"""
+    db, User, Commission, PayoutBatch = get_models()
+    batch = db.session.get(PayoutBatch, batch_id)
+    yield json.dumps({
+        'batch_id': batch.id,
+        'cutoff': batch.cutoff.isoformat(),
+        'created_at': batch.created_at.isoformat() if batch.created_at else None,
+        'total_earnings': batch.total_earnings,
+    })[:-1] + ', "handymen": ['
+
+    current = None
+    for row in statement_rows(batch_id):
+        if current and current['handyman_id'] != row['handyman_id']:
+            yield json.dumps(_finish_handyman(current)) + ', '
+            current = None
+        if current is None:
+            current = {
+                'handyman_id': row['handyman_id'],
+                'first_name': row['first_name'],
+                'last_name': row['last_name'],
+                'email': row['email'],
+                'total_earnings_cents': 0,
+                'commissions': [],
+            }
+        current['total_earnings_cents'] += row['handyman_earnings']
+        current['commissions'].append({
+            'commission_id': row['commission_id'],
+            'booking_id': row['booking_id'],
+            'service_price': from_cents(row['service_price']),
+            'commission_amount': from_cents(row['commission_amount']),
+            'handyman_earnings': from_cents(row['handyman_earnings']),
+            'created_at': row['created_at'].isoformat() if row['created_at'] else None,
+        })
+    if current:
+        yield json.dumps(_finish_handyman(current))
+    yield ']}'
+
+def _finish_handyman(entry):
+    entry['total_earnings'] = from_cents(entry.pop('total_earnings_cents'))
+    return entry
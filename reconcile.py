@@ -0,0 +1,115 @@
+"""
+Commission reconciliation for Service PRO
+Finds bookings without a commission (and commissions that disagree with their booking) in a few set-based queries
+"""
+
+from datetime import datetime
+from ledger import record_accruals
+from money import split_commission
+
+# Import models lazily to avoid circular import
+def get_models():
+    from app import db, Booking, Commission
+    return db, Booking, Commission
+
+def _missing_query(db, Booking, Commission):
+    """Bookings with a handyman but no commission row (anti-join)"""
+    return (db.session.query(Booking.id, Booking.handyman_id, Booking.total_price_cents)
+            .outerjoin(Commission, Commission.booking_id == Booking.id)
+            .filter(Commission.id.is_(None), Booking.handyman_id.isnot(None)))
+
+def find_discrepancies(sample_size=20):
+    """Counts and sample IDs of everything that does not reconcile"""
+    db, Booking, Commission = get_models()
+    missing = _missing_query(db, Booking, Commission)
+    mismatched = (db.session.query(Commission.id)
+                  .join(Booking, Commission.booking_id == Booking.id)
+                  .filter(db.or_(Commission.service_price_cents != Booking.total_price_cents,
+                                 Commission.handyman_id != Booking.handyman_id,
+                                 Commission.commission_amount_cents + Commission.handyman_earnings_cents
+                                 != Commission.service_price_cents)))
+    orphaned = (db.session.query(Commission.id)
+                .outerjoin(Booking, Commission.booking_id == Booking.id)
+                .filter(Booking.id.is_(None)))
+    duplicated = (db.session.query(Commission.booking_id)
+                  .group_by(Commission.booking_id)
+                  .having(db.func.count(Commission.id) > 1))
+    unassigned = (db.session.query(Booking.id)
+                  .outerjoin(Commission, Commission.booking_id == Booking.id)
+                  .filter(Commission.id.is_(None), Booking.handyman_id.is_(None)))
+
+    def summary(query, column):
+        return {
+            'count': query.order_by(None).count(),
+            'sample': [row[0] for row in query.order_by(column).limit(sample_size)],
+        }
+
+    return {
+        'missing': summary(missing, Booking.id),
+        'mismatched': summary(mismatched, Commission.id),
+        'orphaned': summary(orphaned, Commission.id),
+        'duplicated_bookings': summary(duplicated, Commission.booking_id),
+        'unassigned_bookings': summary(unassigned, Booking.id),
+    }
+
+def reconcile_commissions(dry_run=False, chunk_size=5000):
+    """Insert the missing commission rows in chunks and report the rest
+
+    Each chunk is one multi-row INSERT plus its ledger accruals, committed
+    on its own. Mismatched, orphaned and duplicated commissions are only
+    reported; they may already be paid out and need a human decision.
+    """
+    db, Booking, Commission = get_models()
+    report = find_discrepancies()
+    report['inserted'] = 0
+    if dry_run or not report['missing']['count']:
+        return report
+
+    commissions = Commission.__table__
+    last_id = 0
+    while True:
+        rows = (_missing_query(db, Booking, Commission)
+                .filter(Booking.id > last_id)
+                .order_by(Booking.id)
+                .limit(chunk_size)
+                .all())
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        now = datetime.utcnow()
+        values = []
+        for booking_id, handyman_id, price_cents in rows:
+            commission_cents, earnings_cents = split_commission(price_cents)
+            values.append({
+                'booking_id': booking_id, 'handyman_id': handyman_id,
+                'service_price_cents': price_cents, 'commission_amount_cents': commission_cents,
+                'handyman_earnings_cents': earnings_cents, 'is_paid': False, 'created_at': now,
+            })
+        try:
+            db.session.execute(commissions.insert(), values)
+            created = (db.session.query(Commission.id, Commission.handyman_id, Commission.handyman_earnings_cents)
+                       .filter(Commission.booking_id.in_([row[0] for row in rows]))
+                       .order_by(Commission.id)
+                       .all())
+            record_accruals(created)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        report['inserted'] += len(values)
+    return report
+
+def print_report(report, log=print):
+    labels = [
+        ('missing', 'Bookings without a commission'),
+        ('mismatched', 'Commissions that disagree with their booking'),
+        ('orphaned', 'Commissions whose booking is gone'),
+        ('duplicated_bookings', 'Bookings with more than one commission'),
+        ('unassigned_bookings', 'Bookings without a handyman (skipped)'),
+    ]
+    for key, label in labels:
+        entry = report[key]
+        sample = f" (e.g. {', '.join(str(i) for i in entry['sample'])})" if entry['count'] else ''
+        log(f"{label}: {entry['count']}{sample}")
+    log(f"Commission records created: {report['inserted']}")
@@ -0,0 +1,187 @@
+"""
+Reporting snapshot for Service PRO
+Dashboards and exports read a periodically refreshed copy of the database so long scans never hold locks on it
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from flask_sqlalchemy import get_state
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from database import reads_from, register_read_engine, REPLICA_BIND
+from file_lock import try_lock
+
+REPORTING_BIND = 'reporting'
+
+_config = {
+    'enabled': False,
+    'path': None,
+    'max_age': 300.0,
+    'pages': 1024,
+    'sleep': 0.005,
+}
+
+_engines = {}  # snapshot path or engine id -> reporting engine
+_refreshing = threading.Lock()
+
+_stats = {
+    'refreshes': 0,
+    'failures': 0,
+    'last_duration_ms': 0.0,
+    'last_pages': 0,
+    'last_error': None,
+}
+
+
+def init_reporting(app):
+    """Read the REPORTING_* settings; the snapshot path is relative to the instance folder"""
+    _config['enabled'] = bool(app.config.get('REPORTING_SNAPSHOT'))
+    path = app.config.get('REPORTING_SNAPSHOT_PATH') or 'reporting_snapshot.db'
+    _config['path'] = path if os.path.isabs(path) else os.path.join(app.instance_path, path)
+    _config['max_age'] = app.config.get('REPORTING_SNAPSHOT_MAX_AGE', _config['max_age'])
+    _config['pages'] = app.config.get('REPORTING_BACKUP_PAGES', _config['pages'])
+    _config['sleep'] = app.config.get('REPORTING_BACKUP_SLEEP_MS', _config['sleep'] * 1000) / 1000.0
+
+
+def _primary_engine(app):
+    return get_state(app).db.get_engine(app)
+
+
+def snapshot_age(app):
+    """Seconds since the current snapshot was taken, or None if there is none
+
+    On PostgreSQL every reporting transaction gets its own consistent
+    snapshot, so the age is always 0.
+    """
+    if not _config['enabled']:
+        return None
+    if _primary_engine(app).dialect.name == 'postgresql':
+        return 0.0
+    try:
+        return max(0.0, time.time() - os.path.getmtime(_config['path']))
+    except OSError:
+        return None
+
+
+def refresh_snapshot(app):
+    """Copy the SQLite database to the snapshot file with the online backup API
+
+    The copy is written next to the snapshot and swapped in with os.replace,
+    so readers see either the old or the new snapshot, never a partial one.
+    In WAL mode the whole copy is one read transaction, which never blocks
+    writers; in rollback-journal mode it copies REPORTING_BACKUP_PAGES pages
+    at a time and sleeps between steps so bookings can get the write lock.
+    Returns the number of pages copied, or None if another process is
+    already refreshing.
+    """
+    engine = _primary_engine(app)
+    if engine.dialect.name != 'sqlite':
+        raise RuntimeError('Reporting snapshots are only taken of SQLite databases')
+    path = _config['path']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with try_lock(path + '.lock') as locked:
+        if not locked:
+            return None
+        started = time.time()
+        tmp_path = path + '.tmp'
+        source = sqlite3.connect(engine.url.database)
+        target = sqlite3.connect(tmp_path)
+        try:
+            wal = source.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal'
+            source.backup(target, pages=-1 if wal else _config['pages'], sleep=_config['sleep'])
+            # The snapshot is opened immutable, which needs a rollback-journal file
+            target.execute('PRAGMA journal_mode=DELETE')
+            pages = target.execute('PRAGMA page_count').fetchone()[0]
+        except Exception as e:
+            _stats['failures'] += 1
+            _stats['last_error'] = str(e)
+            raise
+        finally:
+            target.close()
+            source.close()
+        os.utime(tmp_path, (started, started))
+        os.replace(tmp_path, path)
+
+    _stats['refreshes'] += 1
+    _stats['last_duration_ms'] = round((time.time() - started) * 1000, 2)
+    _stats['last_pages'] = pages
+    _stats['last_error'] = None
+    return pages
+
+
+def _refresh_in_background(app):
+    if not _refreshing.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            with app.app_context():
+                refresh_snapshot(app)
+        except Exception as e:
+            print(f"Reporting snapshot refresh failed: {e}")
+        finally:
+            _refreshing.release()
+
+    threading.Thread(target=run, name='reporting-snapshot', daemon=True).start()
+
+
+def _snapshot_engine(path):
+    if path not in _engines:
+        # immutable=1: no locks are taken on the file, it is replaced rather than modified
+        _engines[path] = create_engine(
+            'sqlite://', poolclass=NullPool,
+            creator=lambda: sqlite3.connect(f'file:{path}?immutable=1', uri=True, check_same_thread=False))
+    return _engines[path]
+
+
+def _reporting_engine(app):
+    """Engine for @reporting_reads views; None means read the primary
+
+    Without a snapshot the reads go to the replica if there is one.
+    """
+    fallback = get_state(app).db.get_engine(app, bind=REPLICA_BIND) if REPLICA_BIND in (
+        app.config.get('SQLALCHEMY_BINDS') or {}) else None
+    if not _config['enabled']:
+        return fallback
+    engine = fallback or _primary_engine(app)
+    if engine.dialect.name == 'postgresql':
+        key = id(engine)
+        if key not in _engines:
+            # One consistent snapshot per transaction, and no accidental writes
+            _engines[key] = engine.execution_options(isolation_level='REPEATABLE READ',
+                                                     postgresql_readonly=True)
+        return _engines[key]
+    if engine.dialect.name != 'sqlite':
+        return fallback
+
+    age = snapshot_age(app)
+    if age is None or age > _config['max_age']:
+        _refresh_in_background(app)
+    if age is None:
+        return fallback
+    return _snapshot_engine(_config['path'])
+
+
+register_read_engine(REPORTING_BIND, _reporting_engine)
+
+reporting_reads = reads_from(REPORTING_BIND)
+
+
+def reporting_stats(app):
+    """Snapshot age and refresh timings for this process"""
+    age = snapshot_age(app)
+    return {
+        'enabled': _config['enabled'],
+        'backend': _primary_engine(app).dialect.name,
+        'path': _config['path'],
+        'age_seconds': None if age is None else round(age, 1),
+        'max_age_seconds': _config['max_age'],
+        'refreshes': _stats['refreshes'],
+        'failures': _stats['failures'],
+        'last_duration_ms': _stats['last_duration_ms'],
+        'last_pages': _stats['last_pages'],
+        'last_error': _stats['last_error'],
+    }
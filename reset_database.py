@@ -7,6 +7,7 @@ Removes old database and creates new one with updated schema
 import os
 import sys
 from app import app, db
+from backups import safety_copy
 
 def reset_database():
     """Reset the database to use the new schema"""
@@ -16,6 +17,9 @@ def reset_database():
     db_path = 'instance/service_app.db'
     if os.path.exists(db_path):
         try:
+            # Keep a copy: this deletes every user and booking
+            backup_path = safety_copy(db_path, 'reset')
+            print(f"Backed up old database to {backup_path}")
             os.remove(db_path)
             print(f"Removed old database: {db_path}")
         except Exception as e:
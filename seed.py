@@ -0,0 +1,296 @@
+"""
+Synthetic data generator for Service PRO
+Fills the database with a reproducible, production-sized dataset (customers, handymen, services, bookings,
+commissions, ledger and feedback) using bulk Core inserts
+"""
+
+import math
+import random
+import time
+from datetime import datetime, time as clock, timedelta
+from sqlalchemy import func, select
+from data_migration import _insert_chunk, reset_sequences
+from migrations import MIGRATIONS, applied_versions
+from ledger import ACCRUAL
+from money import split_commission
+from password_hashing import hash_password
+
+SEED_PASSWORD = 'seed-password'
+
+FIRST_NAMES = ['Mari', 'Jaan', 'Kati', 'Andres', 'Liis', 'Toomas', 'Kristiina', 'Mart', 'Anna', 'Ivan',
+               'Olga', 'Sergei', 'Piret', 'Priit', 'Tiina', 'Rein', 'Natalja', 'Marko', 'Kadri', 'Aleksei']
+LAST_NAMES = ['Tamm', 'Saar', 'Sepp', 'Mägi', 'Kask', 'Kukk', 'Rebane', 'Ilves', 'Pärn', 'Koppel',
+              'Ivanov', 'Smirnov', 'Kuznetsov', 'Lepp', 'Oja', 'Vaher', 'Kõiv', 'Luik', 'Raud', 'Karu']
+STREETS = ['Narva mnt', 'Pärnu mnt', 'Tartu mnt', 'Mustamäe tee', 'Paldiski mnt', 'Riia', 'Vabaduse pst',
+           'Kalamaja', 'Ülikooli', 'Rüütli']
+CITIES = ['Tallinn'] * 6 + ['Tartu'] * 2 + ['Pärnu', 'Narva']
+SPECIAL_REQUESTS = ['Please call before arriving', 'Parking is in the courtyard', 'Dog at home',
+                    'Bring your own materials', 'Second floor, no elevator', 'Weekend preferred']
+COMMENTS = {
+    1: ['Did not show up on time', 'Poor quality, had to redo it'],
+    2: ['Job done but sloppy', 'Expensive for what it was'],
+    3: ['OK', 'Average work'],
+    4: ['Good work', 'Friendly and fast'],
+    5: ['Excellent, highly recommended!', 'Perfect job, will book again'],
+}
+
+# Typical price (cents) per service group name; other groups use DEFAULT_PRICE_CENTS
+GROUP_PRICES_CENTS = {'Kondiiter': 4500, 'Ehitus': 15000, 'Koristus': 6000, 'IT abi': 5000}
+DEFAULT_PRICE_CENTS = 7000
+
+# Share of bookings per status by where the booking date lies relative to the end date
+FUTURE_STATUSES = (('pending', 45), ('approved', 50), ('declined', 5))
+RECENT_STATUSES = (('in_progress', 40), ('completed', 50), ('approved', 10))  # last two days
+PAST_STATUSES = (('completed', 85), ('declined', 8), ('approved', 4), ('pending', 3))
+HANDLED_STATUSES = {'approved', 'in_progress', 'completed'}
+
+FEEDBACK_SHARE = 0.6  # of completed bookings
+
+
+# Import models lazily to avoid circular import
+def get_models():
+    from app import (db, User, ServiceGroup, Service, Booking, Commission, LedgerEntry, HandymanBalance,
+                     Feedback, WorkHours, rebuild_rating_aggregates, rebuild_leaderboard, USER, HANDYMAN)
+    return (db, User, ServiceGroup, Service, Booking, Commission, LedgerEntry, HandymanBalance, Feedback,
+            WorkHours, rebuild_rating_aggregates, rebuild_leaderboard, USER, HANDYMAN)
+
+
+def _pick(rng, weighted):
+    """One value from ((value, weight), ...)"""
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights)[0]
+
+
+def _cumulative(weights):
+    total, cumulative = 0.0, []
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return cumulative
+
+
+def _sorted_uniforms(rng, count):
+    """count uniform numbers in [0, 1) in ascending order, one at a time and without storing them
+
+    Walks the order statistics from the top (the maximum of i uniforms is
+    U ** (1 / i)) and mirrors them, so bookings come out in time order.
+    """
+    current = 1.0
+    for remaining in range(count, 0, -1):
+        current *= rng.random() ** (1.0 / remaining)
+        yield 1.0 - current
+
+
+class _Ids:
+    """Next free primary key per table, so child rows can reference parents before they are inserted"""
+
+    def __init__(self, conn, tables):
+        self.next = {table.name: (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+                     for table in tables}
+
+    def take(self, table):
+        value = self.next[table.name]
+        self.next[table.name] += 1
+        return value
+
+
+def _full_row(table, values):
+    """Every column present (NULL where unset), as COPY and executemany need identical keys"""
+    row = dict.fromkeys(table.columns.keys())
+    row.update(values)
+    return row
+
+
+def _insert(engine, table, rows, chunk_size):
+    for start in range(0, len(rows), chunk_size):
+        with engine.begin() as conn:
+            _insert_chunk(conn, table, rows[start:start + chunk_size])
+
+
+def seed_database(engine, users=10000, bookings=100000, handymen=None, days=730, seed=42, end_date=None,
+                  chunk_size=10000, log=print):
+    """Append a synthetic dataset; the same seed and end_date always produce the same rows
+    (apart from the salted password hash)
+
+    Customer activity and service popularity are Pareto distributed, every
+    handyman has a quality level that drives their ratings, and bookings
+    are spread over the last `days` days (growing over time) plus up to
+    three weeks ahead, with statuses that depend on the booking date. Every
+    booking gets a commission and a ledger accrual like place_booking
+    makes; commissions are left unpaid so payout runs have work to do.
+    Rating aggregates and leaderboard ranks are rebuilt at the end.
+    Needs at least one service group (flask create-service-groups).
+    Returns the number of rows written per table.
+    """
+    (db, User, ServiceGroup, Service, Booking, Commission, LedgerEntry, HandymanBalance, Feedback, WorkHours,
+     rebuild_rating_aggregates, rebuild_leaderboard, USER, HANDYMAN) = get_models()
+    pending = [version for version, _, _ in MIGRATIONS if version not in applied_versions(engine)]
+    if pending:
+        raise RuntimeError(f'Database has pending migrations {pending}; run flask migrate first')
+    rng = random.Random(seed)
+    if handymen is None:
+        handymen = max(users // 20, 1)
+    end = datetime.combine(end_date or datetime.utcnow().date(), clock())
+    start = end - timedelta(days=days)
+    prefix = f'seed{seed}'
+
+    users_table, groups_table = User.__table__, ServiceGroup.__table__
+    services_table, bookings_table = Service.__table__, Booking.__table__
+    commissions_table, ledger_table = Commission.__table__, LedgerEntry.__table__
+    balances_table, feedback_table = HandymanBalance.__table__, Feedback.__table__
+    hours_table = WorkHours.__table__
+    with engine.connect() as conn:
+        if conn.execute(select(users_table.c.id).where(users_table.c.email == f'{prefix}-0@example.com')).first():
+            raise RuntimeError(f'Database already has the data for seed {seed}; use another --seed')
+        groups = conn.execute(select(groups_table.c.id, groups_table.c.name)
+                              .where(groups_table.c.is_active.isnot(False))
+                              .order_by(groups_table.c.id)).all()
+        if not groups:
+            raise RuntimeError('No service groups; run flask create-service-groups first')
+        ids = _Ids(conn, [users_table, services_table, bookings_table, commissions_table, ledger_table,
+                          feedback_table, hours_table])
+
+    started = time.monotonic()
+    counts = dict.fromkeys(['user', 'service', 'work_hours', 'booking', 'commission', 'ledger_entry',
+                            'feedback', 'handyman_balance'], 0)
+    password_hash = hash_password(SEED_PASSWORD)
+
+    def person(index, role):
+        joined = start - timedelta(days=rng.uniform(0, 180))
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        return _full_row(users_table, {
+            'id': ids.take(users_table), 'username': f'{prefix}-{index}', 'email': f'{prefix}-{index}@example.com',
+            'password_hash': password_hash, 'role': role, 'first_name': first, 'last_name': last,
+            'phone': f'+372 5{rng.randrange(10 ** 6, 10 ** 7)}',
+            'address': f'{rng.choice(STREETS)} {rng.randint(1, 150)}, {rng.choice(CITIES)}',
+            'is_approved': True, 'admin_approved': role == HANDYMAN and rng.random() < 0.9,
+            'created_at': joined, 'average_score': 0.0, 'total_feedbacks': 0, 'cache_version': 0,
+        })
+
+    # Handymen first, so users and handymen keep a stable index whatever the mix
+    handyman_rows = [person(index, HANDYMAN) for index in range(handymen)]
+    customer_rows = [person(handymen + index, USER) for index in range(users)]
+    _insert(engine, users_table, handyman_rows + customer_rows, chunk_size)
+    counts['user'] = len(handyman_rows) + len(customer_rows)
+    log(f"  user: {counts['user']} rows ({handymen} handymen)")
+
+    quality = {row['id']: min(max(rng.gauss(4.2, 0.5), 1.5), 5.0) for row in handyman_rows}
+    service_rows, hours_rows = [], []
+    for handyman in handyman_rows:
+        for _ in range(1 + min(int(rng.expovariate(0.7)), 7)):
+            group_id, group_name = rng.choice(groups)
+            typical = GROUP_PRICES_CENTS.get(group_name, DEFAULT_PRICE_CENTS)
+            price_cents = max(int(rng.lognormvariate(math.log(typical), 0.45)) // 100 * 100, 500)
+            created = handyman['created_at'] + (start - handyman['created_at']) * rng.random()
+            service_rows.append(_full_row(services_table, {
+                'id': ids.take(services_table), 'name': f'{group_name} {rng.randint(1, 999)}',
+                'description': f'{group_name} by {handyman["first_name"]} {handyman["last_name"]}',
+                'price_cents': price_cents, 'duration_hours': _pick(rng, ((1, 3), (2, 4), (3, 2), (4, 2), (8, 1))),
+                'category': group_name, 'service_group_id': group_id, 'handyman_id': handyman['id'],
+                'is_active': rng.random() < 0.95, 'is_approved': rng.random() < 0.9,
+                'created_at': created, 'updated_at': created,
+            }))
+        first_day, last_day = (0, 4) if rng.random() < 0.8 else (0, 5)
+        for day in range(first_day, last_day + 1):
+            hours_rows.append(_full_row(hours_table, {
+                'id': ids.take(hours_table), 'handyman_id': handyman['id'], 'day_of_week': day,
+                'start_time': clock(rng.choice((7, 8, 9))), 'end_time': clock(rng.choice((16, 17, 18))),
+                'is_active': True, 'created_at': handyman['created_at'],
+            }))
+    _insert(engine, services_table, service_rows, chunk_size)
+    _insert(engine, hours_table, hours_rows, chunk_size)
+    counts['service'], counts['work_hours'] = len(service_rows), len(hours_rows)
+    log(f"  service: {counts['service']} rows, work_hours: {counts['work_hours']} rows")
+
+    # A few heavy customers and popular services, a long tail of occasional ones
+    # (capped, so that no single account dominates a small dataset)
+    customer_weights = _cumulative(min(rng.paretovariate(1.5), 50.0) for _ in customer_rows)
+    service_weights = _cumulative(min(rng.paretovariate(1.2), 100.0) * (1.0 if row['is_active'] and row['is_approved'] else 0.05)
+                                  for row in service_rows)
+    customer_ids = [row['id'] for row in customer_rows]
+    services = [(row['id'], row['handyman_id'], row['price_cents']) for row in service_rows]
+    balances = {}  # handyman_id -> [balance, lifetime]
+    span = (end - start).total_seconds()
+
+    chunk = {'booking': [], 'commission': [], 'ledger_entry': [], 'feedback': []}
+
+    def flush():
+        with engine.begin() as conn:
+            for table in (bookings_table, commissions_table, ledger_table, feedback_table):
+                if chunk[table.name]:
+                    _insert_chunk(conn, table, chunk[table.name])
+                    counts[table.name] += len(chunk[table.name])
+                    chunk[table.name] = []
+
+    for number, position in enumerate(_sorted_uniforms(rng, bookings), 1):
+        # sqrt spreads bookings so that recent months are busier than old ones
+        created = start + timedelta(seconds=span * math.sqrt(position))
+        booking_date = datetime.combine(created.date() + timedelta(days=rng.randint(1, 21)),
+                                        clock(rng.randint(8, 17)))
+        if booking_date >= end:
+            status = _pick(rng, FUTURE_STATUSES)
+        elif booking_date >= end - timedelta(days=2):
+            status = _pick(rng, RECENT_STATUSES)
+        else:
+            status = _pick(rng, PAST_STATUSES)
+        service_id, handyman_id, price_cents = rng.choices(services, cum_weights=service_weights)[0]
+        customer_id = rng.choices(customer_ids, cum_weights=customer_weights)[0]
+        booking_id = ids.take(bookings_table)
+        chunk['booking'].append(_full_row(bookings_table, {
+            'id': booking_id, 'user_id': customer_id, 'service_id': service_id,
+            'handyman_id': handyman_id if status in HANDLED_STATUSES else None,
+            'booking_date': booking_date, 'status': status,
+            'special_requests': rng.choice(SPECIAL_REQUESTS) if rng.random() < 0.2 else None,
+            'total_price_cents': price_cents, 'admin_approved': status in HANDLED_STATUSES, 'created_at': created,
+        }))
+
+        commission_cents, earnings_cents = split_commission(price_cents)
+        commission_id = ids.take(commissions_table)
+        chunk['commission'].append(_full_row(commissions_table, {
+            'id': commission_id, 'booking_id': booking_id, 'handyman_id': handyman_id,
+            'service_price_cents': price_cents, 'commission_amount_cents': commission_cents,
+            'handyman_earnings_cents': earnings_cents, 'is_paid': False, 'created_at': created,
+        }))
+        totals = balances.setdefault(handyman_id, [0, 0])
+        totals[0] += earnings_cents
+        totals[1] += earnings_cents
+        chunk['ledger_entry'].append(_full_row(ledger_table, {
+            'id': ids.take(ledger_table), 'handyman_id': handyman_id, 'entry_type': ACCRUAL,
+            'amount_cents': earnings_cents, 'commission_id': commission_id,
+            'balance_after_cents': totals[0], 'lifetime_after_cents': totals[1], 'created_at': created,
+        }))
+
+        if status == 'completed' and rng.random() < FEEDBACK_SHARE:
+            rating = min(max(round(rng.gauss(quality[handyman_id], 0.8)), 1), 5)
+            left_at = min(booking_date + timedelta(hours=rng.uniform(2, 24 * 7)), end)
+            chunk['feedback'].append(_full_row(feedback_table, {
+                'id': ids.take(feedback_table), 'booking_id': booking_id, 'user_id': customer_id,
+                'handyman_id': handyman_id, 'rating': rating,
+                'comment': rng.choice(COMMENTS[rating]) if rng.random() < 0.5 else None, 'created_at': left_at,
+            }))
+
+        if len(chunk['booking']) >= chunk_size:
+            flush()
+            if number % (chunk_size * 10) == 0:
+                elapsed = time.monotonic() - started
+                log(f"  booking: {number}/{bookings} ({number / elapsed:.0f} bookings/s)")
+    flush()
+
+    balance_rows = [{'handyman_id': handyman_id, 'balance_cents': balance, 'lifetime_earnings_cents': lifetime,
+                     'total_paid_cents': 0, 'updated_at': end} for handyman_id, (balance, lifetime) in balances.items()]
+    _insert(engine, balances_table, balance_rows, chunk_size)
+    counts['handyman_balance'] = len(balance_rows)
+    reset_sequences(engine, [users_table, services_table, hours_table, bookings_table, commissions_table,
+                             ledger_table, feedback_table])
+
+    rebuild_rating_aggregates()
+    counts['handyman_rank'] = rebuild_leaderboard()
+    db.session.commit()
+
+    seconds = time.monotonic() - started
+    total = sum(counts.values())
+    for table in ('booking', 'commission', 'ledger_entry', 'feedback', 'handyman_balance', 'handyman_rank'):
+        log(f"  {table}: {counts[table]} rows")
+    log(f"Seeded {total} rows in {seconds:.2f}s ({total / seconds if seconds > 0 else 0:.0f} rows/s); "
+        f"every seeded account's password is {SEED_PASSWORD!r}")
+    return counts
@@ -16,7 +16,7 @@ load_dotenv('.env.production')
 db_uri = os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///instance/service_app.db')
 if db_uri.startswith('mysql'):
     try:
-        import PyMySQL  # Python 3 MySQL driver
+        import pymysql  # Python 3 MySQL driver
         os.environ['SQLALCHEMY_MYSQL_NO_MYSQLDB'] = '1'
         print("[OK] Configured SQLAlchemy to use PyMySQL for MySQL")
     except ImportError:
@@ -0,0 +1,135 @@
+"""
+Slow-query log for Service PRO
+Statements over SLOW_QUERY_MS are kept with redacted parameters, the Flask endpoint and the query plan
+"""
+
+import json
+import logging
+import os
+from collections import deque
+from datetime import date, datetime
+from logging.handlers import RotatingFileHandler
+from flask import has_request_context, request
+
+_config = {
+    'threshold_ms': 200.0,
+    'explain': True,
+}
+
+_entries = deque(maxlen=100)
+_file_logger = None
+
+EXPLAIN_PREFIXES = ('select', 'with', 'update', 'delete')
+
+
+def init_slow_queries(app):
+    """Read the SLOW_QUERY_* settings; SLOW_QUERY_MS = 0 turns the log off"""
+    global _entries, _file_logger
+    _config['threshold_ms'] = app.config.get('SLOW_QUERY_MS', _config['threshold_ms'])
+    _config['explain'] = bool(app.config.get('SLOW_QUERY_EXPLAIN', True))
+    size = app.config.get('SLOW_QUERY_LOG_SIZE', _entries.maxlen)
+    if size != _entries.maxlen:
+        _entries = deque(_entries, maxlen=size)
+
+    path = app.config.get('SLOW_QUERY_LOG_FILE')
+    path = os.path.abspath(path) if path else None
+    logger = logging.getLogger('service_pro.slow_queries')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    for handler in list(logger.handlers):
+        if isinstance(handler, RotatingFileHandler) and handler.baseFilename != path:
+            logger.removeHandler(handler)
+            handler.close()
+    _file_logger = None
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not any(isinstance(handler, RotatingFileHandler) for handler in logger.handlers):
+            logger.addHandler(RotatingFileHandler(path, maxBytes=5 * 1024 * 1024, backupCount=3))
+        _file_logger = logger
+
+
+def redact(parameters):
+    """Keep numbers, booleans, dates and NULLs (IDs, flags); hide strings and blobs"""
+    def hide(value):
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, (str, bytes)):
+            return f'<redacted {len(value)} chars>'
+        return f'<redacted {type(value).__name__}>'
+    if isinstance(parameters, dict):
+        return {name: hide(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [hide(value) for value in parameters]
+    return parameters
+
+
+def _explain(conn, statement, parameters):
+    """Plan of the statement, run on the raw DBAPI connection so it is not profiled itself"""
+    dialect = conn.dialect.name
+    prefix = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN ', 'mysql': 'EXPLAIN '}.get(dialect)
+    if prefix is None:
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if dialect == 'postgresql':
+            # A failed statement would abort the request's transaction
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+            columns = [column[0] for column in cursor.description or ()]
+        except Exception:
+            if dialect == 'postgresql':
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            raise
+        if dialect == 'postgresql':
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    finally:
+        cursor.close()
+    if dialect == 'sqlite':
+        return [row[-1] for row in rows]  # (id, parent, notused, detail)
+    if dialect == 'postgresql':
+        return [row[0] for row in rows]
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def record(conn, statement, parameters, elapsed_ms, executemany=False):
+    """Keep the statement if it took longer than the threshold"""
+    if not _config['threshold_ms'] or elapsed_ms < _config['threshold_ms']:
+        return None
+    entry = {
+        'at': datetime.utcnow().isoformat(timespec='seconds'),
+        'ms': round(elapsed_ms, 2),
+        'endpoint': request.endpoint if has_request_context() else None,
+        'method': request.method if has_request_context() else None,
+        'statement': ' '.join(statement.split()),
+        'parameters': None if executemany else redact(parameters),
+        'plan': None,
+    }
+    if (_config['explain'] and not executemany
+            and statement.lstrip().lower().startswith(EXPLAIN_PREFIXES)):
+        try:
+            entry['plan'] = _explain(conn, statement, parameters)
+        except Exception as e:
+            entry['plan'] = [f'EXPLAIN failed: {e}']
+    _entries.append(entry)
+    if _file_logger is not None:
+        _file_logger.info(json.dumps(entry, default=str))
+    return entry
+
+
+def slow_queries(limit=None):
+    """Newest slow statements first (this process only)"""
+    entries = list(reversed(_entries))
+    return entries[:limit] if limit else entries
+
+
+def read_log(path, limit=20):
+    """Newest entries from the slow-query log file, written by every worker"""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as log_file:
+        lines = deque(log_file, maxlen=limit)
+    return [json.loads(line) for line in reversed(lines)]
@@ -0,0 +1,130 @@
+"""
+Per-request SQL profiling for Service PRO
+Counts queries and database time per request and flags N+1 patterns (the same statement run over and over)
+"""
+
+import time
+from collections import Counter, deque
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from slow_queries import record as record_slow_query
+
+
+class NPlusOneDetected(Exception):
+    """Raised in test mode when a request repeats one statement too often"""
+
+
+_config = {
+    'enabled': True,
+    'threshold': 10,
+    'raise': False,
+}
+
+_logger = None
+
+_stats = {
+    'requests': 0,
+    'queries': 0,
+    'db_ms': 0.0,
+    'n_plus_one': 0,
+    'recent': deque(maxlen=50),  # latest N+1 detections
+}
+
+
+def init_sql_profiler(app):
+    global _logger
+    _logger = app.logger
+    _config['enabled'] = bool(app.config.get('SQL_PROFILING', True))
+    _config['threshold'] = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', _config['threshold'])
+    _config['raise'] = bool(app.config.get('SQL_N_PLUS_ONE_RAISE'))
+
+    if 'sql_profiler' not in app.extensions:
+        app.extensions['sql_profiler'] = _config
+
+        @app.after_request
+        def _finish_request_profile(response):
+            profile = request_profile()
+            if profile is None:
+                return response
+            response.headers['Server-Timing'] = f'db;dur={profile["db_ms"]:.1f};desc="{profile["queries"]} queries"'
+            check_request(raise_errors=_config['raise'] or app.testing)
+            return response
+
+
+def _profile():
+    if 'sql_profile' not in g:
+        g.sql_profile = {'queries': 0, 'db_ms': 0.0, 'statements': Counter()}
+    return g.sql_profile
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started', None)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    record_slow_query(conn, statement, parameters, elapsed_ms, executemany)
+    if not _config['enabled'] or not has_request_context():
+        return
+    profile = _profile()
+    profile['queries'] += 1
+    profile['db_ms'] += elapsed_ms
+    # The statement is already parameterized, so it doubles as the query shape
+    profile['statements'][statement] += 1
+
+
+def request_profile():
+    """{'queries', 'db_ms', 'statements'} for the current request, or None outside one"""
+    if not has_request_context():
+        return None
+    return g.get('sql_profile')
+
+
+def check_request(raise_errors=False):
+    """Log (or raise) if the current request ran one statement more than the threshold
+
+    Called after every request; returns the repeated statements with counts.
+    """
+    profile = request_profile()
+    if profile is None or g.get('sql_profile_checked'):
+        return []
+    g.sql_profile_checked = True
+    _stats['requests'] += 1
+    _stats['queries'] += profile['queries']
+    _stats['db_ms'] += profile['db_ms']
+
+    repeated = [(statement, count) for statement, count in profile['statements'].most_common()
+                if count > _config['threshold']]
+    for statement, count in repeated:
+        _stats['n_plus_one'] += 1
+        shape = ' '.join(statement.split())[:300]
+        _stats['recent'].append({'endpoint': request.endpoint, 'count': count, 'statement': shape,
+                                 'at': time.time()})
+        message = f'Possible N+1 in {request.endpoint}: statement ran {count} times: {shape}'
+        if raise_errors:
+            raise NPlusOneDetected(message)
+        if _logger is not None:
+            _logger.warning(message)
+    return repeated
+
+
+def sql_stats():
+    """Query counts, database time and recent N+1 detections for this process"""
+    requests = _stats['requests']
+    return {
+        'enabled': _config['enabled'],
+        'threshold': _config['threshold'],
+        'requests': requests,
+        'queries': _stats['queries'],
+        'avg_queries': round(_stats['queries'] / requests, 2) if requests else 0.0,
+        'avg_db_ms': round(_stats['db_ms'] / requests, 2) if requests else 0.0,
+        'n_plus_one': _stats['n_plus_one'],
+        'recent_n_plus_one': list(_stats['recent']),
+    }
@@ -8,7 +8,21 @@ export FLASK_APP=app.py
 # Create logs directory if it doesn't exist
 mkdir -p logs
 
-# Start the application with gunicorn (Railway optimized)
+# Workers write their metrics here; /metrics adds them up (stale files from
+# the previous run would be counted too, so start empty)
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/service-pro-metrics}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Apply pending schema migrations before any worker starts
+flask migrate || exit 1
+
+# Report the effective database settings (WAL, busy timeout, ...)
+flask db-settings
+
+# Start the application with gunicorn (Railway optimized); workers and
+# worker class come from gunicorn.conf.py (GUNICORN_WORKERS, or one threaded
+# worker when SQLITE_WRITE_QUEUE is on)
 echo "Starting Service PRO on Railway..."
 echo "Application will be available at: https://your-app.railway.app"
-exec gunicorn --bind 0.0.0.0:$PORT --workers 4 --worker-class sync --log-level info --access-logfile logs/access.log --error-logfile logs/error.log main:application
+exec gunicorn --bind 0.0.0.0:$PORT --log-level info --access-logfile logs/access.log --error-logfile logs/error.log main:application
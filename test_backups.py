@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test online backups
+"""
+
+import os
+from app import app, db, User, USER
+import backups
+from file_lock import try_lock
+from sqlalchemy.engine import make_url
+
+def test_sqlite_backup(temp_db, tmp_path):
+    """A stepped backup of the live database is verified and can be read back"""
+    for index in range(50):
+        db.session.add(User(username=f'user{index}', email=f'user{index}@example.com', password_hash='x', role=USER))
+    db.session.commit()
+
+    result = backups.run_backup(db.engine, str(tmp_path), log=lambda message: None)
+    assert result['backend'] == 'sqlite'
+    assert result['path'].endswith('.db') and result['bytes'] > 0 and result['pages'] > 0
+    assert result['tables']['user'] == 50
+    assert backups.verify_sqlite(result['path'])['user'] == 50
+    assert not list(tmp_path.glob('*.tmp'))
+    print("[PASS] SQLite backup copied and verified")
+
+def test_backup_if_due(temp_db, tmp_path):
+    """Scheduled backups only run once the newest backup is older than the interval, one process at a time"""
+    app.config['BACKUP_DIR'] = str(tmp_path)
+    app.config['BACKUP_INTERVAL_HOURS'] = 24
+    backups.init_backups(app)
+    try:
+        with try_lock(str(tmp_path / '.lock')):
+            assert backups.backup_if_due(db.engine, log=lambda message: None) is None
+        assert backups.backup_if_due(db.engine, log=lambda message: None) is not None
+        assert backups.backup_if_due(db.engine, log=lambda message: None) is None
+        assert len(list(tmp_path.glob('*.db'))) == 1
+    finally:
+        app.config['BACKUP_DIR'] = 'backups'
+        app.config['BACKUP_INTERVAL_HOURS'] = 0
+        backups.init_backups(app)
+    print("[PASS] Scheduled backup skipped when not due")
+
+def test_safety_copy_outside_rotation(temp_db, tmp_path):
+    """Copies taken before a reset are neither pruned nor counted as scheduled backups"""
+    app.config['BACKUP_DIR'] = str(tmp_path)
+    backups.init_backups(app)
+    try:
+        path = backups.safety_copy(db.engine.url.database, 'reset')
+        assert os.path.dirname(path) == str(tmp_path / backups.SAFETY_COPY_DIR)
+        assert backups.latest_backup_age() is None
+        backups._prune(os.path.basename(path).split('-')[0])
+        assert os.path.exists(path)
+    finally:
+        app.config['BACKUP_DIR'] = 'backups'
+        backups.init_backups(app)
+    print("[PASS] Safety copy kept out of the rotation")
+
+def test_pg_dump_password_not_in_argv(monkeypatch):
+    """pg_dump gets the password through PGPASSWORD, not on its command line"""
+    calls = []
+    monkeypatch.setattr(backups.shutil, 'which', lambda name: f'/usr/bin/{name}')
+    monkeypatch.setattr(backups.subprocess, 'run', lambda args, **kwargs: calls.append((args, kwargs)))
+    backups.dump_postgres(make_url('postgresql+psycopg2://service:s3cret@db:5432/service_pro'), 'out.dump')
+    args, kwargs = calls[0]
+    assert args[-1] == 'postgresql://service@db:5432/service_pro'
+    assert not any('s3cret' in arg for arg in args)
+    assert kwargs['env']['PGPASSWORD'] == 's3cret'
+    print("[PASS] pg_dump password kept out of argv")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test copying data to another database
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from app import app, db, User, ServiceGroup, Service, USER, HANDYMAN
+from migrations import upgrade
+import data_migration
+
+def seed():
+    upgrade(db.engine, log=lambda message: None)
+    group = ServiceGroup(name='Koristus')
+    db.session.add(group)
+    handyman = User(username='handy', email='handy@example.com', password_hash='x', role=HANDYMAN)
+    db.session.add(handyman)
+    for index in range(25):
+        db.session.add(User(username=f'user{index}', email=f'user{index}@example.com', password_hash='x', role=USER))
+    db.session.flush()
+    db.session.add(Service(name='Cleaning', description='Flat cleaning', price=25.5, duration_hours=2,
+                           handyman_id=handyman.id, service_group_id=group.id))
+    db.session.commit()
+    db.session.delete(User.query.filter_by(username='user3').one())  # leave a gap in the IDs
+    db.session.commit()
+
+def test_migrate_and_resume(temp_db, tmp_path, monkeypatch):
+    """Rows keep their IDs, and an interrupted copy resumes from its checkpoint"""
+    seed()
+    target_uri = f'sqlite:///{tmp_path / "target.db"}'
+    log = lambda message: None
+
+    insert_chunk = data_migration._insert_chunk
+    calls = []
+    def failing_insert(conn, table, rows):
+        calls.append(table.name)
+        if table.name == 'user' and calls.count('user') == 2:
+            raise RuntimeError('connection lost')
+        insert_chunk(conn, table, rows)
+    monkeypatch.setattr(data_migration, '_insert_chunk', failing_insert)
+    with pytest.raises(RuntimeError):
+        data_migration.migrate_data(db.engine, target_uri, app.config, chunk_size=10, log=log)
+
+    monkeypatch.setattr(data_migration, '_insert_chunk', insert_chunk)
+    copied = data_migration.migrate_data(db.engine, target_uri, app.config, chunk_size=10, log=log)
+    assert copied == 16  # 15 users left after the first chunk, plus the service
+
+    target = create_engine(target_uri)
+    with target.connect() as conn:
+        ids = [row[0] for row in conn.execute(text('SELECT id FROM user ORDER BY id'))]
+        price = conn.execute(text('SELECT price_cents FROM service')).scalar()
+    target.dispose()
+    assert ids == [user.id for user in User.query.order_by(User.id)]
+    assert price == 2550
+    assert data_migration.migrate_data(db.engine, target_uri, app.config, log=log) == 0
+    print("[PASS] Data copied with IDs preserved and resumed after a failure")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test database connection profiles
+"""
+
+import time
+from app import app, db
+from database import database_settings, engine_options, normalize_database_uri
+
+def test_sqlite_profile_applied(temp_db):
+    """Every new SQLite connection gets the configured pragmas"""
+    report = database_settings(db.engine)
+    assert report['backend'] == 'sqlite'
+    assert report['mismatches'] == []
+    assert report['settings']['journal_mode'] == 'wal'
+    assert report['settings']['busy_timeout'] == app.config['SQLITE_BUSY_TIMEOUT_MS']
+    assert report['settings']['foreign_keys'] == 1
+    print("[PASS] SQLite profile applied on connect")
+
+def test_server_pool_profiles():
+    """PostgreSQL and MySQL get pooled engines with timeouts"""
+    options = engine_options('postgresql://u:p@localhost/service_pro', app.config)
+    assert options['pool_size'] == app.config['DB_POOL_SIZE']
+    assert options['pool_pre_ping'] is True
+    assert f"statement_timeout={app.config['DB_STATEMENT_TIMEOUT_MS']}" in options['connect_args']['options']
+
+    options = engine_options('mysql+pymysql://u:p@localhost/service_pro', app.config)
+    assert options['pool_recycle'] == app.config['DB_POOL_RECYCLE']
+    assert 'max_execution_time' in options['connect_args']['init_command']
+
+    assert normalize_database_uri('postgres://u:p@db/x') == 'postgresql://u:p@db/x'
+    print("[PASS] Server pool profiles built")
+
+def test_replica_routing(temp_db, tmp_path):
+    """Read-only views read the replica until the client has just written"""
+    from flask import g
+    from sqlalchemy import create_engine
+    from app import User, USER
+    from database import WRITE_COOKIE
+
+    replica_path = tmp_path / 'replica.db'
+    db.metadata.create_all(create_engine(f'sqlite:///{replica_path}'))
+    db.session.add(User(username='primary', email='primary@example.com', password_hash='x', role=USER))
+    db.session.commit()
+    db.session.remove()
+    app.config['SQLALCHEMY_BINDS'] = {'replica': f'sqlite:///{replica_path}'}
+    try:
+        with app.app_context(), app.test_request_context('/services'):
+            g.read_bind = 'replica'
+            assert User.query.count() == 0          # replica is empty
+            db.session.add(User(username='second', email='second@example.com', password_hash='x', role=USER))
+            db.session.flush()
+            assert User.query.count() == 2          # after a write the request stays on the primary
+            assert g.db_wrote
+            db.session.rollback()
+        db.session.remove()
+
+        with app.app_context(), app.test_request_context('/services', headers={'Cookie': f'{WRITE_COOKIE}={time.time()}'}):
+            g.read_bind = 'replica'
+            assert User.query.count() == 1          # recent writer reads the primary
+        db.session.remove()
+
+        with app.app_context(), app.test_request_context('/admin/users/edit/1'):
+            assert User.query.count() == 1          # views without @replica_reads use the primary
+    finally:
+        app.config.pop('SQLALCHEMY_BINDS', None)
+        db.session.remove()
+    print("[PASS] Replica routing with read-your-writes")
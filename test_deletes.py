@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test deleting users, services and service groups with foreign keys enforced
+"""
+
+from datetime import datetime
+from app import (app, db, User, Service, ServiceGroup, Booking, Commission, Feedback, LedgerEntry,
+                 place_booking, ADMIN, USER, HANDYMAN)
+from ledger import get_balance
+
+def create_booking():
+    admin = User(username='admin', email='admin@example.com', password_hash='x', role=ADMIN)
+    customer = User(username='customer', email='customer@example.com', password_hash='x', role=USER)
+    handyman = User(username='handyman', email='handyman@example.com', password_hash='x', role=HANDYMAN)
+    group = ServiceGroup(name='Cleaning')
+    db.session.add_all([admin, customer, handyman, group])
+    db.session.flush()
+    service = Service(name='Clean', description='Clean', price=40.0, duration_hours=1,
+                      service_group_id=group.id, handyman_id=handyman.id)
+    db.session.add(service)
+    db.session.commit()
+    booking_id, _, _ = place_booking(customer.id, service, datetime.utcnow(), None)
+    db.session.add(Feedback(booking_id=booking_id, user_id=customer.id, handyman_id=handyman.id, rating=5))
+    db.session.commit()
+    return admin.id, customer.id, handyman.id, service.id, group.id
+
+def admin_client(admin_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(admin_id)
+    return client
+
+def test_delete_customer_with_booking(temp_db):
+    """The customer's bookings, feedback and unpaid commissions go; the handyman's balance is reversed"""
+    admin_id, customer_id, handyman_id, service_id, group_id = create_booking()
+    assert get_balance(handyman_id).balance_cents == 3600
+
+    response = admin_client(admin_id).post(f'/admin/users/delete/{customer_id}')
+    assert response.status_code == 302
+    db.session.remove()
+    assert db.session.get(User, customer_id) is None
+    assert Booking.query.count() == Commission.query.count() == Feedback.query.count() == 0
+    assert get_balance(handyman_id).balance_cents == 0
+    entries = LedgerEntry.query.filter_by(handyman_id=handyman_id).order_by(LedgerEntry.id).all()
+    assert [(entry.entry_type, entry.amount_cents) for entry in entries] == [('accrual', 3600), ('reversal', -3600)]
+    assert entries[0].commission_id == entries[1].commission_id is not None
+    print("[PASS] Customer with a booking deleted")
+
+def test_deletes_with_dependents_are_refused(temp_db):
+    """Handymen with earnings, booked services and non-empty groups are kept"""
+    admin_id, customer_id, handyman_id, service_id, group_id = create_booking()
+    client = admin_client(admin_id)
+    client.post(f'/admin/users/delete/{handyman_id}')
+    client.post(f'/admin/services/delete/{service_id}')
+    client.post(f'/admin/service-groups/delete/{group_id}')
+    db.session.remove()
+    assert db.session.get(User, handyman_id) is not None
+    assert db.session.get(Service, service_id) is not None
+    assert db.session.get(ServiceGroup, group_id) is not None
+
+    Commission.query.update({Commission.is_paid: True})
+    db.session.commit()
+    client.post(f'/admin/users/delete/{customer_id}')
+    db.session.remove()
+    assert db.session.get(User, customer_id) is not None
+    print("[PASS] Deletes that would lose records refused")
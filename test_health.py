@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Test the liveness and readiness probes
+"""
+
+from app import app
+import health
+
+def test_probes(temp_db):
+    """Probes answer without sessions or CORS, and readiness caches its SELECT 1"""
+    client = app.test_client()
+    response = client.get('/healthz', headers={'Origin': 'http://localhost:3000'})
+    assert response.status_code == 200 and response.json['status'] == 'ok'
+    assert 'Set-Cookie' not in response.headers
+    assert 'Access-Control-Allow-Origin' not in response.headers
+
+    health._cache['result'] = None
+    first = client.get('/readyz')
+    assert first.status_code == 200
+    assert first.json['checks']['database']['ok'] and not first.json['checks']['cached']
+    assert client.get('/readyz').json['checks']['cached']
+    print("[PASS] Health probes served outside Flask")
+
+def test_pool_saturation():
+    """A pool with every connection checked out is reported as saturated"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+    engine = create_engine('sqlite://', poolclass=QueuePool, pool_size=1, max_overflow=0)
+    conn = engine.connect()
+    try:
+        status = health.pool_status(engine)
+        assert status['checked_out'] == 1 and status['saturation'] == 1.0
+    finally:
+        conn.close()
+    assert health.pool_status(engine)['saturation'] == 0.0
+    print("[PASS] Pool saturation measured")
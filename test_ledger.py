@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test the handyman earnings ledger
+"""
+
+from datetime import datetime, timedelta
+from app import db, User, Service, ServiceGroup, Booking, Commission, LedgerEntry, HandymanBalance, USER, HANDYMAN
+from ledger import record_accrual, record_accruals, record_payout, get_balance, period_earnings, rebuild_ledger
+from payouts import run_payout
+
+def create_handyman():
+    customer = User(username='customer', email='customer@example.com', password_hash='x', role=USER)
+    handyman = User(username='handyman', email='handyman@example.com', password_hash='x', role=HANDYMAN)
+    group = ServiceGroup(name='Cleaning')
+    db.session.add_all([customer, handyman, group])
+    db.session.flush()
+    service = Service(name='Clean', description='Clean', price=100.0, duration_hours=1,
+                      service_group_id=group.id, handyman_id=handyman.id)
+    db.session.add(service)
+    db.session.commit()
+    return customer, handyman, service
+
+def book(customer, handyman, service, earnings, created_at=None):
+    booking = Booking(user_id=customer.id, service_id=service.id, handyman_id=handyman.id,
+                      booking_date=datetime.utcnow(), total_price=earnings)
+    db.session.add(booking)
+    db.session.flush()
+    commission = Commission(booking_id=booking.id, handyman_id=handyman.id, service_price=earnings,
+                            commission_amount=0.0, handyman_earnings=earnings,
+                            created_at=created_at or datetime.utcnow())
+    db.session.add(commission)
+    record_accrual(commission)
+    db.session.commit()
+    return commission
+
+def test_running_balance(temp_db):
+    """Accruals and payouts keep the balance row current"""
+    customer, handyman, service = create_handyman()
+    book(customer, handyman, service, 90.0)
+    book(customer, handyman, service, 45.0)
+    run_payout(datetime.utcnow() + timedelta(seconds=1))
+    book(customer, handyman, service, 30.0)
+
+    balance = get_balance(handyman.id)
+    assert (balance.balance, balance.lifetime_earnings, balance.total_paid) == (30.0, 165.0, 135.0)
+    entries = LedgerEntry.query.order_by(LedgerEntry.id).all()
+    assert [e.entry_type for e in entries] == ['accrual', 'accrual', 'payout', 'accrual']
+    assert [e.balance_after for e in entries] == [90.0, 135.0, 0.0, 30.0]
+    print("[PASS] Ledger keeps running balances")
+
+def test_period_earnings(temp_db):
+    """Period earnings come from the lifetime totals at the period edges"""
+    customer, handyman, service = create_handyman()
+    now = datetime.utcnow()
+    for days_ago, amount in [(40, 10.0), (20, 20.0), (5, 40.0)]:
+        entry = book(customer, handyman, service, amount)
+        LedgerEntry.query.filter_by(commission_id=entry.id).update({'created_at': now - timedelta(days=days_ago)})
+    db.session.commit()
+
+    assert period_earnings(handyman.id, now - timedelta(days=30), now) == 6000
+    assert period_earnings(handyman.id, now - timedelta(days=50), now - timedelta(days=10)) == 3000
+    print("[PASS] Period earnings from ledger")
+
+def test_rebuild_matches(temp_db):
+    """Rebuilding from commissions reproduces the live balances"""
+    customer, handyman, service = create_handyman()
+    first = book(customer, handyman, service, 90.0)
+    book(customer, handyman, service, 45.0)
+    first.is_paid = True
+    record_payout(handyman.id, 9000, commission_id=first.id)
+    db.session.commit()
+    live = get_balance(handyman.id)
+    live = (live.balance, live.lifetime_earnings, live.total_paid)
+
+    assert rebuild_ledger() == 3
+    db.session.commit()
+    rebuilt = db.session.get(HandymanBalance, handyman.id)
+    assert (rebuilt.balance, rebuilt.lifetime_earnings, rebuilt.total_paid) == live
+    print("[PASS] Ledger rebuild matches live balances")
+
+def test_rebuild_streams_in_order(temp_db):
+    """Rebuilding in small chunks orders accruals, individual payouts and batch payouts by time"""
+    customer, handyman, service = create_handyman()
+    now = datetime.utcnow()
+    first = book(customer, handyman, service, 90.0, created_at=now - timedelta(days=3))
+    book(customer, handyman, service, 45.0, created_at=now - timedelta(days=2))
+    first.is_paid, first.paid_at = True, now - timedelta(days=1)
+    db.session.commit()
+    run_payout(now)
+    book(customer, handyman, service, 20.0, created_at=now + timedelta(minutes=1))
+
+    assert rebuild_ledger(chunk_size=1) == 5
+    db.session.commit()
+    entries = LedgerEntry.query.filter_by(handyman_id=handyman.id).order_by(LedgerEntry.id).all()
+    assert [(entry.entry_type, entry.amount_cents, entry.balance_after_cents) for entry in entries] == [
+        ('accrual', 9000, 9000), ('accrual', 4500, 13500), ('payout', -9000, 4500),
+        ('payout', -4500, 0), ('accrual', 2000, 2000)]
+    assert entries[3].payout_batch_id is not None and entries[3].commission_id is None
+    print("[PASS] Ledger rebuild streamed in order")
+
+def test_batch_accruals_do_not_lose_updates(temp_db):
+    """record_accruals adds to the stored balance even if the loaded row is stale"""
+    customer, handyman, service = create_handyman()
+    book(customer, handyman, service, 10.0)
+    loaded = get_balance(handyman.id)  # kept in the session's identity map
+    assert loaded.balance_cents == 1000
+    with db.engine.begin() as conn:  # another worker books in the meantime
+        conn.execute(HandymanBalance.__table__.update()
+                     .values(balance_cents=HandymanBalance.__table__.c.balance_cents + 500,
+                             lifetime_earnings_cents=HandymanBalance.__table__.c.lifetime_earnings_cents + 500))
+
+    record_accruals([(None, handyman.id, 200), (None, handyman.id, 300)])
+    db.session.commit()
+    assert get_balance(handyman.id).balance_cents == 2000
+    afters = [entry.balance_after_cents for entry in
+              LedgerEntry.query.filter(LedgerEntry.commission_id.is_(None)).order_by(LedgerEntry.id)]
+    assert afters == [1700, 2000]
+    print("[PASS] Batch accruals applied atomically")
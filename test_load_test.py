@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test the load test result aggregation
+"""
+
+import threading
+import pytest
+import requests
+from load_test import LoadResults, StepFailed, VirtualUser, api_data, redirects_to
+
+def test_results_summary():
+    """Concurrent recordings add up to per-step counts, percentiles and error breakdowns"""
+    results = LoadResults()
+    def worker():
+        for index in range(100):
+            results.record('book', 0.010 + index / 10000.0)
+        results.record('book', 0.5, 'HTTP 500')
+        results.skip('feedback')
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = results.summary(elapsed=2.0)
+    book = summary['steps']['book']
+    assert book['count'] == 404 and book['errors'] == 4
+    assert book['error_breakdown'] == {'HTTP 500': 4}
+    assert 14.0 <= book['p50_ms'] <= 15.5 and book['max_ms'] == 500.0
+    assert summary['steps']['feedback']['skipped'] == 4
+    assert summary['requests_per_second'] == 202.0
+    print("[PASS] Load test results aggregated")
+
+def test_wrong_redirect_is_an_error():
+    """A 302 to the index page ("Access denied") is not counted as a success"""
+    def redirect(location):
+        response = requests.Response()
+        response.status_code = 302
+        response.headers['Location'] = location
+        return response
+
+    results = LoadResults()
+    user = VirtualUser('http://localhost:5000', results, {})
+    user.timed('approve', lambda: redirect('/admin/bookings'), expect=(302,), check=redirects_to('/admin/bookings'))
+    with pytest.raises(StepFailed):
+        user.timed('approve', lambda: redirect('http://localhost:5000/'), expect=(302,),
+                   check=redirects_to('/admin/bookings'))
+    approve = results.summary(elapsed=1.0)['steps']['approve']
+    assert approve['count'] == 2 and approve['error_breakdown'] == {'redirect to /': 1}
+    print("[PASS] Unexpected redirects recorded as errors")
+
+def test_unreadable_body_is_an_error():
+    """A 200 whose body is not the expected JSON fails the step instead of aborting the run"""
+    def ok(body):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        return response
+
+    results = LoadResults()
+    user = VirtualUser('http://localhost:5000', results, {})
+    assert user.timed('book', lambda: ok(b'{"data": {"id": 7}}'), parse=lambda r: api_data(r)['id']) == 7
+    for body in (b'<html>Server error</html>', b'{"error": "nope"}', b'{"data": []}'):
+        with pytest.raises(StepFailed):
+            user.timed('book', lambda: ok(body), parse=lambda r: api_data(r)['id'])
+    book = results.summary(elapsed=1.0)['steps']['book']
+    assert book['count'] == 4 and book['error_breakdown'] == {'unexpected response body': 3}
+    print("[PASS] Unreadable bodies recorded as errors")
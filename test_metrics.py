@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Test the Prometheus metrics endpoint
+"""
+
+from app import app
+import metrics
+
+def test_metrics_endpoint():
+    """Requests are counted per endpoint and status, and /metrics honours METRICS_TOKEN"""
+    client = app.test_client()
+    client.get('/login')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'service_pro_http_requests_total{endpoint="login",method="GET",status="200"}' in body
+    assert 'service_pro_http_request_duration_seconds_bucket{endpoint="login"' in body
+    assert 'service_pro_db_queries_per_request_count{endpoint="login"}' in body
+    assert 'service_pro_worker_info{' in body and 'service_pro_user_cache_hit_ratio{' in body
+
+    metrics._config['token'] = 'scrape-secret'
+    try:
+        assert client.get('/metrics').status_code == 401
+        assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+    finally:
+        metrics._config['token'] = ''
+    print("[PASS] Metrics exported in Prometheus format")
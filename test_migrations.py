@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test versioned schema migrations
+"""
+
+import os
+import tempfile
+from datetime import datetime
+from sqlalchemy import inspect, text
+from app import (app, db, User, Service, ServiceGroup, Booking, Commission, Feedback, HandymanBalance,
+                 HandymanRating, HandymanRank, USER, HANDYMAN)
+from migrations import MIGRATIONS, upgrade, migration_status
+
+LEGACY_SCHEMA = [
+    'CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL, email VARCHAR(120) NOT NULL, '
+    'password_hash VARCHAR(128) NOT NULL, role VARCHAR(20), first_name VARCHAR(50), last_name VARCHAR(50), '
+    'phone VARCHAR(20), address TEXT, is_approved BOOLEAN, created_at DATETIME, average_score FLOAT, '
+    'total_feedbacks INTEGER)',
+    'CREATE TABLE service (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, description TEXT NOT NULL, '
+    'price FLOAT NOT NULL, duration_hours INTEGER NOT NULL, category VARCHAR(50), handyman_id INTEGER NOT NULL, '
+    'is_active BOOLEAN, is_approved BOOLEAN, example_images TEXT, created_at DATETIME, updated_at DATETIME)',
+    'CREATE TABLE booking (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, service_id INTEGER NOT NULL, '
+    'handyman_id INTEGER, booking_date DATETIME NOT NULL, status VARCHAR(20), special_requests TEXT, '
+    'total_price FLOAT NOT NULL, created_at DATETIME)',
+    "INSERT INTO user (id, username, email, password_hash, role) VALUES (1, 'h', 'h@example.com', 'x', 'handyman')",
+    "INSERT INTO service (id, name, description, price, duration_hours, handyman_id) VALUES (1, 'S', 'S', 49.9, 1, 1)",
+]
+
+def with_engine(test):
+    """Run test against the app's engine on an empty database file"""
+    original_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    try:
+        with app.app_context():
+            test(db.engine)
+            db.session.remove()
+    finally:
+        app.config['SQLALCHEMY_DATABASE_URI'] = original_uri
+        os.remove(path)
+
+def test_legacy_database_upgraded():
+    """An old schema gets the missing columns, cents and indexes, once"""
+    def check(engine):
+        with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                conn.execute(text(statement))
+
+        assert upgrade(engine, log=lambda message: None) == [version for version, _, _ in MIGRATIONS]
+        assert upgrade(engine, log=lambda message: None) == []
+        assert all(applied for _, _, applied in migration_status(engine))
+
+        inspector = inspect(engine)
+        assert 'service_group_id' in {c['name'] for c in inspector.get_columns('service')}
+        assert {'ix_booking_user_id', 'ix_booking_handyman_id', 'ix_booking_status'} <= \
+            {i['name'] for i in inspector.get_indexes('booking')}
+        assert 'ix_service_active_approved_group' in {i['name'] for i in inspector.get_indexes('service')}
+        with engine.connect() as conn:
+            assert conn.execute(text('SELECT price_cents FROM service')).scalar() == 4990
+    with_engine(check)
+    print("[PASS] Legacy database migrated")
+
+def test_fresh_database_stamped():
+    """A new database is created from the models at the latest version"""
+    def check(engine):
+        assert upgrade(engine, log=lambda message: None) == []
+        assert all(applied for _, _, applied in migration_status(engine))
+        assert set(db.metadata.tables) <= set(inspect(engine).get_table_names())
+    with_engine(check)
+    print("[PASS] Fresh database stamped")
+
+def test_aggregates_backfilled():
+    """Ledger balances, rating histograms and ranks are built for data that predates them"""
+    def check(engine):
+        upgrade(engine, log=lambda message: None)
+        customer = User(username='c', email='c@example.com', password_hash='x', role=USER)
+        handyman = User(username='h', email='h@example.com', password_hash='x', role=HANDYMAN)
+        group = ServiceGroup(name='Cleaning')
+        db.session.add_all([customer, handyman, group])
+        db.session.flush()
+        service = Service(name='S', description='S', price=50.0, duration_hours=1,
+                          service_group_id=group.id, handyman_id=handyman.id)
+        db.session.add(service)
+        db.session.flush()
+        booking = Booking(user_id=customer.id, service_id=service.id, handyman_id=handyman.id,
+                          booking_date=datetime.utcnow(), total_price=50.0, status='completed')
+        db.session.add(booking)
+        db.session.flush()
+        db.session.add(Commission.for_booking(booking, handyman.id))
+        db.session.add(Feedback(booking_id=booking.id, user_id=customer.id, handyman_id=handyman.id, rating=4))
+        db.session.execute(text('DELETE FROM schema_version WHERE version = 5'))
+        db.session.commit()
+
+        assert upgrade(engine, log=lambda message: None) == [5]
+        assert db.session.get(HandymanBalance, handyman.id).balance_cents == 4500
+        assert db.session.get(HandymanRating, handyman.id).rating_count == 1
+        assert HandymanRank.query.filter_by(handyman_id=handyman.id).count() > 0
+    with_engine(check)
+    print("[PASS] Aggregates backfilled by migration")
+
+def test_ledger_foreign_key_dropped():
+    """Existing ledger entries survive losing the commission foreign key"""
+    def check(engine):
+        upgrade(engine, log=lambda message: None)
+        with engine.begin() as conn:
+            conn.execute(text('DROP TABLE ledger_entry'))
+            conn.execute(text('CREATE TABLE ledger_entry (id INTEGER PRIMARY KEY, handyman_id INTEGER NOT NULL '
+                              'REFERENCES user(id), entry_type VARCHAR(20) NOT NULL, amount_cents INTEGER NOT NULL, '
+                              'commission_id INTEGER REFERENCES commission(id), '
+                              'payout_batch_id INTEGER REFERENCES payout_batch(id), '
+                              'balance_after_cents INTEGER NOT NULL, lifetime_after_cents INTEGER NOT NULL, '
+                              'created_at DATETIME)'))
+            conn.execute(text("INSERT INTO user (id, username, email, password_hash, role) "
+                              "VALUES (1, 'h', 'h@example.com', 'x', 'handyman')"))
+            conn.execute(text("INSERT INTO ledger_entry (id, handyman_id, entry_type, amount_cents, "
+                              "balance_after_cents, lifetime_after_cents) VALUES (7, 1, 'accrual', 100, 100, 100)"))
+            conn.execute(text('DELETE FROM schema_version WHERE version = 7'))
+
+        assert upgrade(engine, log=lambda message: None) == [7]
+        inspector = inspect(engine)
+        assert sorted(fk['referred_table'] for fk in inspector.get_foreign_keys('ledger_entry')) == ['payout_batch', 'user']
+        assert 'ix_ledger_entry_handyman_created' in {i['name'] for i in inspector.get_indexes('ledger_entry')}
+        with engine.connect() as conn:
+            assert conn.execute(text('SELECT id, amount_cents FROM ledger_entry')).all() == [(7, 100)]
+    with_engine(check)
+    print("[PASS] Ledger commission foreign key dropped")
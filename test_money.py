@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test integer-cents money handling and the float column migration
+"""
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects import mysql, postgresql
+from money import to_cents, format_cents, split_commission, convert_money_columns, backfill_statement
+
+def test_split_commission():
+    """Commission and earnings always add back to the price"""
+    assert split_commission(10000) == (1000, 9000)
+    assert split_commission(1999) == (200, 1799)
+    for price in range(0, 5000, 7):
+        commission, earnings = split_commission(price)
+        assert commission + earnings == price
+    assert to_cents(19.99) == 1999
+    assert to_cents('0.285') == 29
+    assert format_cents(-1205) == '-12.05'
+    print("[PASS] Commission split is exact")
+
+def test_convert_money_columns(tmp_path):
+    """Float columns are backfilled to cents in chunks and dropped"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE service (id INTEGER PRIMARY KEY, name TEXT, price FLOAT NOT NULL)'))
+        for i in range(1, 26):
+            conn.execute(text('INSERT INTO service (id, name, price) VALUES (:id, :name, :price)'),
+                         {'id': i, 'name': f's{i}', 'price': i * 10.1})
+
+    convert_money_columns(engine, chunk_size=4, log=lambda message: None)
+    convert_money_columns(engine, chunk_size=4, log=lambda message: None)  # second run is a no-op
+
+    columns = {column['name'] for column in inspect(engine).get_columns('service')}
+    assert 'price' not in columns and 'price_cents' in columns
+    with engine.connect() as conn:
+        prices = dict(conn.execute(text('SELECT id, price_cents FROM service')).all())
+    assert prices == {i: round(i * 1010) for i in range(1, 26)}
+    print("[PASS] Float money columns converted to cents")
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+    test_split_commission()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_convert_money_columns(Path(tmp))
+
+def test_backfill_cast_per_dialect():
+    """The cents backfill compiles to a cast each backend accepts"""
+    update = backfill_statement('commission', 'id', [('service_price', 'service_price_cents')])
+    assert 'AS SIGNED' in str(update.compile(dialect=mysql.dialect()))
+    assert 'AS INTEGER' in str(update.compile(dialect=postgresql.dialect()))
+    print("[PASS] Backfill cast compiles for MySQL and PostgreSQL")
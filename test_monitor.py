@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test the monitor's latency histogram and SLO check
+"""
+
+from collections import Counter
+from monitor import LatencyHistogram, summarize, check_slo
+
+def test_histogram_percentiles():
+    """Percentiles stay within the bucket precision over a wide range"""
+    histogram = LatencyHistogram()
+    for value_ms in range(1, 1001):
+        histogram.record(value_ms * 1000)
+    assert histogram.count == 1000
+    for pct, expected_ms in ((50, 500), (95, 950), (99, 990)):
+        assert abs(histogram.percentile(pct) - expected_ms) <= expected_ms * 0.016
+    assert histogram.percentile(100) == 1000.0
+    print("[PASS] Histogram percentiles within 1.6%")
+
+def test_coordinated_omission():
+    """A stall longer than the probe interval also counts the probes it delayed"""
+    histogram = LatencyHistogram()
+    histogram.record(3000000, expected_interval_us=1000000)
+    assert histogram.count == 3
+    assert histogram.percentile(50) >= 1990.0
+    print("[PASS] Stalled probes backfilled")
+
+def test_slo_breach():
+    """Endpoints over the p95 or error-rate SLO are reported"""
+    fast, slow = LatencyHistogram(), LatencyHistogram()
+    for _ in range(20):
+        fast.record(20000)
+        slow.record(900000)
+    summary = summarize({'/services': fast, '/admin/dashboard': slow}, Counter({'/services': 1}))
+    breaches = dict(check_slo(summary, slo_p95_ms=500, slo_error_rate=0.01))
+    assert set(breaches) == {'/services', '/admin/dashboard'}
+    assert dict(check_slo(summary, slo_p95_ms=1000, slo_error_rate=0.1)) == {}
+    print("[PASS] SLO breaches detected")
+
+def test_error_rate_ignores_backfill():
+    """A slow failing probe is one error out of one probe, not out of its backfilled samples"""
+    histogram = LatencyHistogram()
+    histogram.record(10000000, expected_interval_us=1000000)
+    assert histogram.count == 10 and histogram.probes == 1
+    stats = summarize({'/services': histogram}, Counter({'/services': 1}))['/services']
+    assert stats['count'] == 1
+    assert stats['error_rate'] == 1.0
+    print("[PASS] Error rate counts real probes only")
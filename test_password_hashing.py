@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test pooled password hashing and transparent hash upgrades
+"""
+
+import time
+import pytest
+from werkzeug.security import generate_password_hash
+from app import app, db, User, USER
+import app as app_module
+import password_hashing
+from password_hashing import hash_password, verify_password, needs_rehash, hash_stats, PasswordHashBusy
+
+def test_hash_and_verify():
+    """Hashes made through the pool verify correctly"""
+    pwhash = hash_password('secret123')
+    assert pwhash.startswith(app.config['PASSWORD_HASH_METHOD'])
+    assert verify_password(pwhash, 'secret123')
+    assert not verify_password(pwhash, 'wrong')
+    assert not needs_rehash(pwhash)
+    print("[PASS] Pooled hash and verify work")
+
+def test_rehash_on_login():
+    """Old-parameter hashes are upgraded after a successful password check"""
+    user = User(username='rehash', email='rehash@example.com')
+    user.password_hash = generate_password_hash('secret123', 'pbkdf2:sha256:1000')
+    assert needs_rehash(user.password_hash)
+
+    assert not user.check_password('wrong')
+    assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+
+    assert user.check_password('secret123')
+    assert not needs_rehash(user.password_hash)
+    assert user.check_password('secret123')
+    print("[PASS] Outdated hash upgraded on login")
+
+def test_stats():
+    """Timing metrics are recorded per operation"""
+    verify_password(hash_password('secret123'), 'secret123')
+    stats = hash_stats()
+    assert stats['hash']['count'] > 0
+    assert stats['verify']['p95_ms'] >= stats['verify']['p50_ms']
+    print("[PASS] Hash timing stats recorded")
+
+def test_timeout_keeps_slot_until_done():
+    """A timed-out hash raises PasswordHashBusy and holds its queue slot until it finishes"""
+    saved = {key: app.config[key] for key in ('PASSWORD_HASH_WORKERS', 'PASSWORD_HASH_MAX_QUEUE',
+                                              'PASSWORD_HASH_TIMEOUT')}
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_QUEUE=0, PASSWORD_HASH_TIMEOUT=0.2)
+    password_hashing.init_password_hashing(app)
+    try:
+        password_hashing._run('hash', time.sleep, 0)  # start the worker process
+        with pytest.raises(PasswordHashBusy, match='timed out'):
+            password_hashing._run('hash', time.sleep, 1.0)
+        with pytest.raises(PasswordHashBusy, match='full'):
+            password_hashing._run('hash', time.sleep, 0)
+        time.sleep(1.5)
+        password_hashing._run('hash', time.sleep, 0)
+    finally:
+        app.config.update(saved)
+        password_hashing.init_password_hashing(app)
+    print("[PASS] Timed-out hash keeps its slot")
+
+def test_busy_login_and_register_views(temp_db, monkeypatch):
+    """The web login and register forms report a busy server instead of failing with 500"""
+    def busy(*args):
+        raise PasswordHashBusy('Password hashing queue is full')
+    db.session.add(User(username='busy', email='busy@example.com', password_hash='x', role=USER))
+    db.session.commit()
+    monkeypatch.setattr(app_module, 'verify_password', busy)
+    monkeypatch.setattr(app_module, 'hash_password', busy)
+    app.config['WTF_CSRF_ENABLED'] = False
+    try:
+        with app.test_client() as client:
+            login = client.post('/login', data={'username': 'busy', 'password': 'secret123'})
+            register = client.post('/register', data={
+                'username': 'newbusy', 'email': 'newbusy@example.com', 'password': 'secret123',
+                'confirm_password': 'secret123', 'first_name': 'New', 'last_name': 'Busy',
+                'phone': '5555555', 'role': USER})
+    finally:
+        app.config.pop('WTF_CSRF_ENABLED')
+    for response in (login, register):
+        assert response.status_code == 200
+        assert 'Server busy, please try again.' in response.get_data(as_text=True)
+    assert User.query.filter_by(username='newbusy').first() is None
+    print("[PASS] Busy hashing reported on the login and register forms")
+
+if __name__ == '__main__':
+    test_hash_and_verify()
+    test_rehash_on_login()
+    test_stats()
+    test_timeout_keeps_slot_until_done()
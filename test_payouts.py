@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test batch payout runs
+"""
+
+import json
+from datetime import datetime, timedelta
+from app import app, db, User, Service, ServiceGroup, Booking, Commission, PayoutBatch, ADMIN, USER, HANDYMAN
+from payouts import run_payout, stream_statement_csv, stream_statement_json
+
+def create_commissions():
+    customer = User(username='customer', email='customer@example.com', password_hash='x', role=USER)
+    admin = User(username='admin', email='admin@example.com', password_hash='x', role=ADMIN)
+    handymen = [User(username=f'handyman{i}', email=f'handyman{i}@example.com', password_hash='x',
+                     role=HANDYMAN, first_name=f'Hand{i}') for i in range(2)]
+    group = ServiceGroup(name='Cleaning')
+    db.session.add_all([customer, admin, group] + handymen)
+    db.session.flush()
+
+    old = datetime.utcnow() - timedelta(days=10)
+    for index, handyman in enumerate(handymen * 3):
+        service = Service(name='Clean', description='Clean', price=100.0, duration_hours=1,
+                          service_group_id=group.id, handyman_id=handyman.id)
+        db.session.add(service)
+        db.session.flush()
+        booking = Booking(user_id=customer.id, service_id=service.id, handyman_id=handyman.id,
+                          booking_date=old, total_price=100.0)
+        db.session.add(booking)
+        db.session.flush()
+        db.session.add(Commission(booking_id=booking.id, handyman_id=handyman.id, service_price=100.0,
+                                  commission_amount=10.0, handyman_earnings=90.0,
+                                  created_at=old if index < 4 else datetime.utcnow()))
+    db.session.commit()
+    return admin, handymen
+
+def test_payout_run_pays_up_to_cutoff(temp_db):
+    """One run pays every unpaid commission before the cutoff under one batch"""
+    admin, handymen = create_commissions()
+    batch = run_payout(datetime.utcnow() - timedelta(days=1), admin.id)
+
+    assert (batch.handyman_count, batch.commission_count, batch.total_earnings) == (2, 4, 360.0)
+    assert Commission.query.filter_by(payout_batch_id=batch.id, is_paid=True).count() == 4
+    assert Commission.query.filter_by(is_paid=False).count() == 2
+    assert run_payout(datetime.utcnow() - timedelta(days=1)) is None
+    print("[PASS] Payout run pays commissions before cutoff")
+
+def test_statements_grouped_by_handyman(temp_db):
+    """CSV and JSON statements list each handyman's paid commissions"""
+    admin, handymen = create_commissions()
+    batch = run_payout(datetime.utcnow() + timedelta(days=1))
+
+    lines = ''.join(stream_statement_csv(batch.id)).strip().splitlines()
+    assert lines[0].startswith('handyman_id,first_name')
+    assert len(lines) == 7
+
+    statement = json.loads(''.join(stream_statement_json(batch.id)))
+    assert [h['handyman_id'] for h in statement['handymen']] == [h.id for h in handymen]
+    assert all(h['total_earnings'] == 270.0 for h in statement['handymen'])
+    print("[PASS] Statements grouped by handyman")
+
+def test_admin_run_route(temp_db):
+    """Admins can preview and run a payout from the web UI"""
+    admin, handymen = create_commissions()
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(admin.id)
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        assert client.get(f'/admin/payouts?cutoff={today}').status_code == 200
+        client.post('/admin/payouts/run', data={'cutoff': today})
+        batch = PayoutBatch.query.one()
+        response = client.get(f'/admin/payouts/{batch.id}/statement.csv')
+
+    assert batch.commission_count == 6 and batch.created_by_id == admin.id
+    assert response.mimetype == 'text/csv'
+    assert len(response.get_data(as_text=True).strip().splitlines()) == 7
+    print("[PASS] Admin payout routes work")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test incremental handyman rating aggregates
+"""
+
+from datetime import datetime
+from app import (app, db, User, Service, ServiceGroup, Booking, Feedback, HandymanRating, HandymanRank,
+                 rebuild_rating_aggregates, rebuild_leaderboard, USER, HANDYMAN)
+
+def create_handyman_with_bookings(count, name='handyman'):
+    customer = User(username=f'{name}-customer', email=f'{name}-customer@example.com', password_hash='x', role=USER)
+    handyman = User(username=name, email=f'{name}@example.com', password_hash='x', role=HANDYMAN)
+    group = ServiceGroup(name=f'{name} group')
+    db.session.add_all([customer, handyman, group])
+    db.session.flush()
+    service = Service(name='Clean', description='Clean', price=50.0, duration_hours=1,
+                      service_group_id=group.id, handyman_id=handyman.id)
+    db.session.add(service)
+    db.session.flush()
+    bookings = []
+    for _ in range(count):
+        booking = Booking(user_id=customer.id, service_id=service.id, handyman_id=handyman.id,
+                          booking_date=datetime.utcnow(), total_price=50.0, status='completed')
+        db.session.add(booking)
+        bookings.append(booking)
+    db.session.commit()
+    return customer, handyman, bookings
+
+def leave(customer, handyman, booking, rating):
+    db.session.add(Feedback(booking_id=booking.id, user_id=customer.id,
+                            handyman_id=handyman.id, rating=rating))
+    handyman.add_rating(rating, booking.service.service_group_id)
+    db.session.commit()
+
+def test_add_rating_is_incremental(temp_db):
+    """Each rating updates the histogram and average in place"""
+    customer, handyman, bookings = create_handyman_with_bookings(3)
+    for booking, rating in zip(bookings, [5, 4, 5]):
+        leave(customer, handyman, booking, rating)
+
+    rating_row = db.session.get(HandymanRating, handyman.id)
+    assert (rating_row.stars_5, rating_row.stars_4, rating_row.rating_count) == (2, 1, 3)
+    assert handyman.total_feedbacks == 3
+    assert abs(handyman.average_score - 14 / 3) < 1e-9
+    print("[PASS] Ratings aggregated incrementally")
+
+def test_missing_row_is_seeded(temp_db):
+    """Feedback that predates the histogram is counted when the row is first created"""
+    customer, handyman, bookings = create_handyman_with_bookings(2)
+    db.session.add(Feedback(booking_id=bookings[0].id, user_id=customer.id,
+                            handyman_id=handyman.id, rating=1))
+    db.session.commit()
+
+    leave(customer, handyman, bookings[1], 5)
+    assert handyman.total_feedbacks == 2
+    assert handyman.average_score == 3.0
+    print("[PASS] Missing aggregate row seeded from existing feedback")
+
+def test_rebuild_matches_incremental(temp_db):
+    """The GROUP BY repair produces the same aggregates"""
+    customer, handyman, bookings = create_handyman_with_bookings(4)
+    for booking, rating in zip(bookings, [3, 4, 5, 2]):
+        leave(customer, handyman, booking, rating)
+
+    User.query.update({User.average_score: 0.0, User.total_feedbacks: 0})
+    db.session.commit()
+    assert rebuild_rating_aggregates() == 1
+    db.session.commit()
+    db.session.expire_all()
+
+    assert handyman.total_feedbacks == 4
+    assert handyman.average_score == 3.5
+    assert db.session.get(HandymanRating, handyman.id).stars_2 == 1
+    print("[PASS] Rebuild matches incremental aggregates")
+
+def test_feedback_page_uses_histogram(temp_db):
+    """The feedback page summary and pagination come from the aggregates"""
+    customer, handyman, bookings = create_handyman_with_bookings(3)
+    for booking, rating in zip(bookings, [5, 4, 2]):
+        leave(customer, handyman, booking, rating)
+
+    app.config['FEEDBACK_PER_PAGE'], per_page = 2, app.config['FEEDBACK_PER_PAGE']
+    app.config['WTF_CSRF_ENABLED'] = False
+    try:
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['_user_id'] = str(handyman.id)
+            first_page = client.get('/handyman/feedback')
+            second_page = client.get('/handyman/feedback?page=2')
+    finally:
+        app.config['FEEDBACK_PER_PAGE'] = per_page
+        app.config.pop('WTF_CSRF_ENABLED')
+
+    assert first_page.status_code == 200
+    html = first_page.get_data(as_text=True)
+    assert html.count('class="card feedback-card"') == 2
+    assert '3.7' in html and 'pagination' in html
+    assert second_page.get_data(as_text=True).count('class="card feedback-card"') == 1
+    print("[PASS] Feedback page served from histogram with pagination")
+
+def test_leaderboard_prefers_track_record(temp_db):
+    """One 5-star review doesn't outrank many near-perfect ones"""
+    customer, newcomer, bookings = create_handyman_with_bookings(1, 'newcomer')
+    leave(customer, newcomer, bookings[0], 5)
+    customer, veteran, bookings = create_handyman_with_bookings(40, 'veteran')
+    for index, booking in enumerate(bookings):
+        leave(customer, veteran, booking, 4 if index % 10 == 0 else 5)
+
+    with app.test_client() as client:
+        top = client.get('/api/handymen/top').get_json()['data']
+        group_id = bookings[0].service.service_group_id
+        in_group = client.get(f'/api/handymen/top?group_id={group_id}').get_json()['data']
+
+    assert [entry['handyman']['id'] for entry in top] == [veteran.id, newcomer.id]
+    assert top[0]['rank'] == 1 and top[0]['rating_count'] == 40
+    assert [entry['handyman']['id'] for entry in in_group] == [veteran.id]
+
+    scores = {rank.handyman_id: rank.score for rank in HandymanRank.query.filter_by(service_group_id=0)}
+    assert rebuild_leaderboard() == 4
+    db.session.commit()
+    rebuilt = {rank.handyman_id: rank.score for rank in HandymanRank.query.filter_by(service_group_id=0)}
+    assert all(abs(scores[key] - rebuilt[key]) < 1e-9 for key in scores)
+    print("[PASS] Leaderboard ranks by Bayesian score")
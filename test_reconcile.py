@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test set-based commission reconciliation
+"""
+
+from datetime import datetime
+from app import db, User, Service, ServiceGroup, Booking, Commission, USER, HANDYMAN
+from ledger import get_balance
+from reconcile import reconcile_commissions
+
+def create_bookings():
+    customer = User(username='customer', email='customer@example.com', password_hash='x', role=USER)
+    handyman = User(username='handyman', email='handyman@example.com', password_hash='x', role=HANDYMAN)
+    group = ServiceGroup(name='Cleaning')
+    db.session.add_all([customer, handyman, group])
+    db.session.flush()
+    service = Service(name='Clean', description='Clean', price=19.99, duration_hours=1,
+                      service_group_id=group.id, handyman_id=handyman.id)
+    db.session.add(service)
+    db.session.flush()
+
+    bookings = []
+    for handyman_id in [handyman.id] * 5 + [None]:
+        booking = Booking(user_id=customer.id, service_id=service.id, handyman_id=handyman_id,
+                          booking_date=datetime.utcnow(), total_price=19.99)
+        db.session.add(booking)
+        bookings.append(booking)
+    db.session.flush()
+    # One booking already has a commission, one has a wrong one
+    db.session.add(Commission.for_booking(bookings[0], handyman.id))
+    wrong = Commission.for_booking(bookings[1], handyman.id)
+    wrong.service_price = 25.0
+    db.session.add(wrong)
+    db.session.commit()
+    return handyman, bookings
+
+def test_dry_run_reports_only(temp_db):
+    """A dry run counts discrepancies without writing"""
+    create_bookings()
+    report = reconcile_commissions(dry_run=True)
+    assert report['missing']['count'] == 3
+    assert report['mismatched']['count'] == 1
+    assert report['unassigned_bookings']['count'] == 1
+    assert report['inserted'] == 0
+    assert Commission.query.count() == 2
+    print("[PASS] Dry run only reports")
+
+def test_backfill_in_chunks(temp_db):
+    """Missing commissions are inserted in chunks and credited to the ledger"""
+    handyman, bookings = create_bookings()
+    report = reconcile_commissions(chunk_size=2)
+    assert report['inserted'] == 3
+    assert Commission.query.count() == 5
+    assert reconcile_commissions(dry_run=True)['missing']['count'] == 0
+
+    created = Commission.query.filter(Commission.booking_id.in_([b.id for b in bookings[2:5]])).all()
+    assert all((c.commission_amount_cents, c.handyman_earnings_cents) == (200, 1799) for c in created)
+    assert get_balance(handyman.id).balance_cents == 3 * 1799
+    print("[PASS] Missing commissions backfilled")
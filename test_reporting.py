@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test the reporting snapshot
+"""
+
+from flask import g
+from app import app, db, User, USER
+import reporting
+from file_lock import try_lock
+
+def add_user(name):
+    db.session.add(User(username=name, email=f'{name}@example.com', password_hash='x', role=USER))
+    db.session.commit()
+
+def test_snapshot_reads(temp_db, tmp_path):
+    """Reporting reads see the snapshot, not later writes, and fall back without one"""
+    app.config['REPORTING_SNAPSHOT'] = True
+    app.config['REPORTING_SNAPSHOT_PATH'] = str(tmp_path / 'snapshot.db')
+    reporting.init_reporting(app)
+    try:
+        add_user('before')
+        with app.app_context(), app.test_request_context('/admin/dashboard'):
+            g.read_bind = reporting.REPORTING_BIND
+            assert reporting.snapshot_age(app) is None
+
+        assert reporting.refresh_snapshot(app) > 0
+        add_user('after')
+        db.session.remove()
+
+        with app.app_context(), app.test_request_context('/admin/dashboard'):
+            g.read_bind = reporting.REPORTING_BIND
+            assert User.query.count() == 1
+            assert 0 <= reporting.snapshot_age(app) < 60
+        assert User.query.count() == 2
+        assert reporting.reporting_stats(app)['refreshes'] >= 1
+    finally:
+        app.config['REPORTING_SNAPSHOT'] = False
+        reporting.init_reporting(app)
+    print("[PASS] Reporting snapshot isolated from later writes")
+
+def test_refresh_skipped_while_locked(temp_db, tmp_path):
+    """A refresh returns None while another process holds the snapshot lock"""
+    app.config['REPORTING_SNAPSHOT'] = True
+    app.config['REPORTING_SNAPSHOT_PATH'] = str(tmp_path / 'snapshot.db')
+    reporting.init_reporting(app)
+    try:
+        with try_lock(str(tmp_path / 'snapshot.db.lock')) as locked:
+            assert locked
+            assert reporting.refresh_snapshot(app) is None
+        assert reporting.refresh_snapshot(app) > 0
+    finally:
+        app.config['REPORTING_SNAPSHOT'] = False
+        reporting.init_reporting(app)
+    print("[PASS] Concurrent refresh skipped")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test the synthetic data generator
+"""
+
+import pytest
+from datetime import date
+from sqlalchemy import text
+from app import db, ServiceGroup, User, Booking, Commission, Feedback, HandymanBalance, HandymanRank, HANDYMAN
+from migrations import upgrade
+from reconcile import find_discrepancies
+from seed import seed_database
+
+def snapshot():
+    with db.engine.connect() as conn:
+        return {table: conn.execute(text(f'SELECT * FROM {table} ORDER BY id')).all()
+                for table in ('booking', 'commission', 'feedback', 'service')}
+
+def seed_once(seed):
+    return seed_database(db.engine, users=200, bookings=1500, seed=seed, end_date=date(2026, 1, 1),
+                         chunk_size=400, log=lambda message: None)
+
+def test_seed_is_consistent_and_deterministic(temp_db):
+    """Every booking has a commission and accrual, ratings match feedback, and a seed repeats exactly"""
+    upgrade(db.engine, log=lambda message: None)
+    db.session.add_all([ServiceGroup(name='Koristus'), ServiceGroup(name='Ehitus')])
+    db.session.commit()
+
+    counts = seed_once(7)
+    assert counts['user'] == 210 and counts['booking'] == counts['commission'] == counts['ledger_entry'] == 1500
+    assert User.query.filter_by(role=HANDYMAN).count() == 10
+    statuses = {status for status, in db.session.query(Booking.status).distinct()}
+    assert {'pending', 'approved', 'completed', 'declined'} <= statuses
+    assert counts['feedback'] == Feedback.query.count() > 0
+
+    report = find_discrepancies()
+    assert report['missing']['count'] == report['mismatched']['count'] == report['orphaned']['count'] == 0
+    earnings = db.session.query(db.func.sum(Commission.handyman_earnings_cents)).scalar()
+    assert db.session.query(db.func.sum(HandymanBalance.balance_cents)).scalar() == earnings
+    rated = User.query.filter(User.total_feedbacks > 0).all()
+    assert sum(user.total_feedbacks for user in rated) == counts['feedback']
+    assert counts['handyman_rank'] == HandymanRank.query.count() > 0
+    assert {rank.handyman_id for rank in HandymanRank.query} == {user.id for user in rated}
+
+    with pytest.raises(RuntimeError):
+        seed_once(7)
+    first = snapshot()
+
+    # Same seed on another empty database: identical rows
+    db.session.remove()
+    for table in reversed(db.metadata.sorted_tables):
+        if table.name not in ('schema_version', 'service_group'):
+            db.session.execute(table.delete())
+    db.session.commit()
+    seed_once(7)
+    assert snapshot() == first
+    print("[PASS] Seeded data is consistent and repeats for the same seed")
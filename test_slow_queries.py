@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Test the slow-query log
+"""
+
+from app import app, db, User, USER
+import slow_queries
+
+def test_slow_query_recorded(temp_db, tmp_path):
+    """Statements over the threshold are kept with redacted parameters and a plan"""
+    app.config['SLOW_QUERY_MS'] = 0.0001
+    app.config['SLOW_QUERY_LOG_FILE'] = str(tmp_path / 'slow.log')
+    slow_queries.init_slow_queries(app)
+    try:
+        db.session.add(User(username='secret', email='secret@example.com', password_hash='x', role=USER))
+        db.session.commit()
+        with app.app_context(), app.test_request_context('/admin/users'):
+            User.query.filter_by(email='secret@example.com').first()
+
+        entry = next(e for e in slow_queries.slow_queries() if 'FROM user' in e['statement'])
+        assert entry['endpoint'] == 'admin_users'
+        assert 'secret@example.com' not in str(entry['parameters'])
+        assert entry['plan'] and 'user' in ' '.join(entry['plan'])
+        logged = slow_queries.read_log(app.config['SLOW_QUERY_LOG_FILE'], limit=50)
+        assert any(e['statement'] == entry['statement'] for e in logged)
+    finally:
+        app.config['SLOW_QUERY_MS'] = 200.0
+        app.config['SLOW_QUERY_LOG_FILE'] = 'logs/slow_queries.log'
+        slow_queries.init_slow_queries(app)
+    print("[PASS] Slow query logged with plan and redacted parameters")
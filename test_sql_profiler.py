@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Test per-request SQL profiling and the N+1 detector
+"""
+
+import pytest
+from app import app, db, User, USER
+import sql_profiler
+
+def test_n_plus_one_detected(temp_db):
+    """A request that loads rows one by one is flagged; a single query is not"""
+    for index in range(15):
+        db.session.add(User(username=f'user{index}', email=f'user{index}@example.com', password_hash='x', role=USER))
+    db.session.commit()
+    ids = [user.id for user in User.query.all()]
+
+    with app.app_context(), app.test_request_context('/admin/users'):
+        assert len(User.query.filter(User.id.in_(ids)).all()) == 15
+        profile = sql_profiler.request_profile()
+        assert profile['queries'] == 1 and profile['db_ms'] > 0
+        assert sql_profiler.check_request(raise_errors=True) == []
+
+    with app.app_context(), app.test_request_context('/admin/users'):
+        for user_id in ids:
+            User.query.filter_by(id=user_id).first()
+        with pytest.raises(sql_profiler.NPlusOneDetected):
+            sql_profiler.check_request(raise_errors=True)
+
+    assert sql_profiler.sql_stats()['n_plus_one'] >= 1
+    print("[PASS] N+1 query pattern detected")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test the load_user identity cache
+"""
+
+from app import app, db, User, load_user
+import user_cache
+
+class FakeUser:
+    def __init__(self, user_id, role='user'):
+        for name in user_cache.USER_CACHE_FIELDS:
+            setattr(self, name, None)
+        self.id = user_id
+        self.role = role
+        self.cache_version = 0
+
+def test_store_and_invalidate():
+    """Cached entries are dropped when the user is invalidated"""
+    user_cache.clear()
+    fields, version = user_cache.lookup(9001)
+    assert fields is None
+    user_cache.store(FakeUser(9001, 'handyman'), version)
+
+    fields, _ = user_cache.lookup(9001)
+    assert fields['role'] == 'handyman'
+
+    user_cache.invalidate_user(9001)
+    fields, _ = user_cache.lookup(9001)
+    assert fields is None
+    print("[PASS] Cache store and invalidate work")
+
+def test_stale_fill_discarded():
+    """A fill that raced with an invalidation is not cached"""
+    user_cache.clear()
+    _, version = user_cache.lookup(9002)
+    user_cache.invalidate_user(9002)
+    user_cache.store(FakeUser(9002), version)
+    fields, _ = user_cache.lookup(9002)
+    assert fields is None
+    print("[PASS] Stale fill discarded")
+
+def test_load_user_uses_cache(temp_db):
+    """load_user returns the same identity from the cache"""
+    user = User(username='cached', email='cached@example.com', password_hash='x', role='handyman')
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+    db.session.expunge_all()
+
+    with app.test_request_context():
+        first = load_user(str(user_id))
+        db.session.expunge_all()
+        hits = user_cache.cache_stats()['hits']
+        second = load_user(str(user_id))
+
+        assert user_cache.cache_stats()['hits'] == hits + 1
+        assert second.id == first.id
+        assert second.role == first.role == 'handyman'
+        assert second.email == first.email
+        db.session.rollback()
+    print("[PASS] load_user served from cache")
+
+def test_change_on_other_worker(temp_db):
+    """A role change or delete committed elsewhere is seen on the next load_user, not after the TTL"""
+    user = User(username='worker', email='worker@example.com', password_hash='x', role='handyman')
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+    db.session.expunge_all()
+
+    with app.test_request_context():
+        assert load_user(str(user_id)).role == 'handyman'
+        db.session.expunge_all()
+
+        # Another worker demotes the user; this worker's cache is not told
+        db.session.get(User, user_id).role = 'user'
+        db.session.commit()
+        db.session.expunge_all()
+        stale = user_cache.cache_stats()['stale']
+        assert load_user(str(user_id)).role == 'user'
+        assert user_cache.cache_stats()['stale'] == stale + 1
+        db.session.expunge_all()
+
+        db.session.execute(User.__table__.delete().where(User.__table__.c.id == user_id))
+        db.session.commit()
+        assert load_user(str(user_id)) is None
+    print("[PASS] Changes from other workers invalidate the cache")
+
+if __name__ == '__main__':
+    import pytest
+    test_store_and_invalidate()
+    test_stale_fill_discarded()
+    # The load_user tests need the temp_db fixture
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite single-writer queue
+"""
+
+import threading
+import pytest
+from app import app, db, User, USER
+import write_queue
+
+def enable_queue():
+    app.config['SQLITE_WRITE_QUEUE'] = True
+    app.config['WRITE_QUEUE_MAX_DELAY_MS'] = 50
+    write_queue.init_write_queue(app)
+
+def disable_queue():
+    app.config['SQLITE_WRITE_QUEUE'] = False
+    app.config['WRITE_QUEUE_MAX_DELAY_MS'] = 2
+    write_queue.init_write_queue(app)
+
+def add_user(index):
+    def job():
+        user = User(username=f'user{index}', email=f'user{index}@example.com', password_hash='x', role=USER)
+        db.session.add(user)
+        db.session.flush()
+        return user.id
+    return job
+
+def test_group_commit(temp_db):
+    """Concurrent writes are committed together by the writer thread"""
+    enable_queue()
+    try:
+        commits = write_queue.write_queue_stats()['commits']
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(write_queue.run_write(add_user(i))))
+                   for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(results)) == 10
+        assert User.query.count() == 10
+        stats = write_queue.write_queue_stats()
+        assert stats['commits'] - commits < 10
+        assert stats['max_batch'] > 1
+    finally:
+        disable_queue()
+    print("[PASS] Concurrent writes group-committed")
+
+def test_failed_job_isolated(temp_db):
+    """A failing job in a batch does not take the others down with it"""
+    enable_queue()
+    try:
+        errors = []
+
+        def failing():
+            raise ValueError('boom')
+
+        def run(job):
+            try:
+                write_queue.run_write(job)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(job,)) for job in (add_user(1), failing, add_user(2))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(errors) == 1
+        assert User.query.count() == 2
+    finally:
+        disable_queue()
+    print("[PASS] Failed job isolated")
+
+def test_timed_out_job_not_committed(temp_db):
+    """A write still queued when its caller times out is cancelled, so a retry cannot duplicate it"""
+    enable_queue()
+    app.config['WRITE_QUEUE_TIMEOUT'] = 0.2
+    write_queue.init_write_queue(app)
+    try:
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return add_user(1)()
+
+        writer = threading.Thread(target=lambda: results.append(write_queue.run_write(slow)))
+        writer.start()
+        started.wait(5)
+        with pytest.raises(write_queue.WriteQueueTimeout):
+            write_queue.run_write(add_user(2))
+        release.set()
+        writer.join()
+
+        assert len(results) == 1
+        assert [user.username for user in User.query.all()] == ['user1']
+        assert write_queue.write_queue_stats()['cancelled_jobs'] >= 1
+    finally:
+        app.config['WRITE_QUEUE_TIMEOUT'] = 10
+        disable_queue()
+    print("[PASS] Timed-out write cancelled")
+
+def test_api_register_through_queue(temp_db):
+    """API registration is committed by the writer thread"""
+    enable_queue()
+    try:
+        jobs = write_queue.write_queue_stats()['jobs']
+        response = app.test_client().post('/api/auth/register', json={
+            'first_name': 'Queued', 'last_name': 'User', 'email': 'queued@example.com', 'password': 'secret123'})
+        assert response.status_code == 200
+        created = response.get_json()['user']
+        assert created['email'] == 'queued@example.com'
+        assert write_queue.write_queue_stats()['jobs'] == jobs + 1
+        db.session.remove()
+        assert db.session.get(User, created['id']).email == 'queued@example.com'
+    finally:
+        disable_queue()
+    print("[PASS] API registration queued")
@@ -0,0 +1,112 @@
+"""
+User identity cache for Service PRO
+Keeps a copy of each logged-in user's columns so load_user reads one indexed column instead of the whole row
+
+The cache lives in each worker process. Every change to a cached column
+bumps the row's cache_version, and a hit is only served while the row
+still has the version the entry was filled with, so a role change,
+approval or deleted account made on another worker applies on the next
+request.
+"""
+
+import threading
+import time
+
+# Columns copied into the cache; anything else lazy-loads from the database
+USER_CACHE_FIELDS = (
+    'id', 'username', 'email', 'role', 'first_name', 'last_name', 'phone',
+    'address', 'is_approved', 'admin_approved', 'average_score', 'total_feedbacks',
+    'created_at', 'cache_version',
+)
+
+_config = {'ttl': 60.0, 'max_entries': 10000}
+_entries = {}   # user_id -> (expires_at, version, fields)
+_versions = {}  # user_id -> version stamp, bumped on every invalidation
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'stale': 0}
+
+
+def init_user_cache(app):
+    """Configure cache TTL and size from the app config"""
+    _config['ttl'] = app.config.get('USER_CACHE_TTL', _config['ttl'])
+    _config['max_entries'] = app.config.get('USER_CACHE_MAX_ENTRIES', _config['max_entries'])
+    clear()
+
+
+def lookup(user_id, current_version=None):
+    """Return (fields or None, version) for a user
+
+    current_version(user_id) reads the row's cache_version (None once the
+    row is gone); a hit whose copy is older was changed by another worker
+    and is dropped. The version must be passed back to store() so a fill
+    that raced with an invalidation is discarded instead of caching stale data.
+    """
+    with _lock:
+        version = _versions.get(user_id, 0)
+        entry = _entries.get(user_id)
+        if not (entry and entry[1] == version and entry[0] > time.monotonic()):
+            if entry:
+                del _entries[user_id]
+            _stats['misses'] += 1
+            return None, version
+        fields = dict(entry[2])
+
+    # Outside the lock: this is a database read
+    if current_version is not None and current_version(user_id) != fields['cache_version']:
+        with _lock:
+            version = _versions.get(user_id, 0) + 1
+            _versions[user_id] = version
+            _entries.pop(user_id, None)
+            _stats['stale'] += 1
+            _stats['misses'] += 1
+        return None, version
+
+    with _lock:
+        _stats['hits'] += 1
+    return fields, version
+
+
+def store(user, version):
+    """Cache a loaded user's identity columns"""
+    if _config['ttl'] <= 0:
+        return
+    fields = {name: getattr(user, name) for name in USER_CACHE_FIELDS}
+    with _lock:
+        if _versions.get(user.id, 0) != version:
+            return
+        if user.id not in _entries and len(_entries) >= _config['max_entries']:
+            # Drop the oldest entry; dicts keep insertion order
+            del _entries[next(iter(_entries))]
+        _entries[user.id] = (time.monotonic() + _config['ttl'], version, fields)
+
+
+def invalidate_user(user_id):
+    """Forget a user after their row changes; other workers notice the new cache_version"""
+    if user_id is None:
+        return
+    with _lock:
+        _versions[user_id] = _versions.get(user_id, 0) + 1
+        _entries.pop(user_id, None)
+        _stats['invalidations'] += 1
+
+
+def clear():
+    with _lock:
+        for user_id in _entries:
+            _versions[user_id] = _versions.get(user_id, 0) + 1
+        _entries.clear()
+
+
+def cache_stats():
+    """Hit/miss counters for this process"""
+    with _lock:
+        lookups = _stats['hits'] + _stats['misses']
+        return {
+            'entries': len(_entries),
+            'ttl': _config['ttl'],
+            'hits': _stats['hits'],
+            'misses': _stats['misses'],
+            'invalidations': _stats['invalidations'],
+            'stale': _stats['stale'],
+            'hit_ratio': round(_stats['hits'] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,194 @@
+"""
+Single-writer queue for Service PRO on SQLite
+Funnels write transactions through one thread per process and commits concurrent ones together (group commit)
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+
+class WriteQueueTimeout(Exception):
+    """Raised when a queued write did not finish in time"""
+
+
+_config = {
+    'enabled': False,
+    'max_batch': 32,
+    'max_delay_ms': 2.0,
+    'timeout': 10.0,
+}
+
+_app = None
+_queue = None
+_writer = None
+_writer_pid = None
+_lock = threading.Lock()
+
+_stats = {
+    'jobs': 0,
+    'commits': 0,
+    'failed_jobs': 0,
+    'cancelled_jobs': 0,
+    'batch_retries': 0,
+    'max_depth': 0,
+    'max_batch': 0,
+    'batch_sizes': deque(maxlen=512),
+    'wait_ms': deque(maxlen=512),
+}
+
+
+def init_write_queue(app):
+    """Enable the queue only for SQLite, where there is a single database lock
+
+    Each process has its own writer, so only requests served by threads of
+    the same process are committed together. With sync gunicorn workers
+    (one request per process at a time) every batch holds a single job and
+    the queue has no effect; gunicorn.conf.py switches to one gthread
+    worker when SQLITE_WRITE_QUEUE is on.
+    """
+    global _app
+    _app = app
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    _config['enabled'] = bool(app.config.get('SQLITE_WRITE_QUEUE')) and uri.startswith('sqlite')
+    _config['max_batch'] = app.config.get('WRITE_QUEUE_MAX_BATCH', _config['max_batch'])
+    _config['max_delay_ms'] = app.config.get('WRITE_QUEUE_MAX_DELAY_MS', _config['max_delay_ms'])
+    _config['timeout'] = app.config.get('WRITE_QUEUE_TIMEOUT', _config['timeout'])
+
+
+def _get_queue():
+    """Return the job queue, starting the writer thread after a fork (gunicorn workers)"""
+    global _queue, _writer, _writer_pid
+    with _lock:
+        if _writer is None or _writer_pid != os.getpid() or not _writer.is_alive():
+            _queue = queue.Queue()
+            _writer = threading.Thread(target=_writer_loop, args=(_queue,), name='sqlite-writer', daemon=True)
+            _writer_pid = os.getpid()
+            _writer.start()
+        return _queue
+
+
+def _next_batch(jobs):
+    """Block for one job, then take whatever else arrives within max_delay_ms"""
+    batch = [jobs.get()]
+    deadline = time.monotonic() + _config['max_delay_ms'] / 1000.0
+    while len(batch) < _config['max_batch']:
+        remaining = deadline - time.monotonic()
+        try:
+            batch.append(jobs.get(timeout=remaining) if remaining > 0 else jobs.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _writer_loop(jobs):
+    from app import db
+    while True:
+        # Jobs whose caller already gave up are dropped, never committed
+        batch = [item for item in _next_batch(jobs) if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            continue
+        with _app.app_context():
+            try:
+                _commit_batch(db, batch)
+            finally:
+                db.session.remove()
+
+
+def _commit_batch(db, batch):
+    """Run every job in one transaction; if any fails, redo them one per transaction"""
+    results = []
+    try:
+        for job, future, queued_at in batch:
+            results.append(job())
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if len(batch) == 1:
+            _finish(batch, exception=e)
+            return
+        _stats['batch_retries'] += 1
+        for item in batch:
+            _commit_batch(db, [item])
+        return
+    _stats['commits'] += 1
+    _stats['batch_sizes'].append(len(batch))
+    _stats['max_batch'] = max(_stats['max_batch'], len(batch))
+    _finish(batch, results=results)
+
+
+def _finish(batch, results=None, exception=None):
+    now = time.monotonic()
+    for index, (job, future, queued_at) in enumerate(batch):
+        _stats['wait_ms'].append((now - queued_at) * 1000)
+        if exception is not None:
+            _stats['failed_jobs'] += 1
+            future.set_exception(exception)
+        else:
+            future.set_result(results[index])
+
+
+def run_write(job):
+    """Run job() and commit its changes; returns job's result
+
+    job must use db.session and only return plain values (IDs, numbers),
+    because with the queue enabled it runs in the writer thread's session.
+    Without the queue it runs inline in the request's session. A job still
+    waiting in the queue after WRITE_QUEUE_TIMEOUT is cancelled and never
+    runs, so WriteQueueTimeout means nothing was written.
+    """
+    from app import db
+    _stats['jobs'] += 1
+    if not _config['enabled']:
+        try:
+            result = job()
+            db.session.commit()
+            return result
+        except Exception:
+            db.session.rollback()
+            raise
+
+    jobs = _get_queue()
+    future = Future()
+    jobs.put((job, future, time.monotonic()))
+    _stats['max_depth'] = max(_stats['max_depth'], jobs.qsize())
+    try:
+        return future.result(timeout=_config['timeout'])
+    except FutureTimeoutError:
+        if future.cancel():
+            _stats['cancelled_jobs'] += 1
+            raise WriteQueueTimeout('Write queue did not commit in time')
+    # The writer already started the job, so its commit is about to decide the outcome
+    return future.result()
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+
+def write_queue_stats():
+    """Queue depth, commit batch sizes and queue wait times for this process"""
+    batch_sizes = list(_stats['batch_sizes'])
+    wait_ms = list(_stats['wait_ms'])
+    return {
+        'enabled': _config['enabled'],
+        'depth': _queue.qsize() if _queue is not None else 0,
+        'max_depth': _stats['max_depth'],
+        'jobs': _stats['jobs'],
+        'commits': _stats['commits'],
+        'failed_jobs': _stats['failed_jobs'],
+        'cancelled_jobs': _stats['cancelled_jobs'],
+        'batch_retries': _stats['batch_retries'],
+        'avg_batch': round(sum(batch_sizes) / len(batch_sizes), 2) if batch_sizes else 0.0,
+        'max_batch': _stats['max_batch'],
+        'wait_p50_ms': _percentile(wait_ms, 50),
+        'wait_p95_ms': _percentile(wait_ms, 95),
+        'wait_p99_ms': _percentile(wait_ms, 99),
+    }